@@ -0,0 +1,108 @@
+import csv
+from datetime import date, timedelta
+from itertools import islice
+from pathlib import Path
+import random
+from typing import Callable, Dict, Iterator, List, Union
+
+# Rows written at a time
+BATCH_SIZE = 10000
+
+CATEGORIES = ["North", "South", "East", "West", "Central"]
+WORDS = ["alpha", "bravo", "charlie", "delta", "echo", "foxtrot", "golf", "hotel"]
+UNICODE_WORDS = [
+    "Zürich",
+    "São Paulo",
+    "Kraków",
+    "東京",
+    "Москва",
+    "القاهرة",
+    "😀",
+    "naïve",
+]
+# Non-breaking, ideographic and zero-width spaces, for cleanspace
+UNICODE_SPACES = ["\u00a0", "\u3000", "\u200b", "\u2003", "\t"]
+
+
+def tall_rows(rng: random.Random) -> Iterator[List[str]]:
+    """A few columns of mixed types: ints, floats, dates, bools, zip codes, text"""
+    yield ["id", "name", "region", "amount", "day", "active", "zip", "note"]
+    start = date(2000, 1, 1)
+    for i in range(1, 1 << 62):
+        yield [
+            str(i),
+            rng.choice(WORDS).title(),
+            rng.choice(CATEGORIES),
+            f"{rng.uniform(-1000, 100000):.2f}",
+            (start + timedelta(days=rng.randrange(9000))).isoformat(),
+            rng.choice(["true", "false"]),
+            f"{rng.randrange(100000):05d}",
+            " ".join(rng.choices(WORDS, k=rng.randrange(4))),
+        ]
+
+
+def wide_rows(rng: random.Random) -> Iterator[List[str]]:
+    """100 columns, alternating numbers and short words, some blank"""
+    yield [f"col_{j}" for j in range(100)]
+    while True:
+        yield [
+            str(rng.randrange(1000)) if j % 2 else rng.choice(WORDS + [""])
+            for j in range(100)
+        ]
+
+
+def quoted_rows(rng: random.Random) -> Iterator[List[str]]:
+    """Values with delimiters, quotes and newlines in them, which have to be quoted"""
+    yield ["id", "title", "address", "comment", "amount"]
+    for i in range(1, 1 << 62):
+        yield [
+            str(i),
+            f'The "{rng.choice(WORDS)}" report, part {rng.randrange(10)}',
+            f"{rng.randrange(1, 999)} {rng.choice(WORDS).title()} St.\n"
+            f"{rng.choice(CATEGORIES)}, {rng.randrange(10000, 99999)}",
+            "\n".join(rng.choices(WORDS, k=rng.randrange(1, 4))),
+            f"{rng.uniform(0, 1000):.2f}",
+        ]
+
+
+def unicode_rows(rng: random.Random) -> Iterator[List[str]]:
+    """Multi-byte text, padded with unicode whitespace"""
+    yield ["id", "city", " name ", "words", "score"]
+    for i in range(1, 1 << 62):
+        yield [
+            str(i),
+            rng.choice(UNICODE_WORDS),
+            rng.choice(UNICODE_SPACES)
+            + rng.choice(UNICODE_WORDS)
+            + rng.choice(UNICODE_SPACES),
+            rng.choice(UNICODE_SPACES).join(rng.choices(UNICODE_WORDS, k=3)),
+            str(rng.randrange(100)),
+        ]
+
+
+SHAPES: Dict[str, Callable[[random.Random], Iterator[List[str]]]] = {
+    "tall": tall_rows,
+    "wide": wide_rows,
+    "quoted": quoted_rows,
+    "unicode": unicode_rows,
+}
+
+
+def generate_csv(path: Union[str, Path], shape: str, rows: int, seed: int = 0) -> Path:
+    """
+    Write a CSV of the given shape with a header and `rows` data rows; the same
+    shape, rows and seed always make the same file
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = islice(SHAPES[shape](random.Random(seed)), rows + 1)
+    with open(path, "w", newline="", encoding="utf-8") as outfile:
+        writer = csv.writer(outfile)
+        while batch := list(islice(data, BATCH_SIZE)):
+            writer.writerows(batch)
+    return path
+
+
+def dataset_path(data_dir: Union[str, Path], shape: str, rows: int, seed: int) -> Path:
+    """Where a generated CSV is cached, so it's only generated once"""
+    return Path(data_dir) / f"{shape}-{rows}-{seed}.csv"
@@ -0,0 +1,256 @@
+import json
+import os
+from pathlib import Path
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Tuple
+
+import click
+
+from .generate import SHAPES, dataset_path, generate_csv
+
+SCALES = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+
+# The most data rows that fit in an Excel sheet, under its header
+EXCEL_MAX_ROWS = 1_048_575
+
+DATA_DIR = Path(__file__).parent / "data"
+
+# Each command's arguments, given the input path, its number of rows, and a
+# directory for output files
+COMMANDS: Dict[str, Callable[[Path, int, str], List[str]]] = {
+    "excel": lambda path, rows, out_dir: [
+        "excel",
+        str(path),
+        "-o",
+        f"{out_dir}/out.xlsx",
+    ],
+    "probe": lambda path, rows, out_dir: ["probe", str(path)],
+    "infer": lambda path, rows, out_dir: ["infer", str(path)],
+    "slice": lambda path, rows, out_dir: [
+        "slice",
+        "-i",
+        str(rows // 2),
+        "-i",
+        "-10-",
+        str(path),
+    ],
+    "transpose": lambda path, rows, out_dir: ["transpose", str(path)],
+    "cleanspace": lambda path, rows, out_dir: ["cleanspace", str(path)],
+    "count": lambda path, rows, out_dir: ["count", str(path)],
+}
+
+
+# Runs excsv, then reports its peak memory on stderr. Linux carries ru_maxrss over from
+# the process a child was forked from, i.e. this one, so the child's own VmHWM is used
+RUNNER = """
+import atexit, sys
+
+@atexit.register
+def report_peak_rss():
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    sys.stderr.write(f"\\npeak_rss_kb={line.split()[1]}\\n")
+    except OSError:
+        pass
+
+from excsv.cli import cli
+cli(sys.argv[1:], prog_name="excsv")
+"""
+
+
+def measure(args: List[str]) -> Tuple[float, int]:
+    """
+    Run excsv with args in a new process, with its output thrown away; returns the
+    wall-clock seconds it took and its peak resident memory, in bytes
+    """
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-c", RUNNER, *args],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+    )
+    # os.wait4() reports the resource usage of just this child
+    _, status, usage = os.wait4(proc.pid, 0)
+    seconds = time.perf_counter() - start
+    # like subprocess: the exit code, or minus the signal that killed it; by hand,
+    # since os.waitstatus_to_exitcode() is new in Python 3.9
+    proc.returncode = (
+        os.WEXITSTATUS(status) if os.WIFEXITED(status) else -os.WTERMSIG(status)
+    )
+    stderr = proc.stderr.read().decode(errors="replace")
+    proc.stderr.close()
+    if proc.returncode != 0:
+        raise RuntimeError(f"excsv {' '.join(args)} failed:\n{stderr}")
+
+    reported = [line for line in stderr.splitlines() if line.startswith("peak_rss_kb=")]
+    if reported:
+        return seconds, int(reported[-1].split("=")[1]) * 1024
+    # ru_maxrss is in kilobytes on Linux, bytes on macOS
+    peak_rss = usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+    return seconds, peak_rss
+
+
+def run_suite(
+    commands: List[str],
+    shapes: List[str],
+    scales: List[str],
+    data_dir: Path = DATA_DIR,
+    seed: int = 0,
+    repeat: int = 1,
+    log: Callable[[str], None] = lambda message: None,
+) -> Dict[str, Dict[str, float]]:
+    """
+    Time each command on each shape of data at each scale, keeping the fastest of
+    `repeat` runs and the highest peak memory; results are keyed by
+    "command/shape/scale". Generated data is cached in data_dir.
+
+    Also times how long excsv takes to start, as "startup"
+    """
+    results = {}
+    seconds, peak_rss = min(measure(["--version"]) for _ in range(max(repeat, 3)))
+    results["startup"] = {"seconds": seconds, "peak_rss_mb": peak_rss / 2**20}
+
+    with tempfile.TemporaryDirectory(prefix="excsv-bench-") as out_dir:
+        for scale in scales:
+            rows = SCALES[scale]
+            for shape in shapes:
+                path = dataset_path(data_dir, shape, rows, seed)
+                if not path.exists():
+                    log(f"generating {path}")
+                    generate_csv(path, shape, rows, seed)
+                for command in commands:
+                    if command == "excel" and rows > EXCEL_MAX_ROWS:
+                        continue
+                    runs = [
+                        measure(COMMANDS[command](path, rows, out_dir))
+                        for _ in range(repeat)
+                    ]
+                    key = f"{command}/{shape}/{scale}"
+                    results[key] = {
+                        "seconds": min(seconds for seconds, _ in runs),
+                        "peak_rss_mb": max(rss for _, rss in runs) / 2**20,
+                    }
+                    log(
+                        f"{key}: {results[key]['seconds']:.3f}s, "
+                        f"{results[key]['peak_rss_mb']:.1f} MB"
+                    )
+    return results
+
+
+def compare(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    tolerance: float,
+) -> List[str]:
+    """
+    The measurements that are more than `tolerance` (e.g. 0.25 for 25%) worse than
+    the baseline's, as messages; only keys that are in both are compared
+    """
+    regressions = []
+    for key in sorted(results.keys() & baseline.keys()):
+        for metric in ("seconds", "peak_rss_mb"):
+            base, value = baseline[key][metric], results[key][metric]
+            if base > 0 and value > base * (1 + tolerance):
+                regressions.append(
+                    f"{key} {metric}: {value:.3f} vs {base:.3f} ({value / base - 1:+.0%})"
+                )
+    return regressions
+
+
+@click.command()
+@click.option(
+    "--command",
+    "-c",
+    "commands",
+    type=click.Choice(list(COMMANDS)),
+    multiple=True,
+    help="Commands to benchmark. Default is all of them",
+)
+@click.option(
+    "--shape",
+    "-s",
+    "shapes",
+    type=click.Choice(list(SHAPES)),
+    multiple=True,
+    help="Shapes of data to benchmark on. Default is all of them",
+)
+@click.option(
+    "--scale",
+    "scales",
+    type=click.Choice(list(SCALES)),
+    multiple=True,
+    help="Numbers of rows to benchmark on. Default is 10k",
+)
+@click.option("--seed", type=int, default=0, show_default=True)
+@click.option(
+    "--repeat",
+    type=click.IntRange(min=1),
+    default=3,
+    show_default=True,
+    help="Runs of each benchmark; the fastest is kept",
+)
+@click.option(
+    "--data-dir",
+    type=click.Path(file_okay=False, path_type=Path),
+    default=DATA_DIR,
+    help="Where generated data is cached. Default is benchmarks/data",
+)
+@click.option(
+    "--output", "-o", type=click.File("w"), help="Write the results to this JSON file"
+)
+@click.option(
+    "--baseline",
+    type=click.File("r"),
+    help="Compare the results to those in this JSON file, and fail on regressions",
+)
+@click.option(
+    "--tolerance",
+    type=click.FloatRange(min=0),
+    default=0.25,
+    show_default=True,
+    help="How much slower, or bigger, than the baseline counts as a regression",
+)
+def main(commands, shapes, scales, seed, repeat, data_dir, output, baseline, tolerance):
+    """
+    Benchmark excsv's commands on generated data, at several scales
+
+        python -m benchmarks.run --scale 10k -o baseline.json
+        python -m benchmarks.run --scale 10k --baseline baseline.json
+    """
+    results = run_suite(
+        list(commands or COMMANDS),
+        list(shapes or SHAPES),
+        list(scales or ["10k"]),
+        data_dir,
+        seed,
+        repeat,
+        log=lambda message: click.echo(message, err=True),
+    )
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": seed,
+        "results": results,
+    }
+    if output:
+        json.dump(report, output, indent=2)
+        output.write("\n")
+
+    if baseline:
+        regressions = compare(results, json.load(baseline)["results"], tolerance)
+        for message in regressions:
+            click.echo(f"REGRESSION {message}", err=True)
+        if regressions:
+            sys.exit(1)
+        click.echo("No regressions", err=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,102 @@
 #!/usr/bin/env python3
 
 from functools import wraps
-from hyperloglog import HyperLogLog
 from click_default_group import DefaultGroup
 from rich_click import RichGroup
-from rich.console import Console
 
 
 import rich_click as click
+from collections import deque
 import csv
+from functools import partial
+import os
+from io import StringIO, TextIOWrapper
+from itertools import chain, islice
+import random
 import re
 from pathlib import Path
-from typing import TextIO, List, Union
+from typing import TYPE_CHECKING, Dict, Iterator, Optional, TextIO, List, Tuple, Union
 import sys
 
-from .utils.excel import csv_to_workbook
-from .utils.infer import infer_column_types
-from .utils.listing import slice_input, transpose_list_of_lists
-from .utils.text import clean_whitespace
+from .utils.compression import (
+    HEAD_SIZE,
+    CompressionError,
+    DecompressionError,
+    compression_from_suffix,
+    detect_compression,
+    is_compressed,
+    open_compressed_output,
+    open_decompressed,
+    peek,
+)
+from .utils.engines import (
+    DEFAULT_ENGINE,
+    ENGINES,
+    available_engines,
+    engine_is_available,
+    read_rows,
+)
+from .utils.infer import ColumnTypes, chunk_column_types, scan_column_types
+from .utils.listing import (
+    IndexSet,
+    slice_input,
+    slice_input_from_end,
+    transpose_list_of_lists,
+)
+from .utils.records import buffer_blocks, count_records, read_blocks
+from .utils.rowindex import (
+    MappedRows,
+    build_index,
+    default_index_path,
+    file_crc32,
+    load_index,
+    mapped_file,
+)
+from .utils.sampling import (
+    bernoulli_sample,
+    block_sample,
+    read_header,
+    reservoir_sample,
+)
+from .utils.tail import tail_rows
+from .utils.text import clean_rows, clean_whitespace
+from .utils.timing import (
+    format_report,
+    span,
+    start_profiling,
+    stop_profiling,
+    timed_rows,
+    timed_writer,
+)
+from .utils.transpose import transpose_rows
+from .utils.validate import DECODE_ERRORS, validate_header, validate_rows
+
+# openpyxl, hyperloglog, rich and multiprocessing take longer to import than most
+# commands take to run on a small file, so they're imported by the commands that
+# use them, not here
+if TYPE_CHECKING:
+    from .utils.litmus import Rule
+    from .utils.profile import ColumnProfile
+
 
+class LazyConsole:
+    """A rich Console that's only created, and rich imported, when it's first printed to"""
 
-error_console = Console(stderr=True, style="cyan")
+    def __init__(self, **kwargs):
+        self._kwargs = kwargs
+        self._console = None
+
+    def print(self, *args, **kwargs) -> None:
+        if self._console is None:
+            from rich.console import Console
+
+            self._console = Console(**self._kwargs)
+        self._console.print(*args, **kwargs)
+
+
+error_console = LazyConsole(stderr=True, style="cyan")
+
+CLEAN_BATCH_SIZE = 10000
 
 
 def callback_tab_to_str(ctx, param, value):
@@ -29,9 +105,75 @@ def callback_tab_to_str(ctx, param, value):
     return value
 
 
+def callback_default_stdin(ctx, param, value):
+    # click before 8.2 doesn't take a default for an argument with nargs=-1
+    return value or (param.type.convert("-", param, ctx),)
+
+
+class CompressedFile(click.File):
+    """
+    A click.File that transparently reads gzip, bz2, xz and zstd, detected from the
+    first bytes of the input, stdin's included, and writes them when the output's
+    name ends with .gz, .bz2, .xz or .zst; anything else is opened as click.File would
+
+    Compressed input is decompressed in a background thread, ahead of what's read
+    """
+
+    def convert(self, value, param, ctx):
+        if not isinstance(value, (str, os.PathLike)):
+            return super().convert(value, param, ctx)
+        try:
+            stream = self._open_compressed(value)
+        except OSError as err:
+            self.fail(f"'{os.fsdecode(value)}': {err.strerror}", param, ctx)
+        except CompressionError as err:
+            self.fail(str(err), param, ctx)
+        if stream is None:
+            return super().convert(value, param, ctx)
+        if ctx is not None:
+            ctx.call_on_close(stream.close)
+        return stream
+
+    def _open_compressed(self, value):
+        """value opened as a compressed stream, or None if it isn't compressed"""
+        if "r" not in self.mode:
+            compression = None if value == "-" else compression_from_suffix(value)
+            if compression is None:
+                return None
+            stream = open_compressed_output(
+                value, compression, self.mode, self.encoding, self.errors
+            )
+        elif value == "-":
+            binfile = sys.stdin.buffer
+            compression = detect_compression(peek(binfile, HEAD_SIZE) or b"")
+            if compression is None:
+                return None
+            stream = open_decompressed(binfile, compression, "<stdin>")
+        else:
+            binfile = open(value, "rb")
+            compression = detect_compression(peek(binfile, HEAD_SIZE))
+            if compression is None:
+                binfile.close()
+                return None
+            stream = open_decompressed(
+                binfile, compression, os.fsdecode(value), on_close=binfile.close
+            )
+        if "r" in self.mode and "b" not in self.mode:
+            stream = TextIOWrapper(stream, encoding=self.encoding, errors=self.errors)
+        stream.compression = compression
+        return stream
+
+
 COMMON_CLICK_FLAGS = {
     "input_file_arg": click.argument(
-        "input_file", nargs=1, type=click.File("r"), default="-", required=False
+        "input_file", nargs=1, type=CompressedFile("r"), default="-", required=False
+    ),
+    "input_files_arg": click.argument(
+        "input_files",
+        nargs=-1,
+        type=CompressedFile("r"),
+        required=False,
+        callback=callback_default_stdin,
     ),
     "delimiter": click.option(
         "--delimiter",
@@ -53,8 +195,23 @@ COMMON_CLICK_FLAGS = {
         type=click.STRING,
         callback=callback_tab_to_str,
     ),
+    "jobs": click.option(
+        "--jobs",
+        "-j",
+        type=click.IntRange(min=1),
+        default=1,
+        show_default=True,
+        help="Parse an input file in chunks with this many processes; stdin is always read by one",
+    ),
 }
 
+# The flags one at a time, for commands that take only some of them; a decorator
+# can't subscript COMMON_CLICK_FLAGS itself before Python 3.9
+load_argument_input_file = COMMON_CLICK_FLAGS["input_file_arg"]
+load_option_delimiter = COMMON_CLICK_FLAGS["delimiter"]
+load_option_out_delimiter = COMMON_CLICK_FLAGS["out-delimiter"]
+load_option_jobs = COMMON_CLICK_FLAGS["jobs"]
+
 
 # Custom echo function that checks quiet flag from context
 def verbose_echo(message, **kwargs):
@@ -84,17 +241,37 @@ def load_quiet_option(func):
 class DefaultRichGroup(DefaultGroup, RichGroup):
     """Make `click-default-group` work with `rick-click`."""
 
+    def invoke(self, ctx):
+        try:
+            return super().invoke(ctx)
+        except DecompressionError as err:
+            # raised by whichever read of a compressed input got to the bad data
+            raise click.ClickException(str(err))
 
-def init_csv_reader(infile: TextIO, delimiter: str) -> csv.reader:
-    return csv.reader(infile, delimiter=delimiter)
 
+def current_engine() -> str:
+    """The parser engine chosen with the global --engine option"""
+    ctx = click.get_current_context(silent=True)
+    if ctx is None or not ctx.obj:
+        return DEFAULT_ENGINE
+    return ctx.obj.get("engine", DEFAULT_ENGINE)
 
-def init_csv_dict_reader(infile: TextIO, delimiter: str) -> csv.DictReader:
-    return csv.DictReader(infile, delimiter=delimiter)
+
+def mmap_input(infile: TextIO) -> bool:
+    """Whether infile should be memory-mapped: --mmap was given, and it's a regular file"""
+    ctx = click.get_current_context(silent=True)
+    enabled = bool(ctx and ctx.obj and ctx.obj.get("mmap"))
+    return enabled and is_seekable(infile)
+
+
+def init_csv_reader(infile: TextIO, delimiter: str) -> Iterator[List[str]]:
+    return timed_rows(
+        "read", read_rows(infile, delimiter=delimiter, engine=current_engine())
+    )
 
 
 def init_csv_writer(outfile: TextIO, delimiter: str) -> csv.writer:
-    return csv.writer(outfile, delimiter=delimiter)
+    return timed_writer(csv.writer(outfile, delimiter=delimiter))
 
 
 def init_csv_dict_writer(
@@ -103,6 +280,28 @@ def init_csv_dict_writer(
     return csv.DictWriter(outfile, delimiter=delimiter, fieldnames=fieldnames)
 
 
+def is_seekable(infile: TextIO) -> bool:
+    """
+    Whether infile is a regular file, which can be seeked into, rather than stdin or
+    a compressed file
+    """
+    return (
+        infile.name != "<stdin>"
+        and Path(infile.name).is_file()
+        and not is_compressed(infile)
+    )
+
+
+def chunkable_path(infile: TextIO, jobs: int) -> Optional[str]:
+    """
+    The path of infile, if it should be parsed in parallel chunks, i.e. if more than one
+    job was asked for and it's a regular file, which can be seeked into
+    """
+    if jobs > 1 and is_seekable(infile):
+        return infile.name
+    return None
+
+
 ### decorators
 def shared_csv_opts(fn):
     for oname in ("input_file_arg", "delimiter", "out-delimiter"):
@@ -112,7 +311,7 @@ def shared_csv_opts(fn):
 
 def shared_excel_opts(fn):
     for oname in (
-        "input_file_arg",
+        "input_files_arg",
         "delimiter",
     ):
         fn = COMMON_CLICK_FLAGS[oname](fn)
@@ -133,7 +332,7 @@ def load_option_output_path(output_type="text"):
             help=f"Set the path of the output file. Default is sending {output_type} to stdout.",
             required=False,
             show_default=False,
-            type=click.File(mode),
+            type=CompressedFile(mode),
         )(fn)
 
     return decorator
@@ -141,94 +340,419 @@ def load_option_output_path(output_type="text"):
 
 @click.version_option()
 @click.group(cls=DefaultRichGroup, default="excel", default_if_no_args=True)
-def cli():
-    pass
+@click.option(
+    "--engine",
+    type=click.Choice(ENGINES),
+    default=DEFAULT_ENGINE,
+    show_default=True,
+    envvar="EXCSV_ENGINE",
+    help="The CSV parser for input files: pyarrow and polars are faster on big files, "
+    "if installed, and fall back to stdlib for anything they can't parse exactly like it",
+)
+@click.option(
+    "--mmap",
+    "use_mmap",
+    is_flag=True,
+    envvar="EXCSV_MMAP",
+    help="Memory-map input files, so that slice finds rows in their raw bytes, and only "
+    "decodes and parses the rows it outputs, when there's no index",
+)
+@click.option(
+    "--profile",
+    is_flag=True,
+    help="Report how long each stage of the command took, rows/s and peak memory on stderr",
+)
+@click.option(
+    "--profile-output",
+    type=click.Path(dir_okay=False),
+    help="Write the --profile report to this JSON file instead",
+)
+@click.option(
+    "--profile-cprofile",
+    type=click.Path(dir_okay=False),
+    help="Also run the command under cProfile, and save its stats to this file, for pstats",
+)
+@click.option(
+    "--profile-tracemalloc",
+    is_flag=True,
+    help="Also trace Python memory allocations, and report their peak and biggest sources",
+)
+@click.pass_context
+def cli(
+    ctx, engine, use_mmap, profile, profile_output, profile_cprofile, profile_tracemalloc
+):
+    if not engine_is_available(engine):
+        raise click.UsageError(
+            f"The {engine} engine isn't installed. Available: {', '.join(available_engines())}"
+        )
+    ctx.ensure_object(dict)
+    ctx.obj["engine"] = engine
+    ctx.obj["mmap"] = use_mmap
+    if profile or profile_output or profile_cprofile or profile_tracemalloc:
+        start_command_profile(ctx, profile_output, profile_cprofile, profile_tracemalloc)
+
+
+def start_command_profile(
+    ctx,
+    output: Optional[str],
+    cprofile_path: Optional[str],
+    tracemalloc: bool,
+) -> None:
+    """
+    Record the spans of the command about to run, and report them when it's done,
+    on stderr, or as JSON to output
+    """
+    start_profiling(ctx.invoked_subcommand or "", tracemalloc)
+    cprofiler = None
+    if cprofile_path:
+        import cProfile
+
+        cprofiler = cProfile.Profile()
+        cprofiler.enable()
+
+    def report():
+        if cprofiler:
+            cprofiler.disable()
+            cprofiler.dump_stats(cprofile_path)
+        profile_report = stop_profiling()
+        if output:
+            import json
+
+            with open(output, "w") as outfile:
+                json.dump(profile_report, outfile, indent=2)
+        else:
+            click.echo(format_report(profile_report), err=True)
+
+    ctx.call_on_close(report)
 
 
 @cli.command()
 @shared_csv_opts
 @load_option_output_path()
-def cleanspace(input_file, output_path, delimiter, out_delimiter):
+@load_option_jobs
+@click.option(
+    "--headers-only",
+    is_flag=True,
+    help="Only clean the header row; data rows are output as they are",
+)
+@click.option(
+    "--column",
+    "-c",
+    "columns",
+    multiple=True,
+    help="Only clean this column, given by header name or 0-based number; can be repeated",
+)
+def cleanspace(
+    input_file, output_path, delimiter, out_delimiter, jobs, headers_only, columns
+):
     """
     Normalizes all whitespace as space characters, e.g. '\\r' and '\\n' are converted to ' '
     Converts all newlines into single space
     Strips whitespace from left and right
-    Affects headers and data
+    Affects headers and data, unless --headers-only or --column are given
+
+    Rows are cleaned in batches: a batch with no whitespace is passed through
+    after a single check, and the rest are translated in one call
     """
     incsv = init_csv_reader(input_file, delimiter=delimiter)
     out_csv = init_csv_writer(output_path, delimiter=out_delimiter)
-    for row in incsv:
-        for i, val in enumerate(row):
-            row[i] = clean_whitespace(val)
 
-        out_csv.writerow(row)
+    headers = next(incsv, None)
+    if headers is None:
+        return
+    column_numbers = None
+    if columns:
+        column_numbers = [column_number(headers, c) for c in columns]
+        out_csv.writerow(clean_rows([headers], column_numbers)[0])
+    else:
+        out_csv.writerow(clean_rows([headers])[0])
+    if headers_only:
+        column_numbers = []
+
+    path = chunkable_path(input_file, jobs)
+    if path:
+        from .utils.chunks import map_chunks
+
+        clean_chunk = partial(
+            _clean_chunk, delimiter=out_delimiter, columns=column_numbers
+        )
+        for text in map_chunks(
+            path, clean_chunk, delimiter, input_file.encoding, max_workers=jobs
+        ):
+            with span("write"):
+                output_path.write(text)
+        return
+
+    # each batch is written as one string, rather than a write per row
+    while batch := list(islice(incsv, CLEAN_BATCH_SIZE)):
+        with span("clean_rows", len(batch)):
+            text = _clean_chunk(batch, out_delimiter, column_numbers)
+        with span("write", len(batch)):
+            output_path.write(text)
+
+
+def column_number(headers: List[str], column: str, param_hint: str = "--column") -> int:
+    """The 0-based number of a column given by header name, cleaned or not, or number"""
+    for i, header in enumerate(headers):
+        if column in (header, clean_whitespace(header)):
+            return i
+    if column.isdigit():
+        return int(column)
+    raise click.BadParameter(f"No such column: {column}", param_hint=param_hint)
+
+
+def _clean_chunk(
+    rows: List[List[str]], delimiter: str, columns: Optional[List[int]]
+) -> str:
+    out = StringIO()
+    writer = csv.writer(out, delimiter=delimiter)
+    for start in range(0, len(rows), CLEAN_BATCH_SIZE):
+        writer.writerows(clean_rows(rows[start : start + CLEAN_BATCH_SIZE], columns))
+    return out.getvalue()
 
 
 @cli.command()
 @shared_csv_opts
 @load_option_output_path()
-def infer(input_file, output_path, delimiter, out_delimiter):
-    """
-    Infer the data types for each column
+@click.option(
+    "--sample-rows",
+    "-n",
+    type=click.IntRange(min=1),
+    help="Infer types from at most this many data rows",
+)
+@click.option(
+    "--sample-fraction",
+    type=click.FloatRange(min=0, max=1, min_open=True),
+    help="Infer types from this fraction of the data rows (or, with --sample-method blocks, of the file)",
+)
+@click.option(
+    "--sample-method",
+    type=click.Choice(["head", "reservoir", "blocks"]),
+    default="head",
+    show_default=True,
+    help="head: the leading rows. reservoir: a uniform random sample of --sample-rows rows, read from the whole input. "
+    "blocks: rows from randomly chosen blocks of the file, read by seeking; stdin falls back to reservoir",
+)
+@click.option("--seed", type=int, help="Random seed for the sampling methods")
+@click.option(
+    "--stable-rows",
+    type=click.IntRange(min=1),
+    help="Stop reading once no column's type has changed for this many rows",
+)
+@load_option_jobs
+def infer(
+    input_file,
+    output_path,
+    delimiter,
+    out_delimiter,
+    sample_rows,
+    sample_fraction,
+    sample_method,
+    seed,
+    stable_rows,
+    jobs,
+):
     """
+    Infer the data types for each column, i.e. one of:
+    null (all values blank), int, float, bool, date (YYYY-MM-DD), str
 
-    incsv = init_csv_dict_reader(input_file, delimiter=delimiter)
+    Reading stops as soon as every column has been inferred as str. When rows are
+    sampled, or reading stops early with --stable-rows, the output also reports how
+    many values were checked in each column, and a confidence for its type
 
-    inferred = infer_column_types(incsv)
-    outs = [["fieldname", "datatype"]]
-    for key, val in inferred.items():
-        outs.append([key, val])
+    With --jobs, a whole file (no sampling or --stable-rows) is read in parallel chunks
+    """
+    sampling = (
+        sample_rows is not None
+        or sample_fraction is not None
+        or sample_method != "head"
+    )
+    if sample_method == "reservoir" and sample_rows is None:
+        raise click.UsageError("--sample-method reservoir requires --sample-rows")
+
+    rng = random.Random(seed)
+    if sample_method == "blocks" and is_seekable(input_file):
+        with open(input_file.name, "rb") as binfile:
+            headers, _ = read_header(binfile, delimiter, input_file.encoding)
+            rows = block_sample(
+                binfile,
+                rng,
+                max_rows=sample_rows,
+                fraction=sample_fraction,
+                delimiter=delimiter,
+                encoding=input_file.encoding,
+            )
+            with span("scan_column_types"):
+                column_types, complete = scan_column_types(
+                    rows, column_count=len(headers), stable_rows=stable_rows
+                )
+    elif not sampling and stable_rows is None and chunkable_path(input_file, jobs):
+        from .utils.chunks import map_chunks
+
+        headers = next(init_csv_reader(input_file, delimiter=delimiter), [])
+        column_types, complete = ColumnTypes(len(headers)), True
+        # chunks are merged as soon as they're done, to stop once every column is str
+        with span("map_chunks"):
+            for chunk_types in map_chunks(
+                input_file.name,
+                chunk_column_types,
+                delimiter,
+                input_file.encoding,
+                max_workers=jobs,
+                ordered=False,
+            ):
+                column_types.merge(chunk_types)
+                if column_types.settled:
+                    break
+    else:
+        incsv = init_csv_reader(input_file, delimiter=delimiter)
+        headers = next(incsv, [])
+        rows = incsv
+        if sample_fraction is not None:
+            rows = bernoulli_sample(rows, sample_fraction, rng)
+        if sample_method == "head" and sample_rows is not None:
+            rows = islice(rows, sample_rows)
+        elif sample_method != "head" and sample_rows is not None:
+            rows = reservoir_sample(rows, sample_rows, rng)
+        with span("scan_column_types"):
+            column_types, complete = scan_column_types(
+                rows, column_count=len(headers), stable_rows=stable_rows
+            )
+
+    report_confidence = sampling or stable_rows is not None
+    if report_confidence:
+        outs = [["fieldname", "datatype", "values_checked", "confidence"]]
+    else:
+        outs = [["fieldname", "datatype"]]
+    for ix, val in enumerate(column_types.types):
+        # rows can be longer than the header, those columns have no fieldname
+        key = headers[ix] if ix < len(headers) else ""
+        if report_confidence:
+            confidence = 1.0 if complete and not sampling else column_types.confidence(ix)
+            outs.append(
+                [key, val, column_types.value_counts[ix], f"{confidence:.4f}"]
+            )
+        else:
+            outs.append([key, val])
 
     out_csv = init_csv_writer(output_path, delimiter=out_delimiter)
     for row in outs:
         out_csv.writerow(row)
 
 
+def load_option_save_state(fn):
+    return click.option(
+        "--save-state",
+        type=click.File("wb"),
+        help="Also save the full profiling state to this file, to merge with later",
+    )(fn)
+
+
+def write_profiles(profiles: List["ColumnProfile"], outfile: TextIO, delimiter: str):
+    out_data = [profile.to_dict() for profile in profiles]
+    if not out_data:
+        return
+
+    out_headers = out_data[0].keys()
+    outcsv = init_csv_dict_writer(outfile, delimiter=delimiter, fieldnames=out_headers)
+    outcsv.writeheader()
+    outcsv.writerows(out_data)
+
+
 @cli.command()
 @shared_csv_opts
 @load_option_output_path()
-def probe(input_file, output_path, delimiter, out_delimiter):
-
-    incsv = init_csv_dict_reader(input_file, delimiter=delimiter)
-    row_count = 0
-    headers = incsv.fieldnames
-    # col_count = len(headers)
-
-    column_metadata = {
-        header: {
-            "name": header,
-            "position": i,
-            "blanks": 0,
-            "cardinality": HyperLogLog(0.01),
-        }
-        for i, header in enumerate(headers)
-    }
-
-    # Process each row
-    for row in incsv:
-        row_count += 1
-
-        for header, value in row.items():
-            column_metadata[header]["cardinality"].add(value)
-            if value in [
-                "",
-            ]:  # Define other criteria for blank or N/A as needed
-                column_metadata[header]["blanks"] += 1
-
-    # error_console.print(f"Number of rows: {row_count}")
-    # error_console.print(f"Number of columns: {col_count}")
-
-    out_data = []
-    for col in column_metadata.values():
-        col["cardinality"] = len(col["cardinality"])
-        out_data.append(col)
+@load_option_save_state
+@click.option(
+    "--merge-state",
+    type=click.File("rb"),
+    multiple=True,
+    help="Merge in the saved state of an earlier probe of the same columns, e.g. of rows since appended to",
+)
+@load_option_jobs
+def probe(
+    input_file, output_path, delimiter, out_delimiter, save_state, merge_state, jobs
+):
+    """
+    Profile each column in one pass: blanks, cardinality, min and max,
+    value lengths, most common value, and quartiles of numeric values
 
-    out_headers = out_data[0].keys()
-    outcsv = init_csv_dict_writer(
-        output_path, delimiter=out_delimiter, fieldnames=out_headers
+    Memory use depends on the number of columns, not rows: cardinality, most common
+    values and quartiles are estimated with HyperLogLog, Space-Saving and KLL sketches
+
+    The sketches can be merged: --save-state saves them, and --merge-state or the
+    probe-merge command combine the states of separate shards or appends of the data.
+    With --jobs, chunks of a file are profiled in parallel and merged the same way
+    """
+    from .utils.profile import (
+        ColumnProfile,
+        dump_profiles,
+        load_profiles,
+        merge_profiles,
+        profile_rows,
     )
-    outcsv.writeheader()
-    outcsv.writerows(out_data)
+
+    incsv = init_csv_reader(input_file, delimiter=delimiter)
+    headers = next(incsv, [])
+
+    path = chunkable_path(input_file, jobs)
+    if path:
+        from .utils.chunks import map_chunks
+
+        # each chunk is profiled by a worker, and the profiles' sketches are merged
+        profiles = [ColumnProfile(header, i) for i, header in enumerate(headers)]
+        with span("map_chunks"):
+            for chunk_profiles in map_chunks(
+                path,
+                partial(profile_rows, headers),
+                delimiter,
+                input_file.encoding,
+                max_workers=jobs,
+                ordered=False,
+            ):
+                merge_profiles(profiles, chunk_profiles)
+    else:
+        with span("profile_rows"):
+            profiles = profile_rows(headers, incsv)
+
+    for state_file in merge_state:
+        try:
+            merge_profiles(profiles, load_profiles(state_file))
+        except ValueError as err:
+            raise click.BadParameter(str(err), param_hint="--merge-state")
+
+    if save_state:
+        with span("dump_profiles"):
+            dump_profiles(profiles, save_state)
+    write_profiles(profiles, output_path, out_delimiter)
+
+
+@cli.command()
+@click.argument("state_files", nargs=-1, required=True, type=click.File("rb"))
+@load_option_out_delimiter
+@load_option_output_path()
+@load_option_save_state
+def probe_merge(state_files, out_delimiter, output_path, save_state):
+    """
+    Merge the saved states of probes of the same columns, e.g. of shards of a file that
+    were probed in parallel, and output their combined profile
+
+        excsv probe part1.csv --save-state part1.probe -o /dev/null
+        excsv probe part2.csv --save-state part2.probe -o /dev/null
+        excsv probe-merge part1.probe part2.probe
+    """
+    from .utils.profile import dump_profiles, load_profiles, merge_profiles
+
+    try:
+        profiles = load_profiles(state_files[0])
+        for state_file in state_files[1:]:
+            merge_profiles(profiles, load_profiles(state_file))
+    except ValueError as err:
+        raise click.BadParameter(str(err), param_hint="STATE_FILES")
+
+    if save_state:
+        dump_profiles(profiles, save_state)
+    write_profiles(profiles, output_path, out_delimiter)
 
 
 @cli.command()
@@ -242,7 +766,8 @@ def probe(input_file, output_path, delimiter, out_delimiter):
         "0",
     ],
     multiple=True,
-    help="0-based row numbers to include in slice, can be either integer or integer range e.g. 1,42,6-20",
+    help="0-based row numbers to include in slice, can be either integer or integer range e.g. 1,42,6-20; "
+    "a range can be open-ended, e.g. 100-, or have a step, e.g. 0-1000:10; negative numbers count from the end, e.g. -1",
 )
 def slice(index, input_file, output_path, delimiter, out_delimiter):
     """
@@ -256,20 +781,26 @@ def slice(index, input_file, output_path, delimiter, out_delimiter):
 
         is equivalent to:
         excsv slice -i 4 -i 5 -i 6 -i 7 -i 8 -i 9 -i 10  input.csv
+
+    Ranges can leave out their end, to go to the last row, and take a step, e.g.
+        excsv slice -i 100- -i 0-99:10 input.csv
+
+    Negative numbers count from the end, like Python's, e.g. the last row, and the
+    last 10 rows:
+        excsv slice -i -1 input.csv
+        excsv slice -i -10- input.csv
+
+    Reading stops as soon as the last row asked for has been output. Rows counted
+    from the end of a file are read backwards from its end. With the global --mmap,
+    a file is scanned for rows in its raw bytes, and only the rows that are output
+    are decoded and parsed
     """
 
     # parse indices
-    index_numbers = []
-    for ival in index:
-        if re.match(r"^\d+$", ival):
-            index_numbers.append(int(ival))
-        elif rx := re.match(r"^(\d+)-(\d+)$", ival):
-            _a, _b = (int(i) for i in rx.groups())
-            index_numbers.extend(list(range(_a, _b + 1)))
-        else:
-            raise click.UsageError(f"Invalid --index value: {ival}")
-
-    index_numbers.sort()  # = sorted([int(i) for i in indices])
+    try:
+        index_numbers = IndexSet.parse(index)
+    except ValueError as err:
+        raise click.UsageError(str(err))
 
     incsv = init_csv_reader(input_file, delimiter=delimiter)
     headers = next(incsv)
@@ -278,25 +809,156 @@ def slice(index, input_file, output_path, delimiter, out_delimiter):
 
     out_csv.writerow(headers)
 
-    for i, line in slice_input(incsv, index_numbers):
+    row_index = open_row_index(input_file, delimiter)
+    # rows counted from the end are read backwards, below, faster than the whole
+    # file can be scanned for them
+    if row_index is None and not index_numbers.only_from_end and mmap_input(input_file):
+        row_index = MappedRows(input_file.name, delimiter)
+    if row_index:
+        with row_index:
+            if index_numbers.tail_size:
+                index_numbers = index_numbers.resolve(row_index.row_count)
+            for i, line in row_index.read_rows(
+                index_numbers, delimiter, input_file.encoding
+            ):
+                out_csv.writerow(line)
+        return
+
+    if not index_numbers.tail_size:
+        lines = slice_input(incsv, index_numbers)
+    elif is_seekable(input_file) and index_numbers.only_from_end:
+        # only rows counted from the end, which can be read backwards
+        with open(input_file.name, "rb") as binfile:
+            tail = tail_rows(
+                binfile, index_numbers.tail_size, delimiter, input_file.encoding
+            )
+        lines = slice_input(tail, index_numbers.resolve(len(tail)))
+    else:
+        lines = slice_input_from_end(incsv, index_numbers)
+
+    for i, line in lines:
         out_csv.writerow(line)
 
 
-if __name__ == "__main__":
-    cli()
-
-
 @cli.command()
 @shared_csv_opts
 @load_option_output_path()
-def transpose(input_file, output_path, delimiter, out_delimiter):
+@click.option(
+    "--rows",
+    "-n",
+    type=click.IntRange(min=0),
+    default=10,
+    show_default=True,
+    help="Number of rows to output",
+)
+def tail(input_file, output_path, delimiter, out_delimiter, rows):
     """
-    Returns a transposed version of the CSV file
+    Output the header and the last rows of a CSV
+
+    A file is read backwards from its end, so it takes about as long to tail a huge file
+    as a small one. stdin is read through, keeping only the last rows in memory
     """
     incsv = init_csv_reader(input_file, delimiter=delimiter)
+    headers = next(incsv, [])
+
     out_csv = init_csv_writer(output_path, delimiter=out_delimiter)
+    out_csv.writerow(headers)
+
+    row_index = open_row_index(input_file, delimiter)
+    if row_index:
+        with row_index:
+            start = max(row_index.row_count - rows, 0)
+            out_csv.writerows(
+                line
+                for i, line in row_index.read_rows(
+                    range(start, row_index.row_count), delimiter, input_file.encoding
+                )
+            )
+    elif is_seekable(input_file):
+        with open(input_file.name, "rb") as binfile:
+            out_csv.writerows(
+                tail_rows(binfile, rows, delimiter, input_file.encoding)
+            )
+    else:
+        out_csv.writerows(deque(incsv, maxlen=rows))
+
+
+def open_row_index(input_file: TextIO, delimiter: str = ","):
+    """
+    The RowIndex of input_file, if it's a file with an up-to-date sidecar index
+    built by `excsv index` for the same delimiter
+    """
+    if not is_seekable(input_file):
+        return None
+    row_index = load_index(input_file.name, delimiter=delimiter)
+    if row_index is None and default_index_path(input_file.name).exists():
+        error_console.print(
+            f"{default_index_path(input_file.name)} is out of date, or for another "
+            "delimiter, reading without it. Rebuild it with: excsv index"
+        )
+    return row_index
+
+
+@cli.command()
+@click.argument("input_path", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--index-path",
+    type=click.Path(dir_okay=False),
+    help="Where to write the index. Default is INPUT_PATH.idx",
+)
+@click.option(
+    "--check",
+    is_flag=True,
+    help="Instead of building the index, check that the existing one matches the file's checksum",
+)
+@load_option_delimiter
+def index(input_path, index_path, check, delimiter):
+    """
+    Build a sidecar index of the byte offset of every row in a CSV file, so that
+    slice, head and tail can seek straight to the rows they need
+
+        excsv index data.csv   # writes data.csv.idx
 
+    The index records the file's size, modification time and checksum: if the
+    file changes, the index is ignored until it's rebuilt
+    """
+    index_path = index_path or default_index_path(input_path)
+    if check:
+        row_index = load_index(input_path, index_path, delimiter)
+        if row_index is None:
+            raise click.ClickException(f"{index_path} is missing or out of date")
+        with row_index:
+            if row_index.crc32 != file_crc32(input_path):
+                raise click.ClickException(
+                    f"{index_path} doesn't match the checksum of {input_path}"
+                )
+            error_console.print(f"{index_path} is up to date: {row_index.row_count} rows")
+        return
+
+    with span("build_index"):
+        row_count = build_index(input_path, index_path, delimiter)
+    error_console.print(f"Indexed {row_count} rows of {input_path} in {index_path}")
+
+
+@cli.command()
+@shared_csv_opts
+@load_option_output_path()
+@click.option(
+    "--max-memory",
+    type=click.IntRange(min=1),
+    default=256,
+    show_default=True,
+    help="Megabytes of rows to hold in memory; bigger inputs are transposed through temporary spill files",
+)
+@click.option(
+    "--temp-dir",
+    type=click.Path(file_okay=False, exists=True),
+    help="Directory for the spill files. Default is the system's temporary directory",
+)
+def transpose(input_file, output_path, delimiter, out_delimiter, max_memory, temp_dir):
     """
+    Returns a transposed version of the CSV file
+
     Converts:
         [                         to:      [
             ["name", "region"],               ["name", "Alice", "Bob", "Chaz"],
@@ -305,10 +967,245 @@ def transpose(input_file, output_path, delimiter, out_delimiter):
             ["Chaz", "South"],
 
         ]
+
+    Files too big to fit in --max-memory are transposed a batch at a time into spill
+    files, which are removed afterwards
     """
+    incsv = init_csv_reader(input_file, delimiter=delimiter)
+    with span("transpose_rows"):
+        transpose_rows(
+            incsv,
+            output_path,
+            delimiter=out_delimiter,
+            max_memory=max_memory * 1024 * 1024,
+            temp_dir=temp_dir,
+        )
+
+
+def parse_column_types(headers: List[str], values: List[str]) -> Dict[int, str]:
+    """Parse --type values, e.g. ["age:int", "3:date"], into column numbers and types"""
+    column_types = {}
+    for value in values:
+        column, _, type_name = value.rpartition(":")
+        if not column or type_name not in VALIDATE_TYPES:
+            raise click.BadParameter(
+                f"Expected COLUMN:TYPE, with TYPE one of {', '.join(VALIDATE_TYPES)}; got {value}",
+                param_hint="--type",
+            )
+        column_types[column_number(headers, column, "--type")] = type_name
+    return column_types
 
-    for row in zip(*incsv):
-        out_csv.writerow(row)
+
+VALIDATE_TYPES = ("int", "float", "bool", "date", "str")
+
+
+@cli.command()
+@click.argument("input_file", type=CompressedFile("rb"), default="-", required=False)
+@load_option_delimiter
+@load_option_out_delimiter
+@load_option_output_path()
+@click.option(
+    "--encoding",
+    default="utf-8",
+    show_default=True,
+    help="The input's encoding; bytes that aren't valid in it are reported",
+)
+@click.option(
+    "--type",
+    "-t",
+    "types",
+    multiple=True,
+    help="Declare a column's type, as COLUMN:TYPE, e.g. age:int; COLUMN is a name or number",
+)
+@click.option(
+    "--max-errors",
+    type=click.IntRange(min=1),
+    help="Stop after this many violations",
+)
+def validate(
+    input_file, delimiter, out_delimiter, output_path, encoding, types, max_errors
+):
+    """
+    Check that a CSV is a valid data table, in one pass, and output each violation
+    as a row: row,column,rule,message
+
+    Rules: header (there's a header row, with unique names that don't look like
+    values), field_count (every row has as many values as the header), encoding
+    (no invalid bytes), control_char (no control characters other than tab and
+    newlines), and type (values of the columns declared with --type match it)
+
+    Rows are numbered as in a spreadsheet, i.e. the header is row 1. Violations are
+    written as they're found, and memory use doesn't grow with the size of the input.
+    Exits with status 1 if there are any violations
+    """
+    import codecs
+
+    try:
+        codecs.lookup(encoding)
+    except LookupError:
+        raise click.BadParameter(f"Unknown encoding: {encoding}", param_hint="--encoding")
+    text = TextIOWrapper(input_file, encoding=encoding, errors=DECODE_ERRORS, newline="")
+    incsv = timed_rows("read", csv.reader(text, delimiter=delimiter))
+    headers = next(incsv, [])
+    column_types = parse_column_types(headers, types)
+
+    out_csv = init_csv_writer(output_path, delimiter=out_delimiter)
+    out_csv.writerow(["row", "column", "rule", "message"])
+
+    violations = chain(validate_header(headers), validate_rows(incsv, headers, column_types))
+    count = 0
+    with span("validate_rows"):
+        for count, violation in enumerate(violations, 1):
+            out_csv.writerow(violation)
+            # so that violations can be watched as they come in, on a big file
+            if count % 1000 == 0:
+                output_path.flush()
+            if count == max_errors:
+                error_console.print(f"Stopped after {count} violations (--max-errors)")
+                break
+
+    if count:
+        sys.exit(1)
+
+
+LITMUS_TYPES = ("int", "float", "bool", "date")
+
+
+def parse_litmus_rules(
+    headers: List[str], types: List[str], patterns: List[str], not_null: List[str]
+) -> List[Tuple[int, "Rule"]]:
+    """
+    Parse the rule options of litmus, e.g. --type age:int, --match 'zip:^\\d{5}$' and
+    --not-null id, into column numbers and rules
+    """
+    from .utils.litmus import NotNullRule, PatternRule, TypeRule
+
+    rules = []
+    for value in types:
+        column, _, type_name = value.rpartition(":")
+        if not column or type_name not in LITMUS_TYPES:
+            raise click.BadParameter(
+                f"Expected COLUMN:TYPE, with TYPE one of {', '.join(LITMUS_TYPES)}; got {value}",
+                param_hint="--type",
+            )
+        rules.append((column_number(headers, column, "--type"), TypeRule(type_name)))
+    for value in patterns:
+        # the pattern can have colons in it, so the column is everything before the first
+        column, _, pattern = value.partition(":")
+        if not column or not pattern:
+            raise click.BadParameter(
+                f"Expected COLUMN:REGEX; got {value}", param_hint="--match"
+            )
+        try:
+            rule = PatternRule(pattern)
+        except re.error as err:
+            raise click.BadParameter(
+                f"Invalid regex {pattern!r}: {err}", param_hint="--match"
+            )
+        rules.append((column_number(headers, column, "--match"), rule))
+    for column in not_null:
+        rules.append((column_number(headers, column, "--not-null"), NotNullRule()))
+    return rules
+
+
+@cli.command()
+@shared_csv_opts
+@load_option_output_path()
+@click.option(
+    "--type",
+    "-t",
+    "types",
+    multiple=True,
+    help="Values of a column have to be castable to a type, as COLUMN:TYPE, e.g. age:int",
+)
+@click.option(
+    "--match",
+    "-m",
+    "patterns",
+    multiple=True,
+    help="Values of a column have to match a regex, as COLUMN:REGEX, e.g. 'zip:^\\d{5}$'",
+)
+@click.option(
+    "--not-null",
+    "-n",
+    "not_null",
+    multiple=True,
+    help="Values of a column can't be blank",
+)
+@click.option(
+    "--summary",
+    is_flag=True,
+    help="Output each rule's rows, nulls and failures, instead of the failing values",
+)
+def litmus(
+    input_file, delimiter, out_delimiter, output_path, types, patterns, not_null, summary
+):
+    """
+    Check columns against rules, all of them in a single pass, and output each value
+    that fails one: row,column,rule,value
+
+    Rules can be given any number of times, for any columns: --type (int, float, bool
+    or date), --match (a regex, searched for in each value, so ^ and $ anchor it to
+    the whole value) and --not-null. Blank values only fail --not-null. COLUMN is a
+    name or number.
+
+    With --summary, outputs each rule's column,rule,rows,nulls,failures instead,
+    where nulls is the number of blank values in the column. Exits with status 1 if
+    any value fails a rule
+    """
+    from .utils.litmus import Litmus
+
+    incsv = init_csv_reader(input_file, delimiter=delimiter)
+    headers = next(incsv, [])
+    rules = parse_litmus_rules(headers, types, patterns, not_null)
+    if not rules:
+        raise click.UsageError("Give at least one rule: --type, --match or --not-null")
+    checker = Litmus(headers, rules)
+
+    out_csv = init_csv_writer(output_path, delimiter=out_delimiter)
+    failures = 0
+    with span("litmus"):
+        if summary:
+            checker.count(incsv)
+            failures = sum(checker.failures.values())
+            out_csv.writerow(["column", "rule", "rows", "nulls", "failures"])
+            out_csv.writerows(checker.summary())
+        else:
+            out_csv.writerow(["row", "column", "rule", "value"])
+            for failures, failure in enumerate(checker.check(incsv), 1):
+                out_csv.writerow(failure)
+
+    if failures:
+        sys.exit(1)
+
+
+@cli.command()
+@load_argument_input_file
+@load_option_output_path()
+@load_option_delimiter
+@load_option_jobs
+def count(input_file, output_path, delimiter, jobs):
+    """
+    Output the number of data rows in a CSV, i.e. not counting the header
+
+    Records are counted in the raw bytes, without parsing them, in memory that
+    doesn't depend on the size of the input; quoted fields are tracked like
+    csv.reader does, so newlines in them don't count. With --jobs, chunks of a file
+    are counted in parallel. The encoding has to be ASCII-compatible, e.g. UTF-8 or
+    Latin-1
+    """
+    path = chunkable_path(input_file, jobs)
+    with span("count_records"):
+        if path:
+            from .utils.chunks import count_chunks
+
+            total = count_chunks(path, max_workers=jobs, delimiter=delimiter)
+        elif mmap_input(input_file):
+            with mapped_file(input_file.name) as data:
+                total = count_records(buffer_blocks(data), delimiter)
+        else:
+            total = count_records(read_blocks(input_file.buffer), delimiter)
+    output_path.write(f"{max(total.records - 1, 0)}\n")
 
 
 @cli.command()
@@ -318,10 +1215,11 @@ def testread(input_file, delimiter, out_delimiter, output_path):
 
     incsv = init_csv_reader(input_file, delimiter=delimiter)
 
-    data = list(incsv)
+    headers = next(incsv, [])
+    row_count = sum(1 for _ in incsv) + bool(headers)
 
-    output_path.write(f"Number of rows: {len(data)}\n")
-    output_path.write(f"Number of cols: {len(data[0])}\n")
+    output_path.write(f"Number of rows: {row_count}\n")
+    output_path.write(f"Number of cols: {len(headers)}\n")
 
 
 @cli.command()
@@ -330,27 +1228,99 @@ def testread(input_file, delimiter, out_delimiter, output_path):
 @click.option(
     "--output-path",
     "-o",
-    help=f"Set the path of the output Excel file. Default is [input_file].xlsx",
+    help=f"Set the path of the output Excel file. Default is [input_file].xlsx. Use '-' to write to stdout",
     required=False,
-    #        type=click.File('wb'),
-    type=click.Path(dir_okay=False, path_type=Path, resolve_path=True),
+    type=click.Path(dir_okay=False, path_type=Path, resolve_path=True, allow_dash=True),
+)
+@click.option(
+    "--sheet-name",
+    "-s",
+    multiple=True,
+    help="Name of the sheet for each input file, in order. Default is the input filename",
 )
-def excel(input_file, output_path, delimiter):
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=1),
+    help="Number of worker processes to use when converting multiple input files. Default is the number of CPUs",
+)
+@click.option(
+    "--infer-types/--no-infer-types",
+    default=True,
+    show_default=True,
+    help="Write columns of numbers, booleans and ISO dates as native Excel values instead of text",
+)
+def excel(input_files, output_path, delimiter, sheet_name, jobs, infer_types):
     """
     Convert a CSV into a friendly readable Excel file
+
+    Multiple CSVs are converted into one workbook, with one sheet per CSV:
+
+        excsv excel a.csv b.csv -s Alpha -s Beta -o ab.xlsx
     """
-    incsv = init_csv_reader(input_file, delimiter=delimiter)
-    outbytes = csv_to_workbook(incsv)
+    from .utils.excel import (
+        check_sheet_title,
+        csv_to_workbook,
+        csvs_to_workbook,
+        sheet_title_from_name,
+    )
+
+    if len(sheet_name) > len(input_files):
+        raise click.UsageError(
+            f"Got {len(sheet_name)} --sheet-name values for {len(input_files)} input files"
+        )
+    for title in sheet_name:
+        try:
+            check_sheet_title(title)
+        except ValueError as err:
+            raise click.BadParameter(str(err), param_hint="--sheet-name")
+    sheet_titles = list(sheet_name) + [
+        "stdin" if f.name == "<stdin>" else sheet_title_from_name(f.name)
+        for f in input_files[len(sheet_name) :]
+    ]
+    # Excel titles are case-insensitive; titles that both come from file names are
+    # told apart by openpyxl, which numbers the later one
+    folded = [title.casefold() for title in sheet_titles]
+    for ix, title in enumerate(sheet_name):
+        if folded.count(folded[ix]) > 1:
+            raise click.BadParameter(
+                f"Duplicate sheet title: {title!r}", param_hint="--sheet-name"
+            )
+
+    input_file = input_files[0]
     if not output_path:
         output_path = (
             f"{input_file.name}.xlsx" if input_file.name != "<stdin>" else "stdin.xlsx"
         )
+    if str(output_path) == "-":
+        output = click.get_binary_stream("stdout")
+    else:
+        output = output_path
+
+    if len(input_files) == 1:
+        incsv = init_csv_reader(input_file, delimiter=delimiter)
+        csv_to_workbook(
+            incsv, output=output, sheet_title=sheet_titles[0], infer_types=infer_types
+        )
+    else:
+        # the files are reopened by path, in the workers, as they were opened here
+        paths = [f for f in input_files if is_seekable(f)]
+        csvs_to_workbook(
+            [f.name if is_seekable(f) else f for f in input_files],
+            sheet_titles,
+            output=output,
+            delimiter=delimiter,
+            max_workers=jobs,
+            infer_types=infer_types,
+            encoding=paths[0].encoding if paths else None,
+            errors=paths[0].errors if paths else "strict",
+        )
 
-    with open(output_path, "wb") as wfile:
-        wfile.write(outbytes.getvalue())
-
-    verbose_echo(f"Wrote Excel file to:")
-    verbose_echo(click.format_filename(output_path))
+    if output is output_path:
+        verbose_echo(f"Wrote Excel file to:")
+        verbose_echo(click.format_filename(output_path))
+    else:
+        verbose_echo(f"Wrote Excel file to stdout")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,183 @@
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from functools import reduce
+from itertools import repeat
+import os
+from typing import Any, BinaryIO, Callable, Iterator, List, Optional
+
+from .records import (
+    RecordCount,
+    count_block,
+    count_records,
+    iter_record_ends,
+    parse_records,
+    read_blocks,
+    split_offset,
+)
+from .rowindex import mapped_file
+from .sampling import read_header
+
+
+# Byte size of the chunks parsed by each worker
+CHUNK_SIZE = 8 * 1024 * 1024
+
+# Byte size of the chunks counted by each worker, which is much faster than parsing
+COUNT_CHUNK_SIZE = 64 * 1024 * 1024
+
+# Bytes looked at, at a time, for where to split a file between two chunks
+SPLIT_WINDOW = 4096
+
+
+def record_boundaries(
+    data: bytes, start: int, chunk_size: int = CHUNK_SIZE, delimiter: str = ","
+) -> List[int]:
+    """
+    Returns the offsets of record starts about every chunk_size bytes of data, e.g. a
+    memory-mapped file, from `start`, which has to be a record start, to its end,
+    which is always the last one
+
+    Whether a split point is inside a quoted field is found by scanning up to it
+    from the previous record start, which runs at close to memory speed, much faster
+    than parsing, so a newline in a quoted field is never mistaken for a record
+    boundary.
+
+    Split points are looked for at newline bytes, so the encoding has to be
+    ASCII-compatible, e.g. UTF-8 or Latin-1
+    """
+    boundaries = [start]
+    size = len(data)
+    pos = start
+    while pos + chunk_size < size:
+        target = split_offset(data, pos + chunk_size)
+        in_quotes = count_block(data, pos, target, delimiter).quoted_if_outside
+        end = next(iter_record_ends(data, target, None, in_quotes, delimiter), None)
+        if end is None:
+            break
+        boundaries.append(end)
+        pos = end
+
+    if boundaries[-1] < size:
+        boundaries.append(size)
+    return boundaries
+
+
+def read_chunk(
+    path: str, lo: int, hi: int, delimiter: str = ",", encoding: str = "utf-8"
+) -> List[List[str]]:
+    """Parse the records in the byte range [lo, hi) of a file"""
+    with open(path, "rb") as binfile:
+        binfile.seek(lo)
+        data = binfile.read(hi - lo)
+    return list(parse_records(data, delimiter, encoding))
+
+
+def map_chunks(
+    path: str,
+    fn: Callable[[List[List[str]]], Any],
+    delimiter: str = ",",
+    encoding: str = "utf-8",
+    max_workers: Optional[int] = None,
+    chunk_size: int = CHUNK_SIZE,
+    ordered: bool = True,
+) -> Iterator[Any]:
+    """
+    Split the data rows of a CSV file, after its header, into chunks of about chunk_size
+    bytes, which are parsed and passed to fn in a pool of processes; yields fn's
+    results, in file order if `ordered`, otherwise as soon as each is done
+
+    fn has to be picklable, i.e. a module-level function or a functools.partial of one.
+    Doing the work on the rows in fn, and returning something smaller, e.g. a summary
+    or the output text, avoids sending every parsed row back between processes.
+
+    Only a few chunks per worker are in flight at once, so memory stays bounded when the
+    consumer is slow. If the consumer stops early, chunks that haven't started are cancelled.
+    """
+    with open(path, "rb") as binfile:
+        _, data_start = read_header(binfile, delimiter, encoding)
+    with mapped_file(path) as data:
+        boundaries = record_boundaries(data, data_start, chunk_size, delimiter)
+    ranges = iter(zip(boundaries, boundaries[1:]))
+
+    max_workers = max_workers or os.cpu_count() or 1
+    pool = ProcessPoolExecutor(max_workers)
+    pending = deque()
+
+    def submit_next() -> bool:
+        lo_hi = next(ranges, None)
+        if lo_hi is None:
+            return False
+        pending.append(pool.submit(_map_chunk, path, *lo_hi, fn, delimiter, encoding))
+        return True
+
+    try:
+        for _ in range(2 * max_workers):
+            if not submit_next():
+                break
+        while pending:
+            if ordered:
+                future = pending.popleft()
+            else:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                future = done.pop()
+                pending.remove(future)
+            result = future.result()
+            submit_next()
+            yield result
+    finally:
+        for future in pending:
+            future.cancel()
+        pool.shutdown(wait=True)
+
+
+def _map_chunk(
+    path: str,
+    lo: int,
+    hi: int,
+    fn: Callable[[List[List[str]]], Any],
+    delimiter: str,
+    encoding: str,
+) -> Any:
+    return fn(read_chunk(path, lo, hi, delimiter, encoding))
+
+
+def count_chunks(
+    path: str,
+    max_workers: Optional[int] = None,
+    chunk_size: int = COUNT_CHUNK_SIZE,
+    delimiter: str = ",",
+) -> RecordCount:
+    """
+    Count the records of a file in chunks of about chunk_size bytes, in a pool of
+    processes
+
+    Chunks are split at about any byte, rather than at record boundaries, since each
+    one is counted both as if it starts inside a quoted field and as if it doesn't;
+    putting the counts together in file order picks the right one for each, exactly
+    """
+    size = os.path.getsize(path)
+    with open(path, "rb") as binfile:
+        splits = sorted(
+            {split_point(binfile, pos) for pos in range(chunk_size, size, chunk_size)}
+        )
+    bounds = [0] + [pos for pos in splits if pos < size] + [size]
+    with ProcessPoolExecutor(max_workers or os.cpu_count() or 1) as pool:
+        counts = pool.map(_count_chunk, repeat(path), bounds, bounds[1:], repeat(delimiter))
+        return reduce(RecordCount.then, counts, RecordCount())
+
+
+def split_point(binfile: BinaryIO, pos: int) -> int:
+    """The first offset of a file from pos, at least 1, that split_offset() allows"""
+    while True:
+        binfile.seek(pos - 1)
+        window = binfile.read(SPLIT_WINDOW)
+        offset = split_offset(window, 1)
+        if offset < len(window) or len(window) < SPLIT_WINDOW:
+            return pos - 1 + offset
+        pos += len(window) - 1
+
+
+def _count_chunk(path: str, lo: int, hi: int, delimiter: str) -> RecordCount:
+    with open(path, "rb") as binfile:
+        binfile.seek(max(lo - 1, 0))
+        before = binfile.read(1) if lo else b""
+        return count_records(read_blocks(binfile, hi - lo), delimiter, before)
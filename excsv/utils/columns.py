@@ -0,0 +1,71 @@
+from itertools import islice
+from operator import itemgetter
+from typing import Iterable, Iterator, List, Sequence
+
+
+# Rows per batch handed to the per-column accumulators
+BATCH_SIZE = 10000
+
+
+class ColumnBatches:
+    """
+    Rows of data, without their header, read in batches of batch_size and turned into
+    columns, so that each column's values can be handed to its accumulator at once,
+    instead of looking up every value of every row, e.g. in a dict
+
+    Every batch has exactly `width` columns, which starts out as the number of headers.
+    Ragged rows are handled explicitly: short rows are padded with blanks, and values
+    past the last column are dropped, unless `extra_columns`, in which case the width
+    grows to fit the longest row so far. Either way, rows with fewer or more values
+    than there are headers are counted, in short_rows and long_rows.
+    """
+
+    def __init__(
+        self,
+        rows: Iterable[List[str]],
+        width: int,
+        batch_size: int = BATCH_SIZE,
+        extra_columns: bool = False,
+    ):
+        self.rows = iter(rows)
+        self.header_count = width
+        self.width = width
+        self.batch_size = batch_size
+        self.extra_columns = extra_columns
+        self.row_count = 0
+        self.short_rows = 0
+        self.long_rows = 0
+
+    def __iter__(self) -> Iterator[List[Sequence[str]]]:
+        while batch := list(islice(self.rows, self.batch_size)):
+            yield self.columns(batch)
+
+    def columns(self, batch: List[List[str]]) -> List[Sequence[str]]:
+        """Turn a batch of rows into self.width columns"""
+        if not batch:
+            return [()] * self.width
+        self.row_count += len(batch)
+        lengths = set(map(len, batch))
+        if lengths == {self.header_count} and self.width == self.header_count:
+            return list(zip(*batch))
+
+        self.short_rows += sum(1 for row in batch if len(row) < self.header_count)
+        self.long_rows += sum(1 for row in batch if len(row) > self.header_count)
+        if self.extra_columns:
+            self.width = max(self.width, max(lengths))
+        width = self.width
+        padding = [""] * width
+        return list(
+            zip(*(row if len(row) == width else (row + padding)[:width] for row in batch))
+        )
+
+
+def column_values(batch: List[List[str]], ix: int) -> List[str]:
+    """
+    The values of column ix in a batch of rows, with blanks for rows too short to have
+    one; for when only a few columns are needed, rather than all of them
+    """
+    try:
+        return list(map(itemgetter(ix), batch))
+    except IndexError:
+        return [row[ix] if ix < len(row) else "" for row in batch]
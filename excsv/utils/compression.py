@@ -0,0 +1,410 @@
+import bz2
+from collections import deque
+import gzip
+import io
+import lzma
+import os
+from pathlib import Path
+import queue
+import re
+import struct
+import sys
+import threading
+from typing import BinaryIO, Callable, Iterator, List, Optional, Union
+import zlib
+
+from .records import read_blocks
+
+
+# Formats are detected from the first bytes of input, and from the suffix of output.
+# bzip2's "BZh" is followed by the block size, 1-9, and the magic number of the first
+# block, or of the end of the stream, for no data, since "BZh" alone is plain text
+MAGIC = {
+    "gzip": re.compile(rb"\x1f\x8b"),
+    "bz2": re.compile(rb"BZh[1-9](?:1AY&SY|\x17rE8P\x90)"),
+    "xz": re.compile(rb"\xfd7zXZ\x00"),
+    "zstd": re.compile(rb"\x28\xb5\x2f\xfd"),
+}
+SUFFIXES = {".gz": "gzip", ".bz2": "bz2", ".xz": "xz", ".zst": "zstd"}
+# How many of the first bytes are looked at: the magic numbers, and enough data to
+# check that it decompresses
+HEAD_SIZE = 4096
+
+# Decompressed bytes per block handed over by the reader thread, and how many blocks
+# it can get ahead of whatever reads them
+BLOCK_SIZE = 1 << 20
+READ_AHEAD_BLOCKS = 8
+
+# Like the gzip command's default; 9, gzip.open()'s, is several times slower for
+# output that's only a little smaller
+GZIP_LEVEL = 6
+
+# BGZF, i.e. bgzip's output, is gzip made of members of at most 64 KiB, each with its
+# compressed size in a "BC" extra subfield, so they can be found without decompressing
+BGZF_HEADER = struct.Struct("<4BI2BH2BHH")
+
+PathLike = Union[str, Path]
+
+
+class CompressionError(Exception):
+    """Raised for a compression format that can't be read or written here"""
+
+
+class DecompressionError(CompressionError):
+    """Raised by a read of compressed data that's truncated or corrupt"""
+
+    def __init__(self, filename: str, reason: str):
+        super().__init__(f"{filename} is truncated or corrupt: {reason}")
+        self.filename = filename
+        self.reason = reason
+
+
+def detect_compression(head: bytes) -> Optional[str]:
+    """
+    The compression format that data starting with `head` is in, or None, also if
+    the start of it doesn't decompress, e.g. for text that happens to start like it
+    """
+    for compression, magic in MAGIC.items():
+        if magic.match(head):
+            return compression if _decompresses(head, compression) else None
+    return None
+
+
+def _decompresses(head: bytes, compression: str) -> bool:
+    """Whether the start of compressed data decompresses, as far as it goes"""
+    if compression == "gzip":
+        decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+    elif compression == "bz2":
+        decompressor = bz2.BZ2Decompressor()
+    elif compression == "xz":
+        decompressor = lzma.LZMADecompressor()
+    else:
+        # a zstd magic number is no text, and it needs zstandard to check further
+        return True
+    try:
+        decompressor.decompress(head, 1)
+    except (OSError, EOFError, zlib.error, lzma.LZMAError):
+        return False
+    return True
+
+
+def compression_from_suffix(path: PathLike) -> Optional[str]:
+    return SUFFIXES.get(Path(path).suffix.lower())
+
+
+def is_compressed(stream) -> bool:
+    """
+    Whether stream is the decompressed data of a file, which can't be seeked into by
+    byte offsets, or mapped, like the file itself
+    """
+    return getattr(stream, "compression", None) is not None
+
+
+def peek(binfile: BinaryIO, size: int) -> Optional[bytes]:
+    """
+    Up to `size` bytes from the current position of binfile, without using them up,
+    or None if it can neither peek nor seek, e.g. an unbuffered pipe
+    """
+    if hasattr(binfile, "peek"):
+        return binfile.peek(size)[:size]
+    if binfile.seekable():
+        pos = binfile.tell()
+        head = binfile.read(size)
+        binfile.seek(pos)
+        return head
+    return None
+
+
+def open_decompressed(
+    binfile: BinaryIO,
+    compression: str,
+    name: str,
+    on_close: Optional[Callable[[], None]] = None,
+) -> io.BufferedReader:
+    """
+    The decompressed data of binfile, as a binary stream, decompressed in a background
+    thread a block ahead of what's read, so that decompression overlaps with e.g.
+    parsing; the decompressors don't hold the GIL while they work
+
+    BGZF input is decompressed in parallel, a group of members per thread. Other gzip
+    has to be decompressed in order, since where a member ends isn't known until it's
+    been decompressed. on_close is called when the stream is closed, e.g. to close
+    binfile, which isn't closed otherwise
+    """
+    if compression == "gzip" and _is_bgzf(peek(binfile, BGZF_HEADER.size) or b""):
+        blocks = _bgzf_blocks(binfile)
+    else:
+        blocks = read_blocks(_decompressor(binfile, compression), block_size=BLOCK_SIZE)
+    return io.BufferedReader(ThreadedReader(blocks, name, on_close), BLOCK_SIZE)
+
+
+def open_compressed_output(
+    path: PathLike,
+    compression: str,
+    mode: str = "w",
+    encoding: Optional[str] = None,
+    errors: Optional[str] = "strict",
+) -> Union[io.TextIOWrapper, io.BufferedWriter]:
+    """
+    A file at path that's written compressed, in a background thread that compresses
+    a block at a time, while the next one is being written
+    """
+    binfile = _compressor(path, compression)
+    stream = io.BufferedWriter(ThreadedWriter(binfile, str(path)), BLOCK_SIZE)
+    if "b" in mode:
+        return stream
+    return io.TextIOWrapper(stream, encoding=encoding, errors=errors)
+
+
+def _decompressor(binfile: BinaryIO, compression: str) -> BinaryIO:
+    # none of these close binfile when they're closed
+    if compression == "gzip":
+        return gzip.GzipFile(fileobj=binfile, mode="rb")
+    if compression == "bz2":
+        return bz2.BZ2File(binfile, "rb")
+    if compression == "xz":
+        return lzma.LZMAFile(binfile, "rb")
+    if compression == "zstd":
+        zstandard = _import_zstandard()
+        return zstandard.ZstdDecompressor().stream_reader(
+            binfile, read_size=BLOCK_SIZE, read_across_frames=True, closefd=False
+        )
+    raise CompressionError(f"Unknown compression: {compression}")
+
+
+def _compressor(path: PathLike, compression: str) -> BinaryIO:
+    if compression == "gzip":
+        return gzip.open(path, "wb", compresslevel=GZIP_LEVEL)
+    if compression == "bz2":
+        return bz2.open(path, "wb")
+    if compression == "xz":
+        return lzma.open(path, "wb")
+    if compression == "zstd":
+        zstandard = _import_zstandard()
+        # zstd can compress with several threads of its own
+        return zstandard.open(path, "wb", cctx=zstandard.ZstdCompressor(threads=-1))
+    raise CompressionError(f"Unknown compression: {compression}")
+
+
+def _import_zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise CompressionError(
+            "zstd needs the zstandard package: pip install 'excsv[zstd]'"
+        ) from None
+    return zstandard
+
+
+# What decompressors raise for data that's truncated or corrupt, besides zstandard's
+# ZstdError, which isn't imported unless zstd is read
+DECOMPRESSOR_ERRORS = (EOFError, OSError, zlib.error, lzma.LZMAError, CompressionError)
+
+
+def _is_zstd_error(err: BaseException) -> bool:
+    zstandard = sys.modules.get("zstandard")
+    return zstandard is not None and isinstance(err, zstandard.ZstdError)
+
+
+class ThreadedReader(io.RawIOBase):
+    """
+    A binary stream of blocks of bytes that are produced by a background thread, e.g.
+    by decompressing them, up to READ_AHEAD_BLOCKS ahead of what's been read
+
+    An error in the thread is raised by the read that gets to it, as a
+    DecompressionError if it's one of a decompressor's, e.g. the EOFError of data that
+    ends too soon
+    """
+
+    def __init__(
+        self,
+        blocks: Iterator[bytes],
+        name: str,
+        on_close: Optional[Callable[[], None]] = None,
+        read_ahead: int = READ_AHEAD_BLOCKS,
+    ):
+        super().__init__()
+        self.name = name
+        self._on_close = on_close
+        self._queue: queue.Queue = queue.Queue(read_ahead)
+        self._stop = threading.Event()
+        self._block = memoryview(b"")
+        self._done = False
+        self._thread = threading.Thread(target=self._produce, args=(blocks,), daemon=True)
+        self._thread.start()
+
+    def _produce(self, blocks: Iterator[bytes]) -> None:
+        try:
+            for block in blocks:
+                if not self._put(block):
+                    return
+            self._put(None)
+        except BaseException as err:
+            self._put(err)
+        finally:
+            close = getattr(blocks, "close", None)
+            if close:
+                close()
+
+    def _put(self, item) -> bool:
+        # wait for room, unless the reader is closed, and so won't make any
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._block:
+            if self._done:
+                return 0
+            item = self._queue.get()
+            if item is None or isinstance(item, BaseException):
+                self._done = True
+                if item is None:
+                    return 0
+                if isinstance(item, DECOMPRESSOR_ERRORS) or _is_zstd_error(item):
+                    raise DecompressionError(self.name, str(item)) from item
+                raise item
+            self._block = memoryview(item)
+        size = min(len(buffer), len(self._block))
+        buffer[:size] = self._block[:size]
+        self._block = self._block[size:]
+        return size
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self._stop.set()
+        self._thread.join()
+        if self._on_close:
+            self._on_close()
+        super().close()
+
+
+class ThreadedWriter(io.RawIOBase):
+    """
+    A binary stream whose writes are handed to a background thread, which writes
+    them to target, e.g. a compressor, and closes target when the stream is closed
+
+    An error in the thread is raised by the next write, or by close()
+    """
+
+    def __init__(self, target: BinaryIO, name: str, queue_blocks: int = READ_AHEAD_BLOCKS):
+        super().__init__()
+        self.name = name
+        self._target = target
+        self._queue: queue.Queue = queue.Queue(queue_blocks)
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._consume, daemon=True)
+        self._thread.start()
+
+    def _consume(self) -> None:
+        try:
+            while (block := self._queue.get()) is not None:
+                if self._error is None:
+                    self._target.write(block)
+        except BaseException as err:
+            self._error = err
+            # keep taking blocks, so that the writer doesn't wait on a full queue
+            while self._queue.get() is not None:
+                pass
+        finally:
+            try:
+                self._target.close()
+            except BaseException as err:
+                self._error = self._error or err
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._raise_error()
+        self._queue.put(bytes(data))
+        return len(data)
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        super().close()
+        self._raise_error()
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+
+def _is_bgzf(head: bytes) -> bool:
+    if len(head) < BGZF_HEADER.size:
+        return False
+    id1, id2, _, flags, _, _, _, xlen, si1, si2, slen, _ = BGZF_HEADER.unpack(head)
+    return (
+        (id1, id2) == (0x1F, 0x8B)
+        and flags & 4 != 0
+        and xlen == 6
+        and (si1, si2, slen) == (ord("B"), ord("C"), 2)
+    )
+
+
+def _bgzf_members(binfile: BinaryIO) -> Iterator[bytes]:
+    """The compressed members of BGZF data, without decompressing them"""
+    while head := binfile.read(BGZF_HEADER.size):
+        if not _is_bgzf(head):
+            raise CompressionError("Invalid BGZF block")
+        block_size = BGZF_HEADER.unpack(head)[-1] + 1
+        rest = binfile.read(block_size - len(head))
+        if len(rest) < block_size - len(head):
+            raise CompressionError("Truncated BGZF block")
+        yield head + rest
+
+
+def _bgzf_groups(binfile: BinaryIO) -> Iterator[bytes]:
+    """Consecutive BGZF members, grouped into about BLOCK_SIZE compressed bytes"""
+    group: List[bytes] = []
+    size = 0
+    for member in _bgzf_members(binfile):
+        group.append(member)
+        size += len(member)
+        if size >= BLOCK_SIZE:
+            yield b"".join(group)
+            group, size = [], 0
+    if group:
+        yield b"".join(group)
+
+
+def _bgzf_blocks(binfile: BinaryIO, max_workers: Optional[int] = None) -> Iterator[bytes]:
+    """
+    Decompress BGZF data a group of members per thread, yielding the decompressed
+    groups in order, with only a few per thread in flight at once
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    max_workers = max_workers or os.cpu_count() or 1
+    with ThreadPoolExecutor(max_workers) as pool:
+        pending = deque()
+        for group in _bgzf_groups(binfile):
+            pending.append(pool.submit(_inflate_members, group))
+            if len(pending) >= 2 * max_workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _inflate_members(data: bytes) -> bytes:
+    """Decompress concatenated gzip members"""
+    out = []
+    while data:
+        decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+        out.append(decompressor.decompress(data))
+        if not decompressor.eof:
+            raise CompressionError("Truncated gzip member")
+        data = decompressor.unused_data
+    return b"".join(out)
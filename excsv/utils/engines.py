@@ -0,0 +1,184 @@
+import csv
+from importlib.util import find_spec
+from itertools import islice
+from pathlib import Path
+import re
+from typing import Iterator, List, TextIO
+
+from .compression import is_compressed
+from .rowindex import mapped_file
+from .sampling import read_header
+
+
+# Parser backends; the accelerated ones are optional dependencies
+ENGINES = ("stdlib", "pyarrow", "polars")
+DEFAULT_ENGINE = "stdlib"
+
+# Bytes per block read by the pyarrow engine
+ENGINE_BLOCK_SIZE = 1 << 20
+
+UTF8_BOM = b"\xef\xbb\xbf"
+
+BARE_CR_RX = re.compile(rb"\r(?!\n)")
+
+
+class EngineFallback(Exception):
+    """Raised by an accelerated engine for input it can't parse exactly like csv.reader"""
+
+
+def engine_is_available(engine: str) -> bool:
+    return engine == "stdlib" or find_spec(engine) is not None
+
+
+def available_engines() -> List[str]:
+    return [engine for engine in ENGINES if engine_is_available(engine)]
+
+
+def read_rows(
+    infile: TextIO, delimiter: str = ",", engine: str = DEFAULT_ENGINE
+) -> Iterator[List[str]]:
+    """
+    Iterate over the rows of a CSV with the given parser engine
+
+    Every engine yields exactly what csv.reader(infile) would, i.e. lists of strings,
+    including any header, with ragged rows and blank lines kept as they are. The
+    accelerated engines, pyarrow and polars, parse a regular file in multithreaded C,
+    a block at a time; stdin and compressed files are always read by the stdlib parser.
+
+    Whenever an accelerated engine comes to something it can't parse the same way as
+    csv.reader, e.g. a row with a different number of fields than the first, reading
+    carries on from that row with csv.reader
+    """
+    path = getattr(infile, "name", None)
+    if (
+        engine == "stdlib"
+        or path in (None, "<stdin>")
+        or not Path(path).is_file()
+        or is_compressed(infile)
+    ):
+        return csv.reader(infile, delimiter=delimiter)
+
+    encoding = infile.encoding
+    with open(path, "rb") as binfile:
+        header, _ = read_header(binfile, delimiter, encoding)
+        binfile.seek(0)
+        has_bom = binfile.read(len(UTF8_BOM)) == UTF8_BOM
+    # a single column can't tell a blank line from an empty value
+    if len(header) < 2:
+        return csv.reader(infile, delimiter=delimiter)
+
+    if engine == "pyarrow":
+        fast_rows = _pyarrow_rows(path, len(header), delimiter, encoding)
+    elif engine == "polars":
+        fast_rows = _polars_rows(path, len(header), delimiter, encoding)
+    else:
+        raise ValueError(f"Unknown engine: {engine}")
+    return _rows_with_fallback(fast_rows, infile, delimiter, has_bom)
+
+
+def _rows_with_fallback(
+    fast_rows: Iterator[List[List[str]]],
+    infile: TextIO,
+    delimiter: str,
+    has_bom: bool,
+) -> Iterator[List[str]]:
+    row_count = 0
+    try:
+        for batch in fast_rows:
+            # csv.reader keeps a UTF-8 byte order mark, which the engines drop
+            if row_count == 0 and has_bom and batch and batch[0]:
+                batch[0][0] = "\ufeff" + batch[0][0]
+            row_count += len(batch)
+            yield from batch
+    except EngineFallback:
+        # everything up to here was parsed identically, so skip those records
+        yield from islice(csv.reader(infile, delimiter=delimiter), row_count, None)
+
+
+def _pyarrow_rows(
+    path: str, column_count: int, delimiter: str, encoding: str
+) -> Iterator[List[List[str]]]:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    from pyarrow import csv as pacsv
+
+    names = [f"f{i}" for i in range(column_count)]
+    try:
+        reader = pacsv.open_csv(
+            path,
+            read_options=pacsv.ReadOptions(
+                column_names=names, block_size=ENGINE_BLOCK_SIZE, encoding=encoding
+            ),
+            parse_options=pacsv.ParseOptions(
+                delimiter=delimiter, newlines_in_values=True, ignore_empty_lines=False
+            ),
+            convert_options=pacsv.ConvertOptions(
+                column_types={name: pa.string() for name in names},
+                strings_can_be_null=False,
+                quoted_strings_can_be_null=False,
+            ),
+        )
+        for record_batch in reader:
+            # pyarrow reads a blank line as a row of empty values, which is also what
+            # a line of just delimiters is
+            blank = pc.equal(pc.utf8_length(record_batch.column(0)), 0)
+            for column in record_batch.columns[1:]:
+                blank = pc.and_(blank, pc.equal(pc.utf8_length(column), 0))
+            exact_height = record_batch.num_rows
+            if pc.any(blank).as_py():
+                exact_height = pc.index(blank, True).as_py()
+            columns = []
+            for column in record_batch.slice(0, exact_height).columns:
+                # csv.reader reads a file opened in text mode, where '\r\n' and '\r'
+                # in quoted values have become '\n'
+                if pc.any(pc.match_substring(column, "\r")).as_py():
+                    column = pc.replace_substring(column, "\r\n", "\n")
+                    column = pc.replace_substring(column, "\r", "\n")
+                columns.append(column.to_pylist())
+            yield [list(row) for row in zip(*columns)]
+            if exact_height < record_batch.num_rows:
+                raise EngineFallback("possibly blank line")
+    except pa.ArrowInvalid as err:
+        raise EngineFallback(str(err))
+
+
+def _polars_rows(
+    path: str, column_count: int, delimiter: str, encoding: str
+) -> Iterator[List[List[str]]]:
+    import polars as pl
+
+    if encoding.lower().replace("-", "") != "utf8":
+        raise EngineFallback(f"polars can't read {encoding}")
+    # polars only ends records at '\n', so it would read a line ending in a bare '\r'
+    # as part of a value, where csv.reader's text mode reads it as a newline
+    with mapped_file(path) as data:
+        first_cr = data.find(b"\r")
+        if first_cr != -1 and BARE_CR_RX.search(data, first_cr):
+            raise EngineFallback("bare '\\r' line endings")
+    frame = pl.scan_csv(
+        path,
+        has_header=False,
+        separator=delimiter,
+        infer_schema=False,
+        truncate_ragged_lines=False,
+    )
+    try:
+        for batch in frame.collect_batches():
+            # polars pads short rows with nulls, as it does unquoted empty values,
+            # so a null in the last column may be a ragged row
+            nulls = batch.get_columns()[-1].is_null()
+            exact_height = nulls.arg_true()[0] if nulls.any() else batch.height
+            columns = []
+            for series in batch.head(exact_height).get_columns():
+                series = series.fill_null("")
+                # csv.reader reads a file opened in text mode, where '\r\n' and '\r'
+                # in quoted values have become '\n'
+                if series.str.contains("\r", literal=True).any():
+                    series = series.str.replace_all("\r\n", "\n", literal=True)
+                    series = series.str.replace_all("\r", "\n", literal=True)
+                columns.append(series.to_list())
+            yield [list(row) for row in zip(*columns)]
+            if exact_height < batch.height:
+                raise EngineFallback("possibly ragged row")
+    except pl.exceptions.PolarsError as err:
+        raise EngineFallback(str(err))
@@ -1,39 +1,352 @@
+from concurrent.futures import ProcessPoolExecutor
 import csv
 from io import BytesIO
+from itertools import chain, islice
+import os
+import re
+import shutil
+from tempfile import TemporaryDirectory
 import openpyxl
-from openpyxl.styles import Alignment, Font
+from openpyxl.cell import Cell
+from openpyxl.styles import Alignment, Font, NamedStyle
 from openpyxl.styles import Color, PatternFill, Font, Border
+from openpyxl.styles.cell_style import StyleArray
 from openpyxl.utils import get_column_letter
 # from openpyxl.utils.dataframe import dataframe_to_rows
-from typing import BinaryIO, TextIO
+from pathlib import Path
+from typing import (
+    BinaryIO,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    TextIO,
+    Tuple,
+    Union,
+)
+
+from .infer import NATIVE_BATCH_PATTERNS, convert_rows, infer_column_types
+from .timing import span, timed
 
 
 
 HEADER_FILL = PatternFill(patternType="solid", fgColor=Color(rgb="00222222"))
+HEADER_FONT = Font(bold=True, size="14", color="FFFFFF")
+HEADER_ALIGNMENT = Alignment(wrap_text=True, vertical="center", horizontal="left")
+
+CELL_ALIGNMENT = Alignment(wrap_text=True, vertical="top", horizontal="left")
+
+FIRST_COL_FILL = PatternFill(patternType="solid", fgColor=Color(rgb="00EEEEEE"))
+FIRST_COL_FONT = Font(bold=True)
+
+# Names of the styles registered by add_named_styles_to_workbook()
+HEADER_STYLE = "excsv header"
+CELL_STYLE = "excsv cell"
+FIRST_COL_STYLE = "excsv first column"
+DATE_STYLE = "excsv date"
+FIRST_COL_DATE_STYLE = "excsv first column date"
+
+DATE_FORMAT = "yyyy-mm-dd"
+
+INVALID_TITLE_CHARS_RX = re.compile(r"[\[\]:*?/\\]")
+MAX_TITLE_LENGTH = 31
+
+# In write_only mode, column widths have to be known before the first row is
+# written, so they are measured from this many leading rows. Column types are
+# inferred from the same number of rows, which is also the batch size for
+# converting values to those types
+SAMPLE_SIZE = 1000
 
 
 def init_workbook(
     frozen_row: int = 1,
     frozen_col: int = 2,
+    write_only: bool = False,
+    sheet_title: Optional[str] = None,
 ) -> openpyxl.Workbook:
     """
     Create workbook
     Add workbook features, e.g. freeze rows and so forth
-    """
-    wb = openpyxl.Workbook(write_only=False)
-    # TK: we want to use write_only, but write_only means you have to
-    #  add features to workbook before you write data
-    # can't write data and then freeze rows, for instance
 
+    With write_only=True, the sheet is streamed to disk as rows are appended,
+    which means features and column widths must be set before writing data;
+    see stream_data_to_workbook()
+    """
+    wb = openpyxl.Workbook(write_only=write_only)
     sheet = wb.create_sheet()
+    if sheet_title:
+        wb.worksheets[0].title = sheet_title
+    add_named_styles_to_workbook(wb)
 
     return wb
 
 
-def add_data_to_workbook(wb: openpyxl.Workbook, input_csv: csv.reader):
+def add_named_styles_to_workbook(wb: openpyxl.Workbook) -> None:
+    """
+    Register the header, cell and first column styles once, so that styling a cell
+    is a lookup by name instead of building and hashing new Font/Fill/Alignment objects
+
+    The styles' arrays are also registered as cell styles, in a fixed order, so that
+    cell style ids are the same in every workbook created by init_workbook(); this is
+    what lets csvs_to_workbook() build sheets in separate processes
+    """
+    wb.add_named_style(
+        NamedStyle(
+            name=HEADER_STYLE,
+            font=HEADER_FONT,
+            fill=HEADER_FILL,
+            alignment=HEADER_ALIGNMENT,
+        )
+    )
+    wb.add_named_style(NamedStyle(name=CELL_STYLE, alignment=CELL_ALIGNMENT))
+    wb.add_named_style(
+        NamedStyle(
+            name=FIRST_COL_STYLE,
+            font=FIRST_COL_FONT,
+            fill=FIRST_COL_FILL,
+            alignment=CELL_ALIGNMENT,
+        )
+    )
+    wb.add_named_style(
+        NamedStyle(
+            name=DATE_STYLE,
+            alignment=CELL_ALIGNMENT,
+            number_format=DATE_FORMAT,
+        )
+    )
+    wb.add_named_style(
+        NamedStyle(
+            name=FIRST_COL_DATE_STYLE,
+            font=FIRST_COL_FONT,
+            fill=FIRST_COL_FILL,
+            alignment=CELL_ALIGNMENT,
+            number_format=DATE_FORMAT,
+        )
+    )
+    # openpyxl has no public way to register a cell style up front; _cell_styles is
+    # the workbook's list of them, as of openpyxl 3.1, which setup.py pins
+    for style in _named_style_arrays(wb).values():
+        wb._cell_styles.add(style)
+
+
+def add_data_to_workbook(
+    wb: openpyxl.Workbook,
+    input_csv: csv.reader,
+    infer_types: bool = True,
+    sample_size: int = SAMPLE_SIZE,
+) -> List[int]:
+    """
+    Append styled rows to the active sheet
+
+    With infer_types, numeric, boolean and date columns are written as native values,
+    based on the types inferred from the first `sample_size` rows
+
+    Returns the length of the longest value in each column, tracked as the rows
+    are appended, for add_styles_to_workbook() to set column widths with
+    """
     sheet = wb.active
-    for row in input_csv:
-        sheet.append(row)
+    value_lengths = []
+    for row_idx, cells in _styled_rows(
+        wb, sheet, input_csv, value_lengths, infer_types, sample_size
+    ):
+        sheet.append(cells)
+
+    return value_lengths
+
+
+def update_value_lengths(value_lengths: List[int], row: List[str]) -> None:
+    """
+    Update, in place, the running length of the longest value in each column
+    """
+    for ix, value in enumerate(row):
+        if ix == len(value_lengths):
+            value_lengths.append(len(value))
+        elif len(value) > value_lengths[ix]:
+            value_lengths[ix] = len(value)
+
+
+def fit_column_widths(
+    value_lengths: List[int],
+    max_cell_width: int = 70,
+    min_cell_width: int = 10,
+) -> List[int]:
+    """
+    Returns the width of each column, i.e. the length of its longest value plus padding,
+    no smaller than min_cell_width + 2 and no bigger than max_cell_width
+    """
+    return [
+        min(max(length, min_cell_width) + 2, max_cell_width) for length in value_lengths
+    ]
+
+
+def set_column_widths(sheet, widths: List[int]) -> None:
+    # the first column is left at its default width
+    for ix, width in enumerate(widths):
+        if ix == 0:
+            continue
+        sheet.column_dimensions[get_column_letter(ix + 1)].width = width
+
+
+def stream_data_to_workbook(
+    wb: openpyxl.Workbook,
+    input_csv: csv.reader,
+    frozen_row: int = 1,
+    frozen_col: int = 2,
+    auto_filter: bool = True,
+    max_cell_width: int = 70,
+    min_cell_width: int = 10,
+    sample_size: int = SAMPLE_SIZE,
+    infer_types: bool = True,
+) -> None:
+    """
+    Write data, features and styles to a write_only workbook in one pass
+
+    Write-only sheets are flushed as rows arrive, so frozen panes and column widths
+    are set before the first row is appended. Widths (and, with infer_types, column
+    types) are measured from the first `sample_size` rows, which is the only data
+    held in memory. The autofilter is written after the rows, so its range covers
+    the whole sheet.
+    """
+    sheet = wb.worksheets[0]
+
+    sample = list(islice(input_csv, sample_size))
+
+    frozen_col_letter = get_column_letter(frozen_col)
+    sheet.freeze_panes = f"{frozen_col_letter}{frozen_row + 1}"
+
+    value_lengths = []
+    for row in sample:
+        update_value_lengths(value_lengths, row)
+    set_column_widths(
+        sheet, fit_column_widths(value_lengths, max_cell_width, min_cell_width)
+    )
+
+    row_count = 0
+    col_count = 0
+    # a write-only sheet serializes each row as it's appended
+    append = timed("sheet.append", sheet.append)
+    for row_count, cells in _styled_rows(
+        wb, sheet, chain(sample, input_csv), [], infer_types, sample_size
+    ):
+        col_count = max(col_count, len(cells))
+        append(cells)
+
+    if auto_filter is True and row_count > 0:
+        sheet.auto_filter.ref = f"A1:{get_column_letter(col_count)}{row_count}"
+
+
+def _styled_rows(
+    wb: openpyxl.Workbook,
+    sheet,
+    input_csv: Iterable[List[str]],
+    value_lengths: List[int],
+    infer_types: bool,
+    sample_size: int,
+) -> Iterator[Tuple[int, List[Cell]]]:
+    """
+    Yield (row number, styled cells) for the header and each data row
+
+    Rows are read in batches; each batch's value lengths are tracked, and with
+    infer_types, its values are converted column by column to the types
+    inferred from the first batch
+    """
+    styles = _named_style_arrays(wb)
+    rows = iter(input_csv)
+    header = next(rows, None)
+    if header is None:
+        return
+    update_value_lengths(value_lengths, header)
+    yield 1, _styled_cells(sheet, header, 1, [], styles[HEADER_STYLE])
+
+    column_types = None
+    column_styles = None
+    row_idx = 1
+    while batch := list(islice(rows, sample_size)):
+        for row in batch:
+            update_value_lengths(value_lengths, row)
+
+        if column_types is None:
+            if infer_types:
+                with span("infer_column_types", len(batch)):
+                    column_types = infer_column_types(
+                        batch, len(header), patterns=NATIVE_BATCH_PATTERNS
+                    )
+            else:
+                column_types = ["str"] * len(header)
+            column_styles = _column_styles(styles, column_types)
+
+        if infer_types:
+            with span("convert_rows", len(batch)):
+                batch = convert_rows(batch, column_types)
+
+        with span("styled_cells", len(batch)):
+            cells = [
+                _styled_cells(sheet, row, row_idx + i, column_styles, styles[CELL_STYLE])
+                for i, row in enumerate(batch, 1)
+            ]
+        for row_cells in cells:
+            row_idx += 1
+            yield row_idx, row_cells
+
+
+def _named_style_arrays(wb: openpyxl.Workbook) -> Dict[str, StyleArray]:
+    """
+    The style array of each registered named style, i.e. what setting cell.style = name
+    would copy into the cell, so it can be passed straight to the Cell constructor
+    """
+    # _named_styles is the workbook's list of NamedStyles, as of openpyxl 3.1
+    return {
+        name: wb._named_styles[name].as_tuple()
+        for name in (
+            HEADER_STYLE,
+            CELL_STYLE,
+            FIRST_COL_STYLE,
+            DATE_STYLE,
+            FIRST_COL_DATE_STYLE,
+        )
+    }
+
+
+def _column_styles(
+    styles: Dict[str, StyleArray], column_types: List[str]
+) -> List[StyleArray]:
+    """
+    The style array for the data cells of each column, which depends on whether it's
+    the first column and whether it's a date column
+    """
+    column_styles = []
+    for ix, type_name in enumerate(column_types):
+        if ix == 0:
+            name = FIRST_COL_DATE_STYLE if type_name == "date" else FIRST_COL_STYLE
+        else:
+            name = DATE_STYLE if type_name == "date" else CELL_STYLE
+        column_styles.append(styles[name])
+    return column_styles
+
+
+def _styled_cells(
+    sheet,
+    row: Sequence,
+    row_idx: int,
+    column_styles: List[StyleArray],
+    default_style: StyleArray,
+) -> List[Cell]:
+    """
+    Wrap each value in a Cell with its column's named style, or default_style for
+    columns without one; works for both regular and write_only sheets
+    """
+    cells = []
+    for col_idx, value in enumerate(row, start=1):
+        if col_idx <= len(column_styles):
+            style = column_styles[col_idx - 1]
+        else:
+            style = default_style
+        cells.append(
+            Cell(sheet, row=row_idx, column=col_idx, value=value, style_array=style)
+        )
+    return cells
 
 
 def add_features_to_workbook(
@@ -57,86 +370,249 @@ def add_features_to_workbook(
 
 
 
-def add_styles_to_workbook(wb: openpyxl.Workbook, max_cell_width=70, min_cell_width=10) -> None:
+def add_styles_to_workbook(
+    wb: openpyxl.Workbook,
+    value_lengths: List[int],
+    max_cell_width=70,
+    min_cell_width=10,
+) -> None:
     """
-    Set typefaces
-    Bold and colorize the headers
-    Set maxwidth
+    Set column widths, based on the value lengths tracked by add_data_to_workbook()
+
+    Typefaces, header colors and so forth are applied as named styles while the
+    data is added, so the sheet is not re-scanned here
 
     todo: add params to let user configure look and feel
     for now, just apply default styles
-
-    tk todo: this is really inefficient. Data and styling should be done in one loop, not in separate loops
     """
     sheet = wb.active
 
+    # Set column width to: min_cell_width and no bigger than max_cell_width
+    set_column_widths(
+        sheet, fit_column_widths(value_lengths, max_cell_width, min_cell_width)
+    )
 
 
-    # Set column width to: min_cell_width and no bigger than max_cell_width
-    # tk: this is very inefficient
-    for ix, col in enumerate(sheet.columns):
-        if ix == 0:
-            continue
-        column = col[0].column_letter  # Get the column name
+def csv_to_workbook(
+    input_csv: csv.reader,
+    frozen_row: int = 1,
+    frozen_col: int = 2,
+    write_only: bool = True,
+    output: Union[str, Path, BinaryIO, None] = None,
+    sheet_title: Optional[str] = None,
+    infer_types: bool = True,
+) -> Optional[BinaryIO]:
+    """
+    By default, the workbook is built in write_only mode, i.e. rows are streamed
+    to a temp file as they are read, so memory use doesn't grow with the size of the CSV.
+    Set write_only=False to build the whole sheet in memory before styling it.
 
-        biggest_cell = min_cell_width
+    output can be a file path or a binary file object, including non-seekable
+    streams such as stdout; the xlsx zip container is written straight to it.
+    If output is None, the workbook is saved to, and returned as, a BytesIO object.
 
-        for cell in col:
-            try:
-                if len(str(cell.value)) > biggest_cell:
-                    biggest_cell = len(str(cell.value))
-            except:
-                pass
-        adjusted_width = biggest_cell + 2
-        adjusted_width = min(adjusted_width, max_cell_width)
-        sheet.column_dimensions[column].width = adjusted_width
+    With infer_types, columns whose values are all ints, floats, booleans or
+    ISO dates are written as native Excel values instead of text
+    """
+    # Create a workbook and select the active worksheet
+    wb = init_workbook(write_only=write_only, sheet_title=sheet_title)
+    if write_only:
+        with span("stream_data_to_workbook"):
+            stream_data_to_workbook(
+                wb, input_csv, frozen_row, frozen_col, infer_types=infer_types
+            )
+    else:
+        with span("add_data_to_workbook"):
+            value_lengths = add_data_to_workbook(
+                wb, input_csv, infer_types=infer_types
+            )
+        with span("add_features_to_workbook"):
+            add_features_to_workbook(wb, frozen_row, frozen_col)
+        with span("add_styles_to_workbook"):
+            add_styles_to_workbook(wb, value_lengths)
 
+    if output is not None:
+        with span("wb.save"):
+            wb.save(output)
+        return None
 
-    # Set cell-by-cell styles
-    for row_idx, row in enumerate(sheet.iter_rows(), start=1):
-        for col_idx, cell in enumerate(row, start=1):
+    excel_bytes = BytesIO()
+    with span("wb.save"):
+        wb.save(excel_bytes)
 
-            cell = sheet.cell(row=row_idx, column=col_idx,)
+    # Seek to the start of the BytesIO object so it can be read from the beginning
+    excel_bytes.seek(0)
 
-            # Set default cell to wrap text, and be aligned at the top and left
-            cell.alignment = Alignment(
-                wrap_text=True, vertical="top", horizontal="left"
-            )
+    # Return the BytesIO object
+    return excel_bytes
 
-            # set header styles
-            if row_idx == 1:
-                cell.alignment = Alignment(
-                    wrap_text=True, vertical="center", horizontal="left"
-                )
-                cell.font = Font(bold=True, size="14", color="FFFFFF")
-                cell.fill = HEADER_FILL
 
-            # set first column styles
-            if col_idx == 1 and row_idx != 1:
-                # Make first column bold, and set fill to gray
-                cell.font = Font(bold=True)
-                cell.fill = PatternFill(patternType="solid", fgColor=Color(rgb="00EEEEEE"))
+def sheet_title_from_name(name: str) -> str:
+    """
+    Make a valid sheet title from a file name, e.g. "data/2024:sales.csv" -> "2024sales"
 
+    Excel titles are at most 31 chars and can't contain any of: [ ] : * ? / \\
+    """
+    title = Path(name).name.split(".")[0]
+    title = INVALID_TITLE_CHARS_RX.sub("", title)[:MAX_TITLE_LENGTH]
+    return title or "Sheet"
 
 
+def check_sheet_title(title: str) -> str:
+    """
+    Raise ValueError for a sheet title that Excel wouldn't accept, by the same rules
+    as sheet_title_from_name(), instead of changing it
+    """
+    if not title:
+        raise ValueError("Sheet titles can't be blank")
+    if len(title) > MAX_TITLE_LENGTH:
+        raise ValueError(
+            f"Sheet title {title!r} is longer than {MAX_TITLE_LENGTH} characters"
+        )
+    if INVALID_TITLE_CHARS_RX.search(title):
+        raise ValueError(f"Sheet title {title!r} can't contain any of: [ ] : * ? / \\")
+    return title
+
+
+def csvs_to_workbook(
+    inputs: Sequence[Union[str, Path, TextIO]],
+    sheet_titles: Sequence[str],
+    output: Union[str, Path, BinaryIO],
+    delimiter: str = ",",
+    frozen_row: int = 1,
+    frozen_col: int = 2,
+    max_workers: Optional[int] = None,
+    infer_types: bool = True,
+    encoding: Optional[str] = None,
+    errors: Optional[str] = "strict",
+) -> None:
+    """
+    Convert several CSVs into one workbook, with one sheet per CSV
 
+    Each CSV given as a path is parsed and written as a worksheet part in its own
+    worker process, so conversion runs on as many cores as there are inputs (or
+    max_workers). Inputs that are already-open text streams, e.g. stdin, are
+    converted in this process. The finished parts are then packaged into a
+    single workbook, which is saved to output.
 
-# note to self: why does this return BinaryIO? Was it just for testing?
-def csv_to_workbook(
+    Paths are opened in text mode with encoding and errors, like a click.File, so
+    that a CSV is read the same whether it's converted on its own or with others
+    """
+    if len(inputs) != len(sheet_titles):
+        raise ValueError(
+            f"Got {len(sheet_titles)} sheet titles for {len(inputs)} inputs"
+        )
+
+    wb = openpyxl.Workbook(write_only=True)
+    add_named_styles_to_workbook(wb)
+
+    with TemporaryDirectory(prefix="excsv.") as tmpdir:
+        part_paths = [
+            os.path.join(tmpdir, f"sheet{ix}.xml") for ix in range(len(inputs))
+        ]
+        jobs = [
+            (ix, src)
+            for ix, src in enumerate(inputs)
+            if isinstance(src, (str, Path))
+        ]
+
+        auto_filter_refs = {}
+        if jobs and max_workers != 1:
+            with ProcessPoolExecutor(max_workers=max_workers) as pool:
+                futures = {
+                    ix: pool.submit(
+                        _build_sheet_part_from_path,
+                        src,
+                        part_paths[ix],
+                        delimiter,
+                        frozen_row,
+                        frozen_col,
+                        infer_types,
+                        encoding,
+                        errors,
+                    )
+                    for ix, src in jobs
+                }
+                for ix, future in futures.items():
+                    auto_filter_refs[ix] = future.result()
+
+        for ix, src in enumerate(inputs):
+            if ix in auto_filter_refs:
+                continue
+            if isinstance(src, (str, Path)):
+                auto_filter_refs[ix] = _build_sheet_part_from_path(
+                    src,
+                    part_paths[ix],
+                    delimiter,
+                    frozen_row,
+                    frozen_col,
+                    infer_types,
+                    encoding,
+                    errors,
+                )
+            else:
+                auto_filter_refs[ix] = build_sheet_part(
+                    csv.reader(src, delimiter=delimiter),
+                    part_paths[ix],
+                    frozen_row,
+                    frozen_col,
+                    infer_types,
+                )
+
+        for ix, title in enumerate(sheet_titles):
+            sheet = wb.create_sheet(title)
+            # Closing a write-only sheet writes its (empty) xml to a temp file,
+            # which is what gets copied into the xlsx archive on save; swap the
+            # prebuilt part in its place. The temp file's path is the private
+            # _writer.out, as of openpyxl 3.1, which setup.py pins; there's no
+            # public way to hand openpyxl a sheet's xml
+            sheet.close()
+            shutil.move(part_paths[ix], sheet._writer.out)
+            if auto_filter_refs[ix]:
+                sheet.auto_filter.ref = auto_filter_refs[ix]
+
+        with span("wb.save"):
+            wb.save(output)
+
+
+def build_sheet_part(
     input_csv: csv.reader,
+    part_path: str,
     frozen_row: int = 1,
     frozen_col: int = 2,
-) -> BinaryIO:
-    # Create a workbook and select the active worksheet
-    wb = init_workbook()
-    add_data_to_workbook(wb, input_csv)
-    add_features_to_workbook(wb, frozen_row, frozen_col)
-    add_styles_to_workbook(wb)
-    excel_bytes = BytesIO()
-    wb.save(excel_bytes)
-
-    # Seek to the start of the BytesIO object so it can be read from the beginning
-    excel_bytes.seek(0)
+    infer_types: bool = True,
+) -> Optional[str]:
+    """
+    Write a CSV as worksheet xml to part_path, for csvs_to_workbook() to package
 
-    # Return the BytesIO object
-    return excel_bytes
+    Returns the sheet's autofilter range, which the packaging workbook also has to know about
+    """
+    wb = init_workbook(write_only=True)
+    sheet = wb.worksheets[0]
+    stream_data_to_workbook(
+        wb, input_csv, frozen_row, frozen_col, infer_types=infer_types
+    )
+    sheet.close()
+    # the private path of the closed sheet's xml, see csvs_to_workbook()
+    shutil.move(sheet._writer.out, part_path)
+    return sheet.auto_filter.ref
+
+
+def _build_sheet_part_from_path(
+    input_path: Union[str, Path],
+    part_path: str,
+    delimiter: str,
+    frozen_row: int,
+    frozen_col: int,
+    infer_types: bool,
+    encoding: Optional[str],
+    errors: Optional[str],
+) -> Optional[str]:
+    with open(input_path, "r", encoding=encoding, errors=errors) as infile:
+        return build_sheet_part(
+            csv.reader(infile, delimiter=delimiter),
+            part_path,
+            frozen_row,
+            frozen_col,
+            infer_types,
+        )
@@ -1,53 +1,339 @@
-import csv
-from typing import List, Union, Dict, TextIO
+from datetime import date
+from itertools import zip_longest
+import re
+from typing import Dict, Iterable, List, Optional, Pattern, Sequence, Tuple
 
+from .columns import BATCH_SIZE, ColumnBatches
 
-def infer_data_type(value: str) -> Union[type(int), type(float), type(str)]:
+
+# Values that can be cast to a type, the way int() and float() read them: with
+# leading zeros, of any length, with surrounding whitespace and digits grouped by
+# underscores, e.g. 1_000, and for float, inf and nan as well
+_DIGITS = r"\d(?:_?\d)*"
+# whitespace other than newlines, which separate the values of a batch
+_SPACE = r"[^\S\n]*"
+TYPE_PATTERNS = {
+    "int": rf"{_SPACE}[+-]?{_DIGITS}{_SPACE}",
+    "float": (
+        rf"{_SPACE}[+-]?(?:(?:{_DIGITS}(?:\.(?:{_DIGITS})?)?|\.{_DIGITS})"
+        rf"(?:[eE][+-]?{_DIGITS})?|(?i:inf(?:inity)?|nan)){_SPACE}"
+    ),
+    "bool": r"(?i:true|false)",
+    "date": r"\d{4}-\d{2}-\d{2}",
+}
+
+# Values that can be written as native types, e.g. in Excel. Integers with leading
+# zeros, such as zip codes, and integers too long for a float64, such as long IDs,
+# are kept as text; a float has to have a decimal point or an exponent to be longer
+NATIVE_TYPE_PATTERNS = {
+    "int": r"[+-]?(?:0|[1-9]\d{0,14})",
+    "float": (
+        r"[+-]?(?:0|[1-9]\d{0,14}"
+        r"|(?:(?:0|[1-9]\d*)\.\d*|\.\d+)(?:[eE][+-]?\d+)?"
+        r"|(?:0|[1-9]\d*)[eE][+-]?\d+)"
+    ),
+    "bool": TYPE_PATTERNS["bool"],
+    "date": TYPE_PATTERNS["date"],
+}
+
+
+def _batch_patterns(patterns: Dict[str, str]) -> Dict[str, Pattern]:
+    # each pattern matches a newline-joined batch of values, blanks included
+    return {
+        name: re.compile(rf"(?:(?:{pattern})?\n)*") for name, pattern in patterns.items()
+    }
+
+
+BATCH_PATTERNS = _batch_patterns(TYPE_PATTERNS)
+NATIVE_BATCH_PATTERNS = _batch_patterns(NATIVE_TYPE_PATTERNS)
+
+VALUE_PATTERNS = {
+    name: re.compile(pattern) for name, pattern in TYPE_PATTERNS.items()
+}
+NATIVE_VALUE_PATTERNS = {
+    name: re.compile(pattern) for name, pattern in NATIVE_TYPE_PATTERNS.items()
+}
+
+
+def parse_bool(value: str) -> bool:
+    return value.lower() == "true"
+
+
+CONVERTERS = {
+    "int": int,
+    "float": float,
+    "bool": parse_bool,
+    "date": date.fromisoformat,
+}
+
+
+def values_match_type(
+    values: Sequence[str], type_name: str, patterns: Dict[str, Pattern] = BATCH_PATTERNS
+) -> bool:
+    """
+    True if every value is either blank or matches the pattern for type_name, from
+    patterns, which match newline-joined batches like BATCH_PATTERNS
+
+    The values are checked with a single regex match against their newline-joined text,
+    instead of one int()/float() attempt per value
+    """
+    if not values:
+        return True
+    text = _join_values(values)
+    return text is not None and patterns[type_name].fullmatch(text) is not None
+
+
+def _join_values(values: Sequence[str]) -> Optional[str]:
+    """
+    Join values into text that BATCH_PATTERNS can match, or None if a value contains
+    a newline, which would otherwise be seen as several values
+    """
+    text = "\n".join(values) + "\n"
+    if text.count("\n") != len(values):
+        return None
+    return text
+
+
+# The types a column is tried as, in order, once its values no longer match its
+# current type. A column starts out as null, i.e. every value seen so far is blank,
+# and anything that matches none of its widenings becomes str, which is final
+WIDENINGS = {
+    "null": ("int", "float", "bool", "date"),
+    "int": ("float",),
+    "float": (),
+    "bool": (),
+    "date": (),
+}
+
+
+def widen_type(
+    type_name: str, values: Sequence[str], patterns: Dict[str, Pattern] = BATCH_PATTERNS
+) -> str:
+    """
+    Returns the narrowest type, at or above type_name, that all of the values match,
+    by patterns, e.g. NATIVE_BATCH_PATTERNS for types that can be written to Excel
+
+    e.g. widen_type("int", ["1", "2.5", ""]) -> "float"
+    """
+    if type_name == "str":
+        return "str"
+
+    text = _join_values(values)
+    if text is None:
+        return "str"
+
+    if type_name == "null":
+        if not any(values):
+            return "null"
+    elif patterns[type_name].fullmatch(text):
+        return type_name
+
+    for candidate in WIDENINGS[type_name]:
+        if patterns[candidate].fullmatch(text):
+            return candidate
+    return "str"
+
+
+def join_types(type_name: str, other: str) -> str:
     """
-    infer the data type of a value
+    Returns the narrowest type that values of either type match
+
+    e.g. join_types("int", "float") -> "float", join_types("int", "date") -> "str"
     """
+    if type_name == other or other == "null":
+        return type_name
+    if other in WIDENINGS.get(type_name, ()):
+        return other
+    if type_name in WIDENINGS.get(other, ()):
+        return type_name
+    return "str"
 
-    try:
-        int(value)
-        return int
-    except ValueError:
-        try:
-            float(value)
-            return float
-        except ValueError:
-            return str
 
+class ColumnTypes:
+    """
+    Infers the type of each column from batches of rows
 
-def common_type(types: List[type]) -> type:
+    Each batch is classified column by column: a column's values are checked against
+    its current type with a single regex match, and only widened, e.g. int -> float -> str,
+    when they don't all match. Columns that have been widened to str are not checked again.
     """
-    determine the most specific common type among a list of types
+
+    def __init__(
+        self, column_count: int = 0, patterns: Dict[str, Pattern] = BATCH_PATTERNS
+    ):
+        self.types = ["null"] * column_count
+        self.patterns = patterns
+        # the number of non-blank values checked in each column
+        self.value_counts = [0] * column_count
+        self.row_count = 0
+
+    @property
+    def settled(self) -> bool:
+        """True once every column is str, i.e. no more rows can change the result"""
+        return bool(self.types) and all(t == "str" for t in self.types)
+
+    def update(self, rows: List[List[str]]) -> bool:
+        """
+        Classify a batch of rows; returns True if any column's type changed
+        """
+        batches = ColumnBatches((), len(self.types), extra_columns=True)
+        return self.update_columns(batches.columns(rows), len(rows))
+
+    def update_columns(self, columns: List[Sequence[str]], row_count: int) -> bool:
+        """
+        Classify a batch of rows given as columns, e.g. from ColumnBatches, which may
+        be more than there are so far; returns True if any column's type changed
+        """
+        changed = False
+        self.row_count += row_count
+        for ix, column in enumerate(columns):
+            if ix == len(self.types):
+                self.types.append("null")
+                self.value_counts.append(0)
+            if self.types[ix] == "str":
+                continue
+            self.value_counts[ix] += len(column) - column.count("")
+            widened = widen_type(self.types[ix], column, self.patterns)
+            if widened != self.types[ix]:
+                self.types[ix] = widened
+                changed = True
+        return changed
+
+    def merge(self, other: "ColumnTypes") -> None:
+        """Combine with the types inferred from other rows of the same data"""
+        for ix in range(len(other.types)):
+            if ix == len(self.types):
+                self.types.append("null")
+                self.value_counts.append(0)
+            self.types[ix] = join_types(self.types[ix], other.types[ix])
+            self.value_counts[ix] += other.value_counts[ix]
+        self.row_count += other.row_count
+
+    def confidence(self, ix: int) -> float:
+        """
+        How sure we can be of a column's type when only some of its values were checked:
+        the chance of having come across a value that doesn't match the type, if 1% of
+        the column's values didn't. str is certain, since a non-matching value was seen.
+        For null columns, every checked row counts.
+        """
+        if self.types[ix] == "str":
+            return 1.0
+        checked = self.row_count if self.types[ix] == "null" else self.value_counts[ix]
+        return 1.0 - 0.99**checked
+
+
+def scan_column_types(
+    input_data: Iterable[List[str]],
+    column_count: int = 0,
+    batch_size: int = BATCH_SIZE,
+    stable_rows: Optional[int] = None,
+    patterns: Dict[str, Pattern] = BATCH_PATTERNS,
+) -> Tuple[ColumnTypes, bool]:
     """
-    if str in types:
-        return str
-    elif float in types:
-        return float
-    elif int in types:
-        return int
-    return str  # Default to string if no values are present
+    Classify rows of data, without their header, in batches of batch_size
+
+    Stops reading as soon as every column has been widened to str. With stable_rows,
+    also stops once no column's type has changed for that many rows.
 
+    Returns the ColumnTypes and whether all of input_data was read (or the types were
+    settled), i.e. whether the types are certain for the rows given
+    """
+    if stable_rows:
+        batch_size = min(batch_size, stable_rows)
+
+    column_types = ColumnTypes(column_count, patterns)
+    # short rows are padded with blanks, which don't affect a column's type, and rows
+    # longer than the header add columns
+    batches = ColumnBatches(input_data, column_count, batch_size, extra_columns=True)
+    rows_since_change = 0
+    for columns in batches:
+        row_count = batches.row_count - column_types.row_count
+        if column_types.update_columns(columns, row_count):
+            rows_since_change = 0
+        else:
+            rows_since_change += row_count
+        if column_types.settled:
+            return column_types, True
+        if stable_rows and rows_since_change >= stable_rows:
+            return column_types, False
+
+    return column_types, True
+
+
+def chunk_column_types(rows: List[List[str]]) -> ColumnTypes:
+    """scan_column_types() of all of rows, for chunks.map_chunks()"""
+    column_types, _ = scan_column_types(rows)
+    return column_types
+
+
+def infer_column_types(
+    input_data: Iterable[List[str]],
+    column_count: int = 0,
+    batch_size: int = BATCH_SIZE,
+    patterns: Dict[str, Pattern] = BATCH_PATTERNS,
+) -> List[str]:
+    """
+    infer the type of each column, i.e. null, int, float, bool, date or str,
+    from rows of data without their header; with NATIVE_BATCH_PATTERNS, only values
+    that can be written to Excel as native ones count, see convert_rows()
+
+    Stops reading as soon as every column has been widened to str
+    """
+    column_types, _ = scan_column_types(
+        input_data, column_count, batch_size, patterns=patterns
+    )
+    return column_types.types
+
+
+def convert_rows(rows: List[List[str]], column_types: List[str]) -> List[Sequence]:
+    """
+    Convert a batch of rows to the given column types, column by column, e.g. to write
+    them to Excel, so only values that match NATIVE_TYPE_PATTERNS are converted: zip
+    codes and long IDs are kept as text, even in an int column
+
+    Blank values become None. Columns that don't fully match their type, e.g. because
+    the types were inferred from a sample, and ragged rows are converted value by value,
+    keeping values that don't match as strings
+    """
+    converters = [CONVERTERS.get(t) for t in column_types]
+    if not any(converters):
+        return rows
 
-def infer_column_types(input_data: List[Dict[str, str]]) -> Dict[str, type]:
-    column_types = {}
+    if any(len(row) != len(converters) for row in rows):
+        return [_convert_values(row, column_types) for row in rows]
 
-    for row in input_data:
-        for column, value in row.items():
-            inferred_type = infer_data_type(value)
+    columns = []
+    for column, type_name, convert in zip(zip(*rows), column_types, converters):
+        if convert is None:
+            columns.append(column)
+        elif values_match_type(column, type_name, NATIVE_BATCH_PATTERNS):
+            try:
+                if all(column):
+                    columns.append(list(map(convert, column)))
+                else:
+                    columns.append([convert(v) if v else None for v in column])
+            except ValueError:
+                # e.g. dates that look right but don't exist, like 2024-02-30
+                columns.append(_convert_values(column, [type_name] * len(column)))
+        else:
+            columns.append(_convert_values(column, [type_name] * len(column)))
 
-            # If this is the first time we're seeing this column, initialize its type list
-            if column not in column_types:
-                column_types[column] = [inferred_type]
-            else:
-                # Otherwise, add the inferred type to the list if it's not already present
-                if inferred_type not in column_types[column]:
-                    column_types[column].append(inferred_type)
+    return [list(row) for row in zip(*columns)]
 
-    # Determine the most specific common type for each column
-    for column, types in column_types.items():
-        column_types[column] = common_type(types)
 
-    return {column: typ.__name__ for column, typ in column_types.items()}
+def _convert_values(values: Sequence[str], types: Sequence[str]) -> list:
+    converted = []
+    for value, type_name in zip_longest(values, types[: len(values)]):
+        convert = CONVERTERS.get(type_name)
+        if convert is None:
+            converted.append(value)
+        elif value == "":
+            converted.append(None)
+        elif NATIVE_VALUE_PATTERNS[type_name].fullmatch(value):
+            try:
+                converted.append(convert(value))
+            except ValueError:
+                converted.append(value)
+        else:
+            converted.append(value)
+    return converted
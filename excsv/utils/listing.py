@@ -1,10 +1,143 @@
-from typing import List, NoReturn
+from collections import deque
+import heapq
+from itertools import count, dropwhile, islice
+import re
+from typing import Iterable, Iterator, List, Optional, Tuple
 
 
-def slice_input(input_data: List[List[str]], indices: List[int]) -> NoReturn:
-    for i, row in enumerate(input_data):
-        if i in indices:
-            yield i, row
+# e.g. 42, 6-20, 100- (to the end), 0-1000:10 (every 10th), -1 (the last row), -10-
+INDEX_RX = re.compile(r"^(-?\d+)(?:(-)(-?\d*)(?::(\d+))?)?$")
+
+
+class IndexSet:
+    """
+    A set of 0-based row indices, kept as ranges rather than a list of every index
+
+    Each range is (start, stop, step), where stop is inclusive, or None for a range
+    that's open to the end of the data. Overlapping and adjacent ranges with a step
+    of 1 are merged.
+
+    Negative starts and stops count from the end, like Python's, e.g. -1 is the last
+    row. Those can't be iterated until resolve() is given the number of rows.
+    """
+
+    def __init__(self, ranges: Iterable[Tuple[int, Optional[int], int]] = ()):
+        self.ranges: List[Tuple[int, Optional[int], int]] = []
+        from_end = []
+        for start, stop, step in sorted(ranges, key=lambda r: r[0]):
+            if start < 0 or (stop is not None and stop < 0):
+                from_end.append((start, stop, step))
+                continue
+            if self.ranges and step == 1 and self.ranges[-1][2] == 1:
+                last_start, last_stop, _ = self.ranges[-1]
+                if last_stop is None or start <= last_stop + 1:
+                    if stop is not None and last_stop is not None:
+                        stop = max(stop, last_stop)
+                    else:
+                        stop = None
+                    self.ranges[-1] = (last_start, stop, 1)
+                    continue
+            self.ranges.append((start, stop, step))
+        self.ranges.extend(from_end)
+
+    @classmethod
+    def parse(cls, values: Iterable[str]) -> "IndexSet":
+        """
+        Parse index arguments, e.g. ["1", "6-20", "100-", "0-1000:10", "-1", "-10-"];
+        raises ValueError for an invalid one
+        """
+        ranges = []
+        for value in values:
+            rx = INDEX_RX.match(value)
+            if not rx or rx.group(4) == "0":
+                raise ValueError(f"Invalid --index value: {value}")
+            start, dash, stop, step = rx.groups()
+            if not dash:
+                ranges.append((int(start), int(start), 1))
+            else:
+                ranges.append((int(start), int(stop) if stop else None, int(step or 1)))
+        return cls(ranges)
+
+    @property
+    def tail_size(self) -> int:
+        """How many rows from the end the negative indices reach, 0 if there are none"""
+        return max(
+            [-bound for r in self.ranges for bound in r[:2] if bound is not None and bound < 0],
+            default=0,
+        )
+
+    @property
+    def only_from_end(self) -> bool:
+        """
+        Whether every index counts from the end, i.e. every range starts from the end
+        and stops there too, or is open, so that they all fall within the last
+        tail_size rows, and resolve the same against just those
+        """
+        return bool(self.ranges) and all(
+            start < 0 and (stop is None or stop < 0) for start, stop, _ in self.ranges
+        )
+
+    def head_part(self) -> "IndexSet":
+        """
+        The ranges that start from the top, with negative stops left open; for rows that
+        are more than tail_size rows from the end, this matches the same rows
+        """
+        return IndexSet(
+            (start, None if stop is not None and stop < 0 else stop, step)
+            for start, stop, step in self.ranges
+            if start >= 0
+        )
+
+    def resolve(self, row_count: int) -> "IndexSet":
+        """Turn negative indices into ones counted from the top, given the number of rows"""
+        ranges = []
+        for start, stop, step in self.ranges:
+            if start < 0:
+                start += row_count
+            if stop is not None and stop < 0:
+                stop += row_count
+                if stop < 0:
+                    continue
+            ranges.append((max(start, 0), stop, step))
+        return IndexSet(ranges)
+
+    def __bool__(self) -> bool:
+        return bool(self.ranges)
+
+    def __iter__(self) -> Iterator[int]:
+        """Every index in ascending order, once; endless if a range is open"""
+        if self.tail_size:
+            raise ValueError("Negative indices have to be resolved first")
+        ranges = [
+            count(start, step) if stop is None else range(start, stop + 1, step)
+            for start, stop, step in self.ranges
+        ]
+        last = None
+        for i in heapq.merge(*ranges):
+            if i != last:
+                yield i
+                last = i
+
+
+def slice_input(
+    input_data: Iterable[List[str]], indices: Iterable[int]
+) -> Iterator[Tuple[int, List[str]]]:
+    """
+    Yield (index, row) for each of indices, which have to be in ascending order
+
+    Rows in between are skipped without being looked at, and reading stops as soon as
+    the last index has been passed, or the data runs out
+    """
+    rows = iter(input_data)
+    position = 0
+    for i in indices:
+        if i < position:
+            continue
+        row = next(islice(rows, i - position, None), None)
+        if row is None:
+            return
+        position = i + 1
+        yield i, row
 
 
 def transpose_list_of_lists(input_data: List[List[str]]) -> List[List[str]]:
@@ -21,3 +154,34 @@ def transpose_list_of_lists(input_data: List[List[str]]) -> List[List[str]]:
 
     for row in zip(*input_data):
         yield list(row)
+
+
+def slice_input_from_end(
+    input_data: Iterable[List[str]], indices: IndexSet
+) -> Iterator[Tuple[int, List[str]]]:
+    """
+    slice_input() for indices that count from the end, and so depend on the number of
+    rows, e.g. of data that can only be read once, from stdin
+
+    Only the last indices.tail_size rows are held in memory: rows that fall out of that
+    window can't be reached by a negative index, so they're matched against the
+    indices counted from the top as they go. The rest are matched once the number of
+    rows is known.
+    """
+    window = deque()
+    head_indices = iter(indices.head_part())
+    wanted = next(head_indices, None)
+    row_count = 0
+    for row_count, row in enumerate(input_data, 1):
+        window.append(row)
+        if len(window) > indices.tail_size:
+            i, old = row_count - len(window), window.popleft()
+            while wanted is not None and wanted < i:
+                wanted = next(head_indices, None)
+            if wanted == i:
+                yield i, old
+
+    window_start = row_count - len(window)
+    in_window = dropwhile(lambda i: i < window_start, indices.resolve(row_count))
+    for i, row in slice_input(window, (i - window_start for i in in_window)):
+        yield i + window_start, row
@@ -0,0 +1,146 @@
+from collections import Counter
+from itertools import islice
+import re
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Set, Tuple, Union
+
+from .columns import BATCH_SIZE, column_values
+from .validate import wrong_type_values
+
+
+class Failure(NamedTuple):
+    """
+    A value that fails a rule; rows are numbered as in a spreadsheet, i.e. the header
+    is row 1
+    """
+
+    row: int
+    column: str
+    rule: str
+    value: str
+
+
+class TypeRule:
+    """Non-blank values can be cast to a type: int, float, bool or date"""
+
+    def __init__(self, type_name: str):
+        self.type_name = type_name
+        self.name = type_name
+
+    def failing(self, values: List[str], nulls: int) -> Set[str]:
+        return wrong_type_values(values, self.type_name)
+
+
+class PatternRule:
+    """
+    Non-blank values match a regex, searched for anywhere in the value, so that it has
+    to be anchored, e.g. ^\\d{5}$, to match whole values
+    """
+
+    def __init__(self, pattern: str):
+        self.regex = re.compile(pattern)
+        self.name = f"match:{pattern}"
+
+    def failing(self, values: List[str], nulls: int) -> Set[str]:
+        search = self.regex.search
+        # a column usually has far fewer distinct values than rows
+        return {v for v in set(values) if v and not search(v)}
+
+
+class NotNullRule:
+    """Values aren't blank"""
+
+    name = "not_null"
+
+    def failing(self, values: List[str], nulls: int) -> Set[str]:
+        return {""} if nulls else set()
+
+
+Rule = Union[TypeRule, PatternRule, NotNullRule]
+
+
+class Litmus:
+    """
+    Checks many rules on many columns of rows, in a single pass: the rules are
+    grouped by column, and each column of a batch of rows is pulled out once and
+    handed to each of its rules, which check it as a whole, e.g. with one regex
+    match, or its distinct values, instead of every value against every rule
+
+    Also counts the nulls, i.e. blank values, of each column that has a rule
+    """
+
+    def __init__(self, headers: List[str], rules: Iterable[Tuple[int, Rule]]):
+        self.headers = headers
+        self.rules: Dict[int, List[Rule]] = {}
+        for ix, rule in rules:
+            self.rules.setdefault(ix, []).append(rule)
+        self.row_count = 0
+        self.nulls: Counter = Counter()
+        # by column and the rule's position among the column's rules, since two
+        # rules on a column can have the same name, e.g. the same type twice
+        self.failures: Counter = Counter()
+
+    def check(
+        self, rows: Iterable[List[str]], batch_size: int = BATCH_SIZE
+    ) -> Iterator[Failure]:
+        """Check rows of data, without their header, yielding failures in row order"""
+        rows = iter(rows)
+        while batch := list(islice(rows, batch_size)):
+            failures = []
+            for ix, rules in self.rules.items():
+                failures.extend(self._check_column(batch, ix, rules))
+            # rows, in the order that their columns' rules were given
+            failures.sort(key=lambda f: f.row)
+            self.row_count += len(batch)
+            yield from failures
+
+    def count(self, rows: Iterable[List[str]], batch_size: int = BATCH_SIZE) -> None:
+        """Check rows like check(), but only count the failures, for summary()"""
+        rows = iter(rows)
+        while batch := list(islice(rows, batch_size)):
+            for ix, rules in self.rules.items():
+                self._check_column(batch, ix, rules, collect=False)
+            self.row_count += len(batch)
+
+    def _check_column(
+        self, batch: List[List[str]], ix: int, rules: List[Rule], collect: bool = True
+    ) -> List[Failure]:
+        values = column_values(batch, ix)
+        nulls = values.count("")
+        self.nulls[ix] += nulls
+        failures = []
+        first_row = self.row_count + 2
+        for position, rule in enumerate(rules):
+            failing = rule.failing(values, nulls)
+            if not failing:
+                continue
+            if collect or len(failing) > 1:
+                positions = [i for i, value in enumerate(values) if value in failing]
+                self.failures[ix, position] += len(positions)
+            else:
+                self.failures[ix, position] += values.count(next(iter(failing)))
+            if collect:
+                column = self.column_name(ix)
+                failures.extend(
+                    Failure(first_row + i, column, rule.name, values[i]) for i in positions
+                )
+        return failures
+
+    def column_name(self, ix: int) -> str:
+        if ix < len(self.headers) and self.headers[ix]:
+            return self.headers[ix]
+        return str(ix)
+
+    def summary(self) -> Iterator[Tuple[str, str, int, int, int]]:
+        """
+        Each rule's column, name, rows checked, the column's nulls, and failures;
+        the counts are of the rows checked so far
+        """
+        for ix, rules in self.rules.items():
+            for position, rule in enumerate(rules):
+                yield (
+                    self.column_name(ix),
+                    rule.name,
+                    self.row_count,
+                    self.nulls[ix],
+                    self.failures[ix, position],
+                )
@@ -0,0 +1,363 @@
+from array import array
+from collections import Counter
+from hyperloglog import HyperLogLog
+from io import BytesIO
+import struct
+from typing import BinaryIO, Dict, Iterable, List, Optional, Sequence, Tuple
+import zlib
+
+from .columns import BATCH_SIZE, ColumnBatches
+from .infer import NATIVE_BATCH_PATTERNS, NATIVE_VALUE_PATTERNS, values_match_type
+from .sketches import KLL, SpaceSaving
+
+
+CARDINALITY_ERROR_RATE = 0.01
+
+# Quantiles reported for numeric columns
+QUANTILES = {"p25": 0.25, "p50": 0.5, "p75": 0.75}
+
+
+class ColumnProfile:
+    """
+    Summary statistics of one column, updated a batch of values at a time, in memory
+    that doesn't grow with the number of rows:
+
+    - blanks: exact count of empty values
+    - cardinality: distinct values, estimated with HyperLogLog
+    - min/max: numeric if every non-blank value is a number, otherwise alphabetical
+    - min/max/mean length of the non-blank values
+    - most common non-blank value, from a Space-Saving top-k summary, if any
+      value is known to repeat
+    - quantiles of the numeric values, from a KLL sketch
+    """
+
+    def __init__(self, name: str, position: int):
+        self.name = name
+        self.position = position
+        self.blanks = 0
+        self.cardinality = HyperLogLog(CARDINALITY_ERROR_RATE)
+        self.nonblank_count = 0
+        self.numeric_count = 0
+        self.text_min: Optional[str] = None
+        self.text_max: Optional[str] = None
+        # (value, original text) of the smallest and biggest numbers
+        self.numeric_min: Optional[Tuple[float, str]] = None
+        self.numeric_max: Optional[Tuple[float, str]] = None
+        self.min_length: Optional[int] = None
+        self.max_length = 0
+        self.total_length = 0
+        self.top_values = SpaceSaving()
+        self.quantiles = KLL()
+
+    def update(self, values: Sequence[str]) -> None:
+        counts = Counter(values)
+        # HyperLogLog is idempotent, so each distinct value only has to be added once per batch
+        for value in counts:
+            self.cardinality.add(value)
+
+        blanks = counts.pop("", 0)
+        self.blanks += blanks
+        if not counts:
+            return
+
+        nonblank = [v for v in values if v]
+        self.nonblank_count += len(nonblank)
+        self.top_values.update_counts(counts)
+
+        self.text_min = _min(self.text_min, min(counts))
+        self.text_max = _max(self.text_max, max(counts))
+
+        lengths = list(map(len, nonblank))
+        self.min_length = _min(self.min_length, min(lengths))
+        self.max_length = max(self.max_length, max(lengths))
+        self.total_length += sum(lengths)
+
+        # finite numbers written plainly, without e.g. leading zeros, which zip codes
+        # have, or the inf, nan and 1_000 that float() reads too
+        if values_match_type(nonblank, "float", NATIVE_BATCH_PATTERNS):
+            numeric = nonblank
+        else:
+            numeric = [v for v in nonblank if NATIVE_VALUE_PATTERNS["float"].fullmatch(v)]
+        if numeric:
+            numbers = list(zip(map(float, numeric), numeric))
+            self.numeric_count += len(numbers)
+            self.numeric_min = _min(self.numeric_min, min(numbers))
+            self.numeric_max = _max(self.numeric_max, max(numbers))
+            self.quantiles.update(number for number, _ in numbers)
+
+    def merge(self, other: "ColumnProfile") -> None:
+        """Combine with the profile of the same column in another part of the data"""
+        self.blanks += other.blanks
+        self.cardinality.update(other.cardinality)
+        self.nonblank_count += other.nonblank_count
+        self.numeric_count += other.numeric_count
+        for attr in ("text_min", "numeric_min", "min_length"):
+            if getattr(other, attr) is not None:
+                setattr(self, attr, _min(getattr(self, attr), getattr(other, attr)))
+        for attr in ("text_max", "numeric_max"):
+            if getattr(other, attr) is not None:
+                setattr(self, attr, _max(getattr(self, attr), getattr(other, attr)))
+        self.max_length = max(self.max_length, other.max_length)
+        self.total_length += other.total_length
+        self.top_values.merge(other.top_values)
+        self.quantiles.merge(other.quantiles)
+
+    def dump(self, writer: "_StateWriter") -> None:
+        writer.text(self.name)
+        writer.int(self.position)
+        writer.int(self.blanks)
+        writer.int(self.nonblank_count)
+        writer.int(self.numeric_count)
+        writer.text(self.text_min)
+        writer.text(self.text_max)
+        writer.optional_number(self.numeric_min)
+        writer.optional_number(self.numeric_max)
+        writer.optional_int(self.min_length)
+        writer.int(self.max_length)
+        writer.int(self.total_length)
+
+        writer.int(self.cardinality.p)
+        writer.bytes(bytes(int(r) for r in self.cardinality.M))
+
+        writer.int(self.top_values.capacity)
+        writer.int(len(self.top_values.counts))
+        for value, count in self.top_values.counts.items():
+            writer.text(value)
+            writer.int(count)
+            writer.int(self.top_values.errors[value])
+
+        writer.int(self.quantiles.k)
+        writer.int(self.quantiles.count)
+        writer.int(len(self.quantiles.compactors))
+        for items in self.quantiles.compactors:
+            writer.bytes(array("d", items).tobytes())
+
+    @classmethod
+    def load(cls, reader: "_StateReader") -> "ColumnProfile":
+        profile = cls(reader.text(), reader.int())
+        profile.blanks = reader.int()
+        profile.nonblank_count = reader.int()
+        profile.numeric_count = reader.int()
+        profile.text_min = reader.text()
+        profile.text_max = reader.text()
+        profile.numeric_min = reader.optional_number()
+        profile.numeric_max = reader.optional_number()
+        profile.min_length = reader.optional_int()
+        profile.max_length = reader.int()
+        profile.total_length = reader.int()
+
+        p = reader.int()
+        if p != profile.cardinality.p:
+            raise ValueError("Saved cardinality sketch has a different precision")
+        for j, register in enumerate(reader.bytes()):
+            if register:
+                profile.cardinality.M[j] = register
+
+        profile.top_values = SpaceSaving(reader.int())
+        for _ in range(reader.int()):
+            value = reader.text()
+            profile.top_values.counts[value] = reader.int()
+            profile.top_values.errors[value] = reader.int()
+
+        profile.quantiles = KLL(reader.int())
+        profile.quantiles.count = reader.int()
+        profile.quantiles.compactors = [
+            array("d", reader.bytes()).tolist() for _ in range(reader.int())
+        ]
+        profile.quantiles.size = sum(len(c) for c in profile.quantiles.compactors)
+        return profile
+
+    @property
+    def is_numeric(self) -> bool:
+        return self.nonblank_count > 0 and self.numeric_count == self.nonblank_count
+
+    def to_dict(self) -> Dict[str, object]:
+        if self.is_numeric:
+            min_value, max_value = self.numeric_min[1], self.numeric_max[1]
+        else:
+            min_value, max_value = self.text_min, self.text_max
+
+        most_common, most_common_count = None, None
+        for value, count, error in self.top_values.top(1):
+            # only report a value that's known to occur more than once
+            if count - error > 1:
+                most_common, most_common_count = value, count
+
+        data = {
+            "name": self.name,
+            "position": self.position,
+            "blanks": self.blanks,
+            "cardinality": len(self.cardinality),
+            "min": min_value,
+            "max": max_value,
+            "min_length": self.min_length,
+            "max_length": self.max_length if self.nonblank_count else None,
+            "mean_length": (
+                round(self.total_length / self.nonblank_count, 2)
+                if self.nonblank_count
+                else None
+            ),
+            "most_common": most_common,
+            "most_common_count": most_common_count,
+        }
+        for key, q in QUANTILES.items():
+            data[key] = (
+                format_number(self.quantiles.quantile(q)) if self.numeric_count else None
+            )
+        return data
+
+
+def profile_rows(
+    headers: List[str], rows: Iterable[List[str]], batch_size: int = BATCH_SIZE
+) -> List[ColumnProfile]:
+    """
+    Profile each column of rows of data, without their header, in batches of batch_size,
+    column by column
+    """
+    profiles = [ColumnProfile(header, i) for i, header in enumerate(headers)]
+    # short rows are padded with blanks; values past the last header are ignored
+    for columns in ColumnBatches(rows, len(headers), batch_size):
+        for profile, values in zip(profiles, columns):
+            profile.update(values)
+    return profiles
+
+
+def format_number(value: float) -> str:
+    if value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _min(current, value):
+    return value if current is None or value < current else current
+
+
+def _max(current, value):
+    return value if current is None or value > current else current
+
+
+# Saved probe state: the magic bytes and version, then a zlib-compressed payload
+STATE_MAGIC = b"EXCSVPROBE"
+STATE_VERSION = 1
+
+
+def merge_profiles(
+    profiles: List[ColumnProfile], others: List[ColumnProfile]
+) -> List[ColumnProfile]:
+    """
+    Merge the profiles of another part of the same data, e.g. another shard of a file or
+    a later append, into profiles; both have to have the same column names, in order
+    """
+    names = [p.name for p in profiles]
+    other_names = [p.name for p in others]
+    if names != other_names:
+        raise ValueError(
+            f"Can't merge profiles of different columns: {names} and {other_names}"
+        )
+    for profile, other in zip(profiles, others):
+        profile.merge(other)
+    return profiles
+
+
+def dump_profiles(profiles: List[ColumnProfile], outfile: BinaryIO) -> None:
+    """
+    Save the full state of each profile, including its sketches, in a compact
+    binary format that load_profiles() can read back and merge
+    """
+    writer = _StateWriter()
+    writer.int(len(profiles))
+    for profile in profiles:
+        profile.dump(writer)
+    outfile.write(STATE_MAGIC)
+    outfile.write(struct.pack("<B", STATE_VERSION))
+    outfile.write(zlib.compress(writer.getvalue()))
+
+
+def load_profiles(infile: BinaryIO) -> List[ColumnProfile]:
+    magic = infile.read(len(STATE_MAGIC))
+    if magic != STATE_MAGIC:
+        raise ValueError("Not a saved probe state file")
+    try:
+        (version,) = struct.unpack("<B", infile.read(1))
+        if version != STATE_VERSION:
+            raise ValueError(f"Unsupported probe state version: {version}")
+        reader = _StateReader(zlib.decompress(infile.read()))
+        return [ColumnProfile.load(reader) for _ in range(reader.int())]
+    except (zlib.error, struct.error) as err:
+        raise ValueError(f"Corrupt or truncated probe state file: {err}") from None
+
+
+class _StateWriter:
+    def __init__(self):
+        self._buf = BytesIO()
+
+    def getvalue(self) -> bytes:
+        return self._buf.getvalue()
+
+    def int(self, value: int) -> None:
+        self._buf.write(struct.pack("<q", value))
+
+    def float(self, value: float) -> None:
+        self._buf.write(struct.pack("<d", value))
+
+    def bytes(self, value: bytes) -> None:
+        self.int(len(value))
+        self._buf.write(value)
+
+    def text(self, value: Optional[str]) -> None:
+        # a length of -1 stands for None
+        if value is None:
+            self.int(-1)
+        else:
+            self.bytes(value.encode("utf-8"))
+
+    def optional_int(self, value: Optional[int]) -> None:
+        self._buf.write(struct.pack("<?", value is not None))
+        if value is not None:
+            self.int(value)
+
+    def optional_number(self, value: Optional[Tuple[float, str]]) -> None:
+        self._buf.write(struct.pack("<?", value is not None))
+        if value is not None:
+            self.float(value[0])
+            self.text(value[1])
+
+
+class _StateReader:
+    def __init__(self, data: bytes):
+        self._data = memoryview(data)
+        self._pos = 0
+
+    def _read(self, size: int) -> memoryview:
+        chunk = self._data[self._pos : self._pos + size]
+        if len(chunk) < size:
+            raise ValueError("Truncated probe state")
+        self._pos += size
+        return chunk
+
+    def int(self) -> int:
+        return struct.unpack("<q", self._read(8))[0]
+
+    def float(self) -> float:
+        return struct.unpack("<d", self._read(8))[0]
+
+    def bytes(self) -> bytes:
+        return bytes(self._read(self.int()))
+
+    def text(self) -> Optional[str]:
+        size = self.int()
+        if size == -1:
+            return None
+        return bytes(self._read(size)).decode("utf-8")
+
+    def _flag(self) -> bool:
+        return struct.unpack("<?", self._read(1))[0]
+
+    def optional_int(self) -> Optional[int]:
+        return self.int() if self._flag() else None
+
+    def optional_number(self) -> Optional[Tuple[float, str]]:
+        if not self._flag():
+            return None
+        number = self.float()
+        return number, self.text()
@@ -0,0 +1,427 @@
+import csv
+from functools import lru_cache
+import io
+import mmap
+import re
+from typing import (
+    BinaryIO,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Pattern,
+    Tuple,
+    Union,
+)
+
+
+NEWLINE_RX = re.compile(rb"\r\n?|\n")
+
+# The rest of a quoted field, after its opening quote: a doubled quote is an escaped
+# one, and the first quote that isn't doubled closes the field
+QUOTED_BODY = rb'[^"]*(?:""[^"]*)*'
+
+# Bytes read at a time when counting records
+COUNT_BLOCK_SIZE = 1024 * 1024
+
+# how many records after a candidate boundary are parsed to check that it's real
+RESYNC_CHECK_RECORDS = 5
+
+
+class RecordPatterns(NamedTuple):
+    """
+    Regexes that find records in raw bytes the way csv.reader does: a quote opens a
+    quoted field only at the start of a field, and one anywhere else, e.g. in
+    `1,5" screen`, is just a character. Once a quoted field is closed, the rest of it
+    up to the next delimiter is taken as it is, quotes included. \r\n, \r and \n
+    all end a record, like in a file read with universal newlines
+    """
+
+    # a record from its start, or the rest of one from inside a quoted field or from
+    # inside an unquoted one, up to and including the newline that ends it
+    record: Pattern[bytes]
+    from_quoted: Pattern[bytes]
+    from_unquoted: Pattern[bytes]
+    # a quote that opens a quoted field, and the rest of a quoted field to its close
+    field_quote: Pattern[bytes]
+    closing_quote: Pattern[bytes]
+    # the bytes that a quote has to follow to open a quoted field
+    field_ends: FrozenSet[bytes]
+
+
+@lru_cache(maxsize=None)
+def record_patterns(delimiter: str = ",") -> RecordPatterns:
+    try:
+        delim = re.escape(delimiter.encode("ascii"))
+    except UnicodeEncodeError:
+        raise ValueError(f"The delimiter has to be an ASCII character: {delimiter!r}")
+    if len(delimiter) != 1:
+        raise ValueError(f"The delimiter has to be a single character: {delimiter!r}")
+
+    field_quote = rb'(?:\A|(?<=[' + delim + rb'\r\n]))"'
+    closed = QUOTED_BODY + rb'"(?!")'
+    rest_of_field = rb"[^" + delim + rb"\r\n]*"
+    field = rb'(?:"' + closed + rest_of_field + rb'|[^"' + delim + rb"\r\n]" + rest_of_field + rb")?"
+    rest_of_record = rb"(?:" + delim + field + rb")*(?:\r\n?|\n)"
+    return RecordPatterns(
+        record=re.compile(field + rest_of_record),
+        from_quoted=re.compile(closed + rest_of_field + rest_of_record),
+        from_unquoted=re.compile(rest_of_field + rest_of_record),
+        field_quote=re.compile(field_quote),
+        closing_quote=re.compile(closed),
+        field_ends=frozenset([delimiter.encode("ascii"), b"\r", b"\n"]),
+    )
+
+
+def iter_record_ends(
+    buf: bytes,
+    start: int = 0,
+    end: Optional[int] = None,
+    in_quotes: bool = False,
+    delimiter: str = ",",
+) -> Iterator[int]:
+    """
+    Yield the offset just past each record-ending newline in buf[start:end]
+
+    Newlines inside quoted fields don't end records. in_quotes is whether `start` is
+    in the middle of a quoted field; if it isn't, the byte before `start` tells
+    whether it's at the start of a field. `start` and `end` mustn't split a \r\n, or
+    a doubled quote, since what they are depends on the bytes on both sides
+    """
+    if end is None:
+        end = len(buf)
+    patterns = record_patterns(delimiter)
+    pos = start
+    if in_quotes:
+        if buf.find(b'"', pos, end) == -1:
+            # the quoted field doesn't end in buf[start:end]
+            return
+        first = patterns.from_quoted
+    elif _at_field_start(buf, pos, delimiter):
+        first = None
+    else:
+        first = patterns.from_unquoted
+    if first is not None:
+        match = first.match(buf, pos, end)
+        if match is None:
+            return
+        pos = match.end()
+        yield pos
+
+    while pos < end:
+        quote = buf.find(b'"', pos, end)
+        if quote == -1:
+            # fast path: no quotes, so every newline ends a record
+            for match in NEWLINE_RX.finditer(buf, pos, end):
+                yield match.end()
+            return
+        for match in NEWLINE_RX.finditer(buf, pos, quote):
+            pos = match.end()
+            yield pos
+        # the record with the quote in it
+        match = patterns.record.match(buf, pos, end)
+        if match is None:
+            return
+        pos = match.end()
+        yield pos
+
+
+def ends_in_quotes(
+    buf: bytes,
+    start: int = 0,
+    end: Optional[int] = None,
+    in_quotes: bool = False,
+    delimiter: str = ",",
+) -> bool:
+    """Whether buf[start:end], starting in or out of a quoted field, ends inside one"""
+    if end is None:
+        end = len(buf)
+    patterns = record_patterns(delimiter)
+    pos = start
+    while True:
+        if in_quotes:
+            if buf.find(b'"', pos, end) == -1:
+                return True
+            match = patterns.closing_quote.match(buf, pos, end)
+            if match is None:
+                return True
+            pos = match.end()
+        match = patterns.field_quote.search(buf, pos, end)
+        if match is None:
+            return False
+        pos = match.end()
+        in_quotes = True
+
+
+def split_offset(buf: bytes, pos: int) -> int:
+    """
+    The first offset from pos, which has to be at least 1, that splits buf between
+    two bytes that don't depend on each other, i.e. not in a \r\n or a doubled quote,
+    or len(buf) if there's none
+    """
+    while pos < len(buf) and buf[pos - 1 : pos + 1] in (b'""', b"\r\n"):
+        pos += 1
+    return min(pos, len(buf))
+
+
+def _at_field_start(buf: bytes, pos: int, delimiter: str) -> bool:
+    return pos == 0 or buf[pos - 1 : pos] in record_patterns(delimiter).field_ends
+
+
+def parse_records(
+    data: bytes, delimiter: str = ",", encoding: str = "utf-8", errors: str = "strict"
+) -> Iterator[List[str]]:
+    """
+    Parse the records in raw bytes, with newlines translated like in a file opened
+    in text mode, so that e.g. a \r\n in a quoted field is read as \n, just as when
+    the whole file is read with csv.reader
+    """
+    text = io.TextIOWrapper(io.BytesIO(data), encoding=encoding, errors=errors)
+    return csv.reader(text, delimiter=delimiter)
+
+
+def find_record_start(
+    buf: bytes,
+    start: int = 0,
+    field_count: Optional[int] = None,
+    delimiter: str = ",",
+    encoding: str = "utf-8",
+) -> Optional[int]:
+    """
+    Find the offset of the first record boundary after `start`, where `start` is an
+    arbitrary position, e.g. a seek into the middle of a file
+
+    Whether `start` is inside a quoted field can't be known without reading from the
+    top of the file, so both possibilities are tried. The first boundary under each one
+    is checked by parsing the records that follow it: the one whose records have
+    field_count fields wins. When both (or neither) check out, the boundary that assumes
+    `start` isn't inside quotes is used. Returns None if buf has no boundary after start.
+    """
+    if start:
+        start = split_offset(buf, start)
+    candidates = []
+    for in_quotes in (False, True):
+        boundary = next(iter_record_ends(buf, start, None, in_quotes, delimiter), None)
+        if boundary is not None and boundary not in candidates:
+            candidates.append(boundary)
+
+    if not candidates:
+        return None
+    if len(candidates) == 1 or field_count is None:
+        return candidates[0]
+
+    for boundary in candidates:
+        if _records_have_field_count(buf, boundary, field_count, delimiter, encoding):
+            return boundary
+    return candidates[0]
+
+
+def _records_have_field_count(
+    buf: bytes, boundary: int, field_count: int, delimiter: str, encoding: str
+) -> bool:
+    ends = iter_record_ends(buf, boundary, delimiter=delimiter)
+    last_end = boundary
+    for _, last_end in zip(range(RESYNC_CHECK_RECORDS), ends):
+        pass
+    if last_end == boundary:
+        return False
+
+    rows = list(parse_records(buf[boundary:last_end], delimiter, encoding, "replace"))
+    return bool(rows) and all(len(row) == field_count for row in rows)
+
+
+class RecordCount(NamedTuple):
+    """
+    The record ends in a stretch of bytes, counted both ways: as if it starts outside
+    a quoted field, and as if it starts inside one, since that depends on the bytes
+    before it, along with whether it then ends inside one. Counts of consecutive
+    stretches add up with then(), so a file can be counted in pieces, e.g. in
+    parallel, and still exactly, as long as the pieces don't split a \r\n or a
+    doubled quote, see split_offset()
+    """
+
+    if_outside: int = 0
+    if_inside: int = 0
+    quoted_if_outside: bool = False
+    quoted_if_inside: bool = True
+    size: int = 0
+    ends_with_newline: bool = False
+
+    def then(self, other: "RecordCount") -> "RecordCount":
+        """The count of this stretch followed by other"""
+        if not other.size:
+            return self
+
+        def after(quoted: bool) -> Tuple[int, bool]:
+            if quoted:
+                return other.if_inside, other.quoted_if_inside
+            return other.if_outside, other.quoted_if_outside
+
+        outside, quoted_if_outside = after(self.quoted_if_outside)
+        inside, quoted_if_inside = after(self.quoted_if_inside)
+        return RecordCount(
+            self.if_outside + outside,
+            self.if_inside + inside,
+            quoted_if_outside,
+            quoted_if_inside,
+            self.size + other.size,
+            other.ends_with_newline,
+        )
+
+    @property
+    def records(self) -> int:
+        """
+        The number of records, from the top of a file, including a last one without a
+        newline, or with a quoted field that isn't closed
+        """
+        last_open = self.quoted_if_outside or not self.ends_with_newline
+        return self.if_outside + (self.size > 0 and last_open)
+
+
+def count_block(
+    buf: bytes, start: int = 0, end: Optional[int] = None, delimiter: str = ","
+) -> RecordCount:
+    """
+    Count the record ends in buf[start:end], where buf[start - 1], if there is one, is
+    the byte before the stretch, which tells whether `start` is at the start of a field
+
+    Either way of starting, the first record end is found on its own, after which
+    it's counted from the start of a record. Two such counts agree from where the
+    earlier one ends a record at the start of the later one, so the rest is usually
+    counted only once
+    """
+    if end is None:
+        end = len(buf)
+    firsts = [
+        next(iter_record_ends(buf, start, end, in_quotes, delimiter), None)
+        for in_quotes in (False, True)
+    ]
+    after = {}
+    known = sorted({first for first in firsts if first is not None})
+    if known:
+        earliest = known[0]
+        after[earliest] = _count_from_record_start(buf, earliest, end, delimiter)
+        for first in known[1:]:
+            before, quoted = _count_from_record_start(buf, earliest, first, delimiter)
+            if quoted:
+                after[first] = _count_from_record_start(buf, first, end, delimiter)
+            else:
+                count, quoted_at_end = after[earliest]
+                after[first] = count - before, quoted_at_end
+
+    def total(in_quotes: bool, first: Optional[int]) -> Tuple[int, bool]:
+        if first is None:
+            return 0, ends_in_quotes(buf, start, end, in_quotes, delimiter)
+        count, quoted_at_end = after[first]
+        return 1 + count, quoted_at_end
+
+    outside, quoted_if_outside = total(False, firsts[0])
+    inside, quoted_if_inside = total(True, firsts[1])
+    return RecordCount(
+        outside,
+        inside,
+        quoted_if_outside,
+        quoted_if_inside,
+        end - start,
+        buf[end - 1 : end] in (b"\r", b"\n"),
+    )
+
+
+def _count_from_record_start(
+    buf: bytes, start: int, end: int, delimiter: str
+) -> Tuple[int, bool]:
+    """
+    The record ends in buf[start:end], where `start` is the start of a record, and
+    whether it ends inside a quoted field
+
+    When every quote in it opens or closes a quoted field, or is doubled in one, they
+    alternate between outside and inside quoted fields, so splitting at quotes gives
+    pieces whose outside ones are joined and counted at once, without a Python-level
+    step per quote or newline. That's so when each quote that would open a quoted
+    field follows a delimiter or a newline. Otherwise, e.g. with a quote in an
+    unquoted field, records are found one by one
+    """
+    if buf.find(b'"', start, end) == -1:
+        return _count_newlines(buf[start:end]), False
+    pieces = buf[start:end].split(b'"')
+    outside = pieces[::2]
+    # the outside pieces that are followed by a quote, each with the byte before the
+    # quote, i.e. its last, or a newline for an empty first piece
+    opening = outside if len(pieces) % 2 == 0 else outside[:-1]
+    joined = b'"'.join([b"\n" + opening[0]] + opening[1:]) + b'"'
+    # a quote right after another, i.e. after an empty piece, is doubled
+    field_starts = opening[1:].count(b"")
+    for field_end in record_patterns(delimiter).field_ends:
+        field_starts += joined.count(field_end + b'"')
+    if field_starts == len(opening):
+        # a quote between the joined pieces keeps a \r and a \n apart; the newline
+        # added to the first piece doesn't count
+        count = _count_newlines(joined) - 1
+        if len(pieces) % 2:
+            count += _count_newlines(outside[-1])
+        return count, len(pieces) % 2 == 0
+
+    count = 0
+    last_end = start
+    for last_end in iter_record_ends(buf, start, end, False, delimiter):
+        count += 1
+    return count, ends_in_quotes(buf, last_end, end, False, delimiter)
+
+
+def _count_newlines(data: bytes) -> int:
+    newlines = data.count(b"\n")
+    returns = data.count(b"\r")
+    if returns:
+        newlines += returns - data.count(b"\r\n")
+    return newlines
+
+
+def count_records(
+    blocks: Iterable[bytes], delimiter: str = ",", before: bytes = b""
+) -> RecordCount:
+    """
+    Count the records in consecutive blocks of bytes, e.g. from read_blocks(); before
+    is the byte before the first block, if it isn't the start of a file
+
+    Each block is counted up to its last offset that doesn't split a \r\n or a doubled
+    quote, and the rest is counted with the next one
+    """
+    total = RecordCount()
+    buf = before
+    start = len(before)
+    for block in blocks:
+        # keep the byte before what's left to count
+        buf = buf[max(start - 1, 0) :] + block
+        start = min(start, 1)
+        end = len(buf) - 1
+        while end > start and buf[end - 1 : end + 1] in (b'""', b"\r\n"):
+            end -= 1
+        if end > start:
+            total = total.then(count_block(buf, start, end, delimiter))
+            start = end
+    if len(buf) > start:
+        total = total.then(count_block(buf, start, len(buf), delimiter))
+    return total
+
+
+def read_blocks(
+    binfile: BinaryIO, size: Optional[int] = None, block_size: int = COUNT_BLOCK_SIZE
+) -> Iterator[bytes]:
+    """Read a binary file in blocks, up to `size` bytes of it if given, or to its end"""
+    while size is None or size > 0:
+        block = binfile.read(block_size if size is None else min(block_size, size))
+        if not block:
+            return
+        if size is not None:
+            size -= len(block)
+        yield block
+
+
+def buffer_blocks(
+    data: Union[bytes, mmap.mmap], block_size: int = COUNT_BLOCK_SIZE
+) -> Iterator[bytes]:
+    """A buffer, e.g. a memory-mapped file, in blocks, like read_blocks()"""
+    for start in range(0, len(data), block_size):
+        yield data[start : start + block_size]
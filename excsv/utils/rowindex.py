@@ -0,0 +1,295 @@
+from array import array
+from contextlib import contextmanager
+from itertools import islice, takewhile
+import mmap
+import os
+from pathlib import Path
+import struct
+import sys
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+import zlib
+
+from .records import iter_record_ends, parse_records
+from .sampling import BLOCK_SIZE
+
+
+# Sidecar index file: a fixed-size header, then one little-endian uint64 per offset
+INDEX_MAGIC = b"EXCSVIDX"
+INDEX_VERSION = 2
+# magic, version, delimiter, source size, source mtime_ns, source crc32, offset count
+INDEX_HEADER = struct.Struct("<8sBcQQIQ")
+INDEX_SUFFIX = ".idx"
+
+# The most consecutive rows that RowIndex.read_rows() reads and parses at once
+MAX_RUN_ROWS = 10000
+
+# Records MappedRows finds at a time, when it needs the offsets of more rows
+SCAN_ROWS = 10000
+
+PathLike = Union[str, Path]
+
+
+def default_index_path(csv_path: PathLike) -> Path:
+    return Path(f"{csv_path}{INDEX_SUFFIX}")
+
+
+def build_index(
+    csv_path: PathLike, index_path: Optional[PathLike] = None, delimiter: str = ","
+) -> int:
+    """
+    Write a sidecar index of the byte offset of every record in a CSV file, header
+    included, followed by the file size; returns the number of data rows
+
+    Records are found with a quote-aware scan, so newlines in quoted fields are
+    handled. Where a quoted field can start depends on the delimiter, so it's stored
+    too, along with the file's size, modification time and CRC32, so that an index
+    that no longer matches its file, or how it's read, isn't used
+    """
+    index_path = index_path or default_index_path(csv_path)
+    offsets = array("Q", [0])
+    # the whole file is scanned in place, rather than copied out a block at a time
+    with mapped_file(csv_path) as data:
+        crc = zlib.crc32(data)
+        offsets.extend(iter_record_ends(data, delimiter=delimiter))
+        pos = len(data)
+    stat = os.stat(csv_path)
+
+    # the offset after the last record is the end of the file, whether or not
+    # it ends with a newline
+    if offsets[-1] != pos:
+        offsets.append(pos)
+    if sys.byteorder != "little":
+        offsets.byteswap()
+
+    with open(index_path, "wb") as outfile:
+        outfile.write(
+            INDEX_HEADER.pack(
+                INDEX_MAGIC,
+                INDEX_VERSION,
+                delimiter.encode("ascii"),
+                pos,
+                stat.st_mtime_ns,
+                crc,
+                len(offsets),
+            )
+        )
+        offsets.tofile(outfile)
+    return max(len(offsets) - 2, 0)
+
+
+def map_file(binfile: BinaryIO, sequential: bool = True) -> Union[mmap.mmap, bytes]:
+    """
+    A file opened in binary mode, memory-mapped read-only, or b"" if it's empty,
+    which can't be mapped; with sequential, the OS is told that it'll be read from
+    start to end, so that it reads ahead further, e.g. over NFS
+    """
+    if os.fstat(binfile.fileno()).st_size == 0:
+        return b""
+    mapped = mmap.mmap(binfile.fileno(), 0, access=mmap.ACCESS_READ)
+    if sequential and hasattr(mapped, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+        mapped.madvise(mmap.MADV_SEQUENTIAL)
+    return mapped
+
+
+@contextmanager
+def mapped_file(path: PathLike) -> Iterator[Union[mmap.mmap, bytes]]:
+    """A file, memory-mapped read-only for sequential reading, while in the context"""
+    with open(path, "rb") as binfile:
+        data = map_file(binfile)
+        try:
+            yield data
+        finally:
+            if isinstance(data, mmap.mmap):
+                data.close()
+
+
+class OffsetRows:
+    """
+    A memory-mapped CSV file and the byte offset of every record in it, header
+    included, followed by the offset of its end, so that any data row can be read
+    without parsing the rows before it; only the rows that are read get decoded
+
+    close() it when done, or use it as a context manager
+    """
+
+    data: Union[mmap.mmap, bytes]
+    offsets: Sequence[int]
+
+    def __init__(self):
+        self._files = []
+        self._maps = []
+
+    def _map(self, path: PathLike, sequential: bool = False) -> Union[mmap.mmap, bytes]:
+        infile = open(path, "rb")
+        self._files.append(infile)
+        mapped = map_file(infile, sequential)
+        if isinstance(mapped, mmap.mmap):
+            self._maps.append(mapped)
+        return mapped
+
+    def close(self) -> None:
+        if isinstance(self.offsets, memoryview):
+            self.offsets.release()
+        for mapped in self._maps:
+            mapped.close()
+        for infile in self._files:
+            infile.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    @property
+    def row_count(self) -> int:
+        """The number of data rows, i.e. not counting the header"""
+        return max(len(self.offsets) - 2, 0)
+
+    def has_row(self, i: int) -> bool:
+        return i < self.row_count
+
+    def row_bytes(self, start: int, stop: int) -> bytes:
+        """The raw bytes of data rows start to stop - 1"""
+        return self.data[self.offsets[start + 1] : self.offsets[stop + 1]]
+
+    def read_rows(
+        self,
+        indices: Iterable[int],
+        delimiter: str = ",",
+        encoding: str = "utf-8",
+    ) -> Iterator[Tuple[int, List[str]]]:
+        """
+        Yield (index, row) for each 0-based data row index in indices, which have to be
+        in ascending order; reading stops at the first index past the last row.
+        Consecutive indices are read and parsed as one run
+        """
+        in_range = takewhile(self.has_row, (i for i in indices if i >= 0))
+        for start, stop in _runs(in_range):
+            rows = parse_records(self.row_bytes(start, stop), delimiter, encoding)
+            yield from enumerate(rows, start)
+
+
+class RowIndex(OffsetRows):
+    """
+    A CSV file and its sidecar index, both memory-mapped
+
+    Use load_index() to open one
+    """
+
+    def __init__(self, csv_path: PathLike, index_path: PathLike):
+        super().__init__()
+        index_map = self._map(index_path)
+        (_, _, _, _, _, self.crc32, count) = INDEX_HEADER.unpack_from(index_map)
+        view = memoryview(index_map)[
+            INDEX_HEADER.size : INDEX_HEADER.size + 8 * count
+        ]
+        if sys.byteorder == "little":
+            self.offsets = view.cast("Q")
+        else:
+            self.offsets = array("Q", view)
+            self.offsets.byteswap()
+        self.data = self._map(csv_path) if count > 1 else b""
+
+
+class MappedRows(OffsetRows):
+    """
+    A memory-mapped CSV file without a sidecar index, whose record offsets are found
+    with a quote-aware scan of its raw bytes, only as far as the rows asked for, so
+    that e.g. reading row 1000 of a huge file doesn't decode or parse rows 0 to 999
+
+    Finding row_count scans the whole file
+    """
+
+    def __init__(self, csv_path: PathLike, delimiter: str = ","):
+        super().__init__()
+        self.data = self._map(csv_path, sequential=True)
+        self.offsets = array("Q", [0])
+        self._ends = iter_record_ends(self.data, delimiter=delimiter)
+        self._scanned = not self.data
+
+    def has_row(self, i: int) -> bool:
+        # data row i ends at offsets[i + 2]
+        while len(self.offsets) < i + 3 and not self._scanned:
+            self._scan(SCAN_ROWS)
+        return len(self.offsets) >= i + 3
+
+    @property
+    def row_count(self) -> int:
+        while not self._scanned:
+            self._scan(SCAN_ROWS)
+        return max(len(self.offsets) - 2, 0)
+
+    def close(self) -> None:
+        # a half-done scan holds on to the mapped buffer, which can't be closed until
+        # it lets go
+        self._ends.close()
+        super().close()
+
+    def _scan(self, rows: int) -> None:
+        size = len(self.offsets)
+        self.offsets.extend(islice(self._ends, rows))
+        if len(self.offsets) - size < rows:
+            self._scanned = True
+            # the last record might not end with a newline
+            if self.offsets[-1] != len(self.data):
+                self.offsets.append(len(self.data))
+
+
+def load_index(
+    csv_path: PathLike, index_path: Optional[PathLike] = None, delimiter: str = ","
+) -> Optional[RowIndex]:
+    """
+    Open a CSV file's sidecar index, or return None if there isn't one, or it's stale,
+    i.e. the file's size or modification time have changed since it was built, or it
+    was built for another delimiter, or by a version whose scan found records
+    differently, which is told by its format version
+    """
+    index_path = index_path or default_index_path(csv_path)
+    try:
+        with open(index_path, "rb") as infile:
+            header = infile.read(INDEX_HEADER.size)
+        stat = os.stat(csv_path)
+    except FileNotFoundError:
+        return None
+
+    if len(header) < INDEX_HEADER.size:
+        return None
+    magic, version, index_delimiter, size, mtime_ns, _, _ = INDEX_HEADER.unpack(header)
+    if magic != INDEX_MAGIC or version != INDEX_VERSION:
+        return None
+    if index_delimiter != delimiter.encode("ascii", errors="replace"):
+        return None
+    if size != stat.st_size or mtime_ns != stat.st_mtime_ns:
+        return None
+    return RowIndex(csv_path, index_path)
+
+
+def file_crc32(path: PathLike) -> int:
+    crc = 0
+    with open(path, "rb") as binfile:
+        while block := binfile.read(BLOCK_SIZE):
+            crc = zlib.crc32(block, crc)
+    return crc
+
+
+def _runs(
+    indices: Iterable[int], max_length: int = MAX_RUN_ROWS
+) -> Iterator[Tuple[int, int]]:
+    """
+    Group ascending indices into [start, stop) runs of consecutive ones, of no more
+    than max_length rows, so that a long range isn't read into memory all at once
+    """
+    start = stop = None
+    for i in indices:
+        if stop is not None and i == stop and stop - start < max_length:
+            stop += 1
+            continue
+        if start is not None and i < stop:
+            # a repeated index
+            continue
+        if start is not None:
+            yield start, stop
+        start, stop = i, i + 1
+    if start is not None:
+        yield start, stop
@@ -0,0 +1,174 @@
+from itertools import islice
+import math
+import os
+import random
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Tuple
+
+from .records import find_record_start, iter_record_ends, parse_records
+
+
+# Byte size of each block read by block_sample()
+BLOCK_SIZE = 64 * 1024
+
+
+def bernoulli_sample(
+    rows: Iterable[List[str]], fraction: float, rng: random.Random
+) -> Iterator[List[str]]:
+    """
+    Yield each row with probability `fraction`
+
+    Instead of drawing a random number per row, the gap to the next sampled row is
+    drawn from a geometric distribution, and the rows in between are skipped
+    """
+    rows = iter(rows)
+    if fraction >= 1:
+        yield from rows
+        return
+
+    log_q = math.log(1.0 - fraction)
+    while True:
+        skip = int(math.log(_uniform(rng)) / log_q)
+        row = next(islice(rows, skip, None), None)
+        if row is None:
+            return
+        yield row
+
+
+def reservoir_sample(
+    rows: Iterable[List[str]], size: int, rng: random.Random
+) -> List[List[str]]:
+    """
+    Returns a uniform random sample of `size` rows, reading all of them, but holding
+    no more than `size` in memory
+
+    Uses Li's "Algorithm L", which skips over rows that won't enter the reservoir
+    instead of drawing a random number for every row
+    """
+    rows = iter(rows)
+    reservoir = list(islice(rows, size))
+    if len(reservoir) < size or size == 0:
+        return reservoir
+
+    w = math.exp(math.log(_uniform(rng)) / size)
+    while True:
+        skip = int(math.log(_uniform(rng)) / math.log(1.0 - w))
+        row = next(islice(rows, skip, None), None)
+        if row is None:
+            return reservoir
+        reservoir[rng.randrange(size)] = row
+        w *= math.exp(math.log(_uniform(rng)) / size)
+
+
+def read_header(
+    binfile: BinaryIO, delimiter: str = ",", encoding: str = "utf-8"
+) -> Tuple[List[str], int]:
+    """
+    Returns the first record of a seekable binary file, and the byte offset where the
+    record after it starts
+    """
+    binfile.seek(0)
+    buf = b""
+    while True:
+        chunk = binfile.read(BLOCK_SIZE)
+        buf += chunk
+        # a \r or a quote at the end of what's been read depends on the next byte, if
+        # there is one; anything else ends where it is
+        held_back = chunk and buf[-1:] in (b"\r", b'"')
+        limit = len(buf) - 1 if held_back else None
+        end = next(iter_record_ends(buf, 0, limit, delimiter=delimiter), None)
+        if end is not None or not chunk:
+            break
+    if end is None:
+        end = len(buf)
+
+    header = next(parse_records(buf[:end], delimiter, encoding), [])
+    return header, end
+
+
+def block_sample(
+    binfile: BinaryIO,
+    rng: random.Random,
+    max_rows: Optional[int] = None,
+    fraction: Optional[float] = None,
+    delimiter: str = ",",
+    encoding: str = "utf-8",
+    block_size: int = BLOCK_SIZE,
+) -> Iterator[List[str]]:
+    """
+    Yield data rows from randomly chosen blocks of a seekable binary file, without
+    reading the rest of it
+
+    The data after the header is divided into blocks of block_size bytes. Blocks are
+    visited in random order, and each one yields the records that start within it, so
+    no row is sampled twice. Blocks are read until max_rows rows have been yielded or
+    `fraction` of the blocks have been read, whichever comes first.
+
+    Each block is seeked into at an arbitrary byte, so its first record is found with
+    records.find_record_start(), which checks candidate boundaries against the
+    header's field count
+    """
+    header, data_start = read_header(binfile, delimiter, encoding)
+    size = binfile.seek(0, os.SEEK_END)
+    block_count = math.ceil((size - data_start) / block_size)
+    if fraction is not None:
+        block_count_to_read = math.ceil(fraction * block_count)
+    else:
+        block_count_to_read = block_count
+
+    row_count = 0
+    for ix in rng.sample(range(block_count), block_count_to_read):
+        lo = data_start + ix * block_size
+        hi = min(lo + block_size, size)
+        for row in _block_rows(
+            binfile, lo, hi, lo == data_start, len(header), delimiter, encoding
+        ):
+            if max_rows is not None and row_count >= max_rows:
+                return
+            row_count += 1
+            yield row
+
+
+def _block_rows(
+    binfile: BinaryIO,
+    lo: int,
+    hi: int,
+    is_first: bool,
+    field_count: int,
+    delimiter: str,
+    encoding: str,
+) -> List[List[str]]:
+    """
+    Returns the records that start in the byte range [lo, hi)
+    """
+    # start one byte early, so that a record starting exactly at lo is found
+    read_start = lo if is_first else lo - 1
+    binfile.seek(read_start)
+    # read past hi, to finish the last record that starts before it
+    buf = binfile.read(2 * (hi - read_start))
+    at_eof = len(buf) < 2 * (hi - read_start)
+
+    if is_first:
+        start = 0
+    else:
+        start = find_record_start(buf, 0, field_count, delimiter, encoding)
+    if start is None or read_start + start >= hi:
+        return []
+
+    end = None
+    for end in iter_record_ends(
+        buf, start, None if at_eof else len(buf) - 1, delimiter=delimiter
+    ):
+        if read_start + end >= hi:
+            break
+    else:
+        if at_eof:
+            end = len(buf)
+    if end is None or end <= start:
+        return []
+
+    return list(parse_records(buf[start:end], delimiter, encoding, "replace"))
+
+
+def _uniform(rng: random.Random) -> float:
+    """A random number in (0, 1], which is safe to take the log of"""
+    return 1.0 - rng.random()
@@ -0,0 +1,155 @@
+from collections import Counter
+import heapq
+import math
+import random
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+
+class SpaceSaving:
+    """
+    Approximate top-k counter, i.e. the Space-Saving algorithm of Metwally et al.
+
+    Tracks at most `capacity` values. Any value that occurs more than n / capacity times
+    in a stream of n values is guaranteed to be tracked, and each tracked count
+    overestimates the true count by no more than the smallest tracked count.
+
+    Values are added in batches: the batch's exact counts are merged into the summary,
+    using the mergeable-summaries rule of Agarwal et al., where a value missing from a
+    full summary is assumed to have that summary's smallest count.
+    """
+
+    def __init__(self, capacity: int = 50):
+        self.capacity = capacity
+        self.counts: Dict[str, int] = {}
+        # how much each count may be overestimated by
+        self.errors: Dict[str, int] = {}
+
+    @property
+    def min_count(self) -> int:
+        if len(self.counts) < self.capacity:
+            return 0
+        return min(self.counts.values())
+
+    def update(self, values: Iterable[str]) -> None:
+        self.update_counts(Counter(values))
+
+    def update_counts(self, counts: Mapping[str, int]) -> None:
+        """Merge in the exact counts of a batch of values"""
+        self._merge(counts, {}, 0)
+
+    def merge(self, other: "SpaceSaving") -> None:
+        self._merge(other.counts, other.errors, other.min_count)
+
+    def _merge(
+        self, counts: Mapping[str, int], errors: Mapping[str, int], other_min: int
+    ) -> None:
+        own_min = self.min_count
+        merged = {}
+        merged_errors = {}
+        # values are visited in a fixed order, so that ties are broken the same way every run
+        values = list(self.counts)
+        values.extend(v for v in counts if v not in self.counts)
+        for value in values:
+            if value in self.counts:
+                count, error = self.counts[value], self.errors[value]
+            else:
+                count, error = own_min, own_min
+            if value in counts:
+                count += counts[value]
+                error += errors.get(value, 0)
+            else:
+                count += other_min
+                error += other_min
+            merged[value] = count
+            merged_errors[value] = error
+
+        if len(merged) > self.capacity:
+            merged = dict(
+                heapq.nlargest(self.capacity, merged.items(), key=lambda kv: kv[1])
+            )
+        self.counts = merged
+        self.errors = {value: merged_errors[value] for value in merged}
+
+    def top(self, k: int = 1) -> List[Tuple[str, int, int]]:
+        """
+        The k most common values, with their (over)estimated counts and the
+        amount each count may be overestimated by
+        """
+        # equal counts are ordered by value
+        ranked = sorted(self.counts.items(), key=lambda kv: (-kv[1], kv[0]))
+        return [(value, count, self.errors[value]) for value, count in ranked[:k]]
+
+
+class KLL:
+    """
+    Quantile sketch, i.e. the KLL sketch of Karnin, Lang and Liberty
+
+    Keeps a stack of compactors: each holds values of weight 2^level, and when one fills
+    up, it's sorted and every other value, from a random offset, is promoted to the level
+    above. Memory is O(k), and rank error is about 1.7 / k with k=200, i.e. under 1%.
+    """
+
+    def __init__(self, k: int = 200, seed: Optional[int] = 0):
+        self.k = k
+        self.compactors: List[List[float]] = [[]]
+        self.size = 0
+        self.count = 0
+        self._rng = random.Random(seed)
+
+    def capacity(self, level: int) -> int:
+        depth = len(self.compactors) - level - 1
+        return int(math.ceil(self.k * (2 / 3) ** depth)) + 1
+
+    @property
+    def max_size(self) -> int:
+        return sum(self.capacity(level) for level in range(len(self.compactors)))
+
+    def update(self, values: Iterable[float]) -> None:
+        before = len(self.compactors[0])
+        self.compactors[0].extend(values)
+        added = len(self.compactors[0]) - before
+        self.size += added
+        self.count += added
+        self._compress()
+
+    def merge(self, other: "KLL") -> None:
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append([])
+        for level, items in enumerate(other.compactors):
+            self.compactors[level].extend(items)
+        self.size = sum(len(c) for c in self.compactors)
+        self.count += other.count
+        self._compress()
+
+    def _compress(self) -> None:
+        while self.size >= self.max_size:
+            for level in range(len(self.compactors)):
+                if len(self.compactors[level]) >= self.capacity(level):
+                    if level + 1 == len(self.compactors):
+                        self.compactors.append([])
+                    items = sorted(self.compactors[level])
+                    # an odd item out stays at this level
+                    keep = [items.pop()] if len(items) % 2 else []
+                    offset = self._rng.randint(0, 1)
+                    self.compactors[level + 1].extend(items[offset::2])
+                    self.compactors[level] = keep
+                    break
+            self.size = sum(len(c) for c in self.compactors)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """The approximate value at quantile q, e.g. 0.5 for the median"""
+        weighted = sorted(
+            (value, 2**level)
+            for level, items in enumerate(self.compactors)
+            for value in items
+        )
+        if not weighted:
+            return None
+        total = sum(weight for _, weight in weighted)
+        rank = q * total
+        cumulative = 0
+        for value, weight in weighted:
+            cumulative += weight
+            if cumulative >= rank:
+                return value
+        return weighted[-1][0]
@@ -0,0 +1,60 @@
+import os
+from typing import BinaryIO, List
+
+from .records import iter_record_ends, parse_records, split_offset
+from .sampling import BLOCK_SIZE, read_header
+
+
+def tail_records(
+    binfile: BinaryIO,
+    n: int,
+    data_start: int = 0,
+    block_size: int = BLOCK_SIZE,
+    delimiter: str = ",",
+) -> bytes:
+    """
+    Returns the bytes of the last n records of a seekable binary file, or of all the
+    records after data_start, if there are fewer
+
+    The file is read backwards from the end, in blocks that double in size, so the cost
+    depends on n rather than on the size of the file. Whether the bytes read so far
+    start inside a quoted field can't be known without reading from the top, so they
+    are scanned both ways: once the two scans end a record at the same place, they
+    agree from there on, and the records after it are found exactly
+    """
+    if n <= 0:
+        return b""
+    pos = binfile.seek(0, os.SEEK_END)
+    data = b""
+    size = block_size
+    while True:
+        lo = max(pos - size, data_start)
+        # with the byte before, which tells whether lo is at the start of a field
+        context = 1 if lo > data_start else 0
+        binfile.seek(lo - context)
+        buf = binfile.read(pos - lo + context) + data
+        data = buf[context:]
+        pos = lo
+
+        if context:
+            start = split_offset(buf, 1)
+            ends = list(iter_record_ends(buf, start, None, False, delimiter))
+            ended = set(ends)
+            in_quotes = iter_record_ends(buf, start, None, True, delimiter)
+            common = next((end for end in in_quotes if end in ended), None)
+            starts = [] if common is None else [end for end in ends if end >= common]
+        else:
+            starts = [0] + list(iter_record_ends(buf, 0, None, False, delimiter))
+        starts = [start for start in starts if start < len(buf)]
+        if len(starts) >= n or not context:
+            return buf[starts[max(len(starts) - n, 0)] :] if starts else b""
+        size *= 2
+
+
+def tail_rows(
+    binfile: BinaryIO, n: int, delimiter: str = ",", encoding: str = "utf-8"
+) -> List[List[str]]:
+    """The last n data rows, not counting the header, of a seekable binary file"""
+    _, data_start = read_header(binfile, delimiter, encoding)
+    records = tail_records(binfile, n, data_start, delimiter=delimiter)
+    return list(parse_records(records, delimiter, encoding))
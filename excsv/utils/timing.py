@@ -0,0 +1,211 @@
+from contextlib import contextmanager, nullcontext
+import sys
+from time import perf_counter
+from typing import Any, Callable, ContextManager, Dict, Iterable, Iterator, List, Optional
+
+
+# The number of allocation sites reported by tracemalloc
+TRACEMALLOC_TOP = 10
+
+# The profiler of the running command, if --profile was given
+_profiler: Optional["Profiler"] = None
+
+
+class Span:
+    """The total time spent in one stage of a command, and the rows it handled"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.seconds = 0.0
+        self.calls = 0
+        self.rows = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "seconds": round(self.seconds, 6),
+            "calls": self.calls,
+            "rows": self.rows or None,
+            "rows_per_second": (
+                round(self.rows / self.seconds) if self.rows and self.seconds else None
+            ),
+        }
+
+
+class Profiler:
+    """
+    Records timing spans for the stages of a command, e.g. reading rows, profiling
+    them, saving a workbook; spans with the same name add up
+
+    Stages run in worker processes, e.g. with --jobs, aren't seen: they're part of
+    the span of whatever waits for them
+    """
+
+    def __init__(self, command: str = "", tracemalloc: bool = False):
+        self.command = command
+        self.spans: Dict[str, Span] = {}
+        self.tracemalloc = tracemalloc
+        self.start = perf_counter()
+        if tracemalloc:
+            import tracemalloc as _tracemalloc
+
+            _tracemalloc.start()
+
+    def span(self, name: str) -> Span:
+        if name not in self.spans:
+            self.spans[name] = Span(name)
+        return self.spans[name]
+
+    def report(self) -> Dict[str, Any]:
+        seconds = perf_counter() - self.start
+        rows = self.spans["read"].rows if "read" in self.spans else None
+        report = {
+            "command": self.command,
+            "seconds": round(seconds, 6),
+            "rows": rows,
+            "rows_per_second": round(rows / seconds) if rows and seconds else None,
+            "peak_rss_mb": peak_rss_mb(),
+            "spans": [span.to_dict() for span in self.spans.values()],
+        }
+        if self.tracemalloc:
+            import tracemalloc
+
+            _, peak = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+            report["tracemalloc_peak_mb"] = round(peak / 2**20, 3)
+            report["tracemalloc_top"] = [
+                {"site": str(stat.traceback), "size_mb": round(stat.size / 2**20, 3)}
+                for stat in snapshot.statistics("lineno")[:TRACEMALLOC_TOP]
+            ]
+        return report
+
+
+def start_profiling(command: str = "", tracemalloc: bool = False) -> Profiler:
+    global _profiler
+    _profiler = Profiler(command, tracemalloc)
+    return _profiler
+
+
+def stop_profiling() -> Optional[Dict[str, Any]]:
+    """Stop recording, and return the report of what was recorded, if anything"""
+    global _profiler
+    profiler, _profiler = _profiler, None
+    return profiler.report() if profiler else None
+
+
+def span(name: str, rows: int = 0) -> ContextManager:
+    """
+    Time a block as part of the span `name`, if profiling; costs next to nothing if not,
+    but use timed() for functions called once per row
+    """
+    if _profiler is None:
+        return nullcontext()
+    return _timed_block(_profiler.span(name), rows)
+
+
+@contextmanager
+def _timed_block(record: Span, rows: int) -> Iterator[None]:
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        record.seconds += perf_counter() - start
+        record.calls += 1
+        record.rows += rows
+
+
+def timed(name: str, fn: Callable, rows_per_call: int = 1) -> Callable:
+    """
+    fn, wrapped to time each call as part of the span `name`, if profiling; otherwise
+    fn itself, so that a function called per row costs nothing extra
+    """
+    if _profiler is None:
+        return fn
+    record = _profiler.span(name)
+
+    def wrapper(*args, **kwargs):
+        start = perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            record.seconds += perf_counter() - start
+            record.calls += 1
+            record.rows += rows_per_call
+
+    return wrapper
+
+
+def timed_rows(name: str, rows: Iterable[List[str]]) -> Iterable[List[str]]:
+    """
+    rows, timing how long each one takes to come, e.g. to be parsed, as the span
+    `name`, if profiling; otherwise rows as they are
+    """
+    if _profiler is None:
+        return rows
+    return _timed_rows(_profiler.span(name), iter(rows))
+
+
+def _timed_rows(record: Span, rows: Iterator[List[str]]) -> Iterator[List[str]]:
+    while True:
+        start = perf_counter()
+        row = next(rows, None)
+        record.seconds += perf_counter() - start
+        record.calls += 1
+        if row is None:
+            return
+        record.rows += 1
+        yield row
+
+
+class TimedWriter:
+    """A csv.writer whose writes are timed as the span "write" """
+
+    def __init__(self, writer):
+        self._writer = writer
+        self.writerow = timed("write", writer.writerow)
+
+    def writerows(self, rows: Iterable) -> None:
+        for row in rows:
+            self.writerow(row)
+
+    def __getattr__(self, name):
+        return getattr(self._writer, name)
+
+
+def timed_writer(writer):
+    """writer, with its writes timed if profiling"""
+    if _profiler is None:
+        return writer
+    return TimedWriter(writer)
+
+
+def peak_rss_mb() -> Optional[float]:
+    """This process's peak resident memory, or None where that's not available"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (2**20 if sys.platform == "darwin" else 2**10), 3)
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """A report from stop_profiling() as text, one line per span"""
+    lines = [f"excsv {report['command']}: {report['seconds']:.3f}s"]
+    if report["rows"]:
+        lines[0] += f", {report['rows']} rows, {report['rows_per_second']} rows/s"
+    if report["peak_rss_mb"] is not None:
+        lines[0] += f", peak memory {report['peak_rss_mb']:.1f} MB"
+    width = max((len(s["name"]) for s in report["spans"]), default=0)
+    for s in report["spans"]:
+        line = f"  {s['name']:<{width}}  {s['seconds']:>10.3f}s  {s['calls']:>9} calls"
+        if s["rows"]:
+            line += f"  {s['rows']:>10} rows  {s['rows_per_second'] or 0:>9} rows/s"
+        lines.append(line)
+    if "tracemalloc_peak_mb" in report:
+        lines.append(f"  tracemalloc peak: {report['tracemalloc_peak_mb']:.1f} MB")
+        for stat in report["tracemalloc_top"]:
+            lines.append(f"    {stat['size_mb']:>9.3f} MB  {stat['site']}")
+    return "\n".join(lines)
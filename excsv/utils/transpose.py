@@ -0,0 +1,104 @@
+from contextlib import ExitStack
+import csv
+from io import StringIO
+import os
+from tempfile import TemporaryDirectory
+from typing import Iterable, Iterator, List, Optional, TextIO, Tuple
+
+
+# Default memory budget for the rows held by transpose_rows()
+MAX_MEMORY = 256 * 1024 * 1024
+
+# csv.writer's default
+LINE_TERMINATOR = "\r\n"
+
+# Rough per-value overhead of a str in a list, on top of its characters
+VALUE_OVERHEAD = 64
+
+
+def transpose_rows(
+    rows: Iterable[List[str]],
+    outfile: TextIO,
+    delimiter: str = ",",
+    max_memory: int = MAX_MEMORY,
+    temp_dir: Optional[str] = None,
+) -> None:
+    """
+    Write the transpose of rows to outfile as CSV, i.e. each column becomes a row;
+    like zip(*rows), columns past the shortest row are dropped
+
+    Rows are read in batches of about max_memory bytes. If they all fit in one batch,
+    it's transposed in memory. Otherwise each batch is transposed into a spill file
+    in a temporary directory, one record per column. Output row j is then written by
+    reading the j-th record of each spill file in turn, so only one batch's worth of a
+    column is held at a time. The temporary directory is removed afterwards.
+    """
+    rows = iter(rows)
+    batch, exhausted = _read_batch(rows, max_memory)
+    if exhausted:
+        csv.writer(outfile, delimiter=delimiter).writerows(zip(*batch))
+        return
+
+    with ExitStack() as stack:
+        spill_dir = stack.enter_context(
+            TemporaryDirectory(prefix="excsv-transpose-", dir=temp_dir)
+        )
+        spill_paths = []
+        column_count = None
+        while batch:
+            path = os.path.join(spill_dir, f"{len(spill_paths)}.csv")
+            with open(path, "w", newline="", encoding="utf-8") as spill:
+                columns = list(zip(*batch))
+                csv.writer(spill).writerows(columns)
+            spill_paths.append(path)
+            if column_count is None or len(columns) < column_count:
+                column_count = len(columns)
+            if exhausted:
+                break
+            batch, exhausted = _read_batch(rows, max_memory)
+
+        spill_readers = [
+            csv.reader(stack.enter_context(open(path, newline="", encoding="utf-8")))
+            for path in spill_paths
+        ]
+        _write_spilled_rows(spill_readers, column_count, outfile, delimiter)
+
+
+def _read_batch(
+    rows: Iterator[List[str]], max_memory: int
+) -> Tuple[List[List[str]], bool]:
+    """Returns rows up to about max_memory bytes, and whether rows ran out"""
+    batch = []
+    size = 0
+    for row in rows:
+        batch.append(row)
+        size += sum(map(len, row)) + VALUE_OVERHEAD * len(row)
+        if size >= max_memory:
+            return batch, False
+    return batch, True
+
+
+def _write_spilled_rows(
+    spill_readers: List[Iterator[List[str]]],
+    column_count: int,
+    outfile: TextIO,
+    delimiter: str,
+) -> None:
+    # each output row is written a spill file's piece at a time, formatted exactly as
+    # csv.writer would format the whole row. The pieces keep the line terminator
+    # while they're formatted, since values that contain it have to be quoted
+    piece = StringIO()
+    piece_writer = csv.writer(piece, delimiter=delimiter, lineterminator=LINE_TERMINATOR)
+    for _ in range(column_count):
+        for k, reader in enumerate(spill_readers):
+            if k:
+                outfile.write(delimiter)
+            values = next(reader)
+            # a lone empty value is written as '""' by csv.writer, to tell it apart
+            # from a blank line, but within a longer row it's just empty
+            if values != [""] or len(spill_readers) == 1:
+                piece.seek(0)
+                piece.truncate()
+                piece_writer.writerow(values)
+                outfile.write(piece.getvalue()[: -len(LINE_TERMINATOR)])
+        outfile.write(LINE_TERMINATOR)
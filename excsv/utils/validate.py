@@ -0,0 +1,200 @@
+from datetime import date
+from itertools import chain, islice
+import re
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Set
+
+from .columns import BATCH_SIZE, column_values
+from .infer import NATIVE_TYPE_PATTERNS, VALUE_PATTERNS, values_match_type
+
+
+# Control characters other than tab, newline and carriage return, and the lone
+# surrogates that the "surrogateescape" error handler decodes invalid bytes to
+BAD_CHARS_RX = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f\x7f\udc80-\udcff]")
+SURROGATE_RX = re.compile(r"[\udc80-\udcff]")
+# The same control characters, as bytes, for ASCII text
+CONTROL_BYTES = bytes(c for c in range(0x20) if c not in b"\t\n\r") + b"\x7f"
+
+NUMBER_RX = re.compile(NATIVE_TYPE_PATTERNS["float"])
+
+# The error handler to decode input with, so that invalid bytes become violations
+# instead of stopping the read
+DECODE_ERRORS = "surrogateescape"
+
+
+class Violation(NamedTuple):
+    """
+    A value or row that breaks a rule; rows are numbered as in a spreadsheet, i.e.
+    the header is row 1
+    """
+
+    row: int
+    column: str
+    rule: str
+    message: str
+
+
+def validate_header(headers: List[str]) -> List[Violation]:
+    """
+    Check that there is a header row, and that its names are all there, unique, and
+    look like names rather than values
+    """
+    if not headers:
+        return [Violation(1, "", "header", "No header row")]
+
+    violations = []
+    seen = set()
+    for ix, name in enumerate(headers):
+        column = _column_name(headers, ix)
+        if not name.strip():
+            violations.append(Violation(1, column, "header", f"Column {ix} has no name"))
+        elif name in seen:
+            violations.append(Violation(1, column, "header", f"Duplicate header: {name!r}"))
+        elif NUMBER_RX.fullmatch(name):
+            violations.append(
+                Violation(1, column, "header", f"Header {name!r} looks like a value, not a name")
+            )
+        seen.add(name)
+    violations.extend(_bad_chars([headers], headers, 1))
+    return violations
+
+
+def validate_rows(
+    rows: Iterable[List[str]],
+    headers: List[str],
+    column_types: Optional[Dict[int, str]] = None,
+    batch_size: int = BATCH_SIZE,
+) -> Iterator[Violation]:
+    """
+    Check data rows, in batches of batch_size, yielding violations in row order:
+
+    - field_count: the row has a different number of values than there are headers
+    - encoding: a value had bytes that aren't valid in the input's encoding
+    - control_char: a value has a control character, other than tab or a newline
+    - type: a value in a column of column_types, given by column number, isn't blank
+      and doesn't match the column's type, e.g. int or date
+
+    Each check runs on a whole batch at once, e.g. one regex search of all of its
+    values, and only looks at single values when the batch has something wrong
+    """
+    column_types = column_types or {}
+    rows = iter(rows)
+    first_row = 2
+    while batch := list(islice(rows, batch_size)):
+        violations = []
+        violations.extend(_field_counts(batch, headers, first_row))
+        violations.extend(_bad_chars(batch, headers, first_row))
+        for ix, type_name in column_types.items():
+            violations.extend(_wrong_types(batch, headers, ix, type_name, first_row))
+        violations.sort(key=lambda v: v.row)
+        yield from violations
+        first_row += len(batch)
+
+
+def _column_name(headers: List[str], ix: int) -> str:
+    name = headers[ix] if ix < len(headers) and headers[ix] else str(ix)
+    return _printable(name)
+
+
+def _printable(value: str) -> str:
+    """value, with any invalid bytes it was decoded with replaced by U+FFFD"""
+    if not SURROGATE_RX.search(value):
+        return value
+    return value.encode("utf-8", DECODE_ERRORS).decode("utf-8", "replace")
+
+
+def _field_counts(
+    batch: List[List[str]], headers: List[str], first_row: int
+) -> Iterator[Violation]:
+    width = len(headers)
+    if set(map(len, batch)) == {width}:
+        return
+    for row_number, row in enumerate(batch, first_row):
+        if len(row) != width:
+            yield Violation(
+                row_number, "", "field_count", f"Expected {width} values, got {len(row)}"
+            )
+
+
+def _bad_chars(
+    batch: List[List[str]], headers: List[str], first_row: int
+) -> Iterator[Violation]:
+    if not _has_bad_chars("\n".join(chain.from_iterable(batch))):
+        return
+    for row_number, row in enumerate(batch, first_row):
+        for ix, value in enumerate(row):
+            if SURROGATE_RX.search(value):
+                yield Violation(
+                    row_number,
+                    _column_name(headers, ix),
+                    "encoding",
+                    f"Invalid bytes in {_printable(value)!r}",
+                )
+            elif BAD_CHARS_RX.search(value):
+                yield Violation(
+                    row_number,
+                    _column_name(headers, ix),
+                    "control_char",
+                    f"Control character in {value!r}",
+                )
+
+
+def _has_bad_chars(text: str) -> bool:
+    # deleting bytes is several times faster than a regex search, for ASCII
+    if text.isascii():
+        data = text.encode("ascii")
+        return len(data.translate(None, CONTROL_BYTES)) != len(data)
+    return BAD_CHARS_RX.search(text) is not None
+
+
+def _wrong_types(
+    batch: List[List[str]],
+    headers: List[str],
+    ix: int,
+    type_name: str,
+    first_row: int,
+) -> Iterator[Violation]:
+    values = column_values(batch, ix)
+    wrong = wrong_type_values(values, type_name)
+    if not wrong:
+        return
+    for row_number, value in enumerate(values, first_row):
+        if value in wrong:
+            yield Violation(
+                row_number,
+                _column_name(headers, ix),
+                "type",
+                f"{value!r} is not {type_name}",
+            )
+
+
+def wrong_type_values(values: Sequence[str], type_name: str) -> Set[str]:
+    """
+    The distinct values that aren't blank and don't match type_name, e.g. int or
+    date; checked with one batch regex match first, and only value by value if that
+    fails, or for dates, which also have to exist, e.g. not 2024-02-30
+    """
+    if type_name == "str":
+        return set()
+    matched = values_match_type(values, type_name)
+    if matched and type_name != "date":
+        return set()
+    # a column usually has far fewer distinct values than rows
+    distinct = set(values)
+    distinct.discard("")
+    if not matched:
+        pattern = VALUE_PATTERNS[type_name]
+        wrong = {v for v in distinct if not pattern.fullmatch(v)}
+        distinct -= wrong
+    else:
+        wrong = set()
+    if type_name == "date":
+        wrong.update(v for v in distinct if not _is_date(v))
+    return wrong
+
+
+def _is_date(value: str) -> bool:
+    try:
+        date.fromisoformat(value)
+    except ValueError:
+        return False
+    return True
@@ -26,7 +26,7 @@ setup(
     },
     license="Apache License, Version 2.0",
     version=VERSION,
-    packages=find_packages(exclude=["tests", "tests.*"]),
+    packages=find_packages(exclude=["tests", "tests.*", "benchmarks", "benchmarks.*"]),
     entry_points="""
         [console_scripts]
         excsv=excsv.cli:cli
@@ -35,7 +35,9 @@ setup(
         "click>=8.1",
         "hyperloglog",
         "rich_click",
-        "openpyxl",
+        # excsv.utils.excel uses a few private parts of openpyxl's workbooks and
+        # write-only sheets, which are only known to work in this range
+        "openpyxl>=3.1,<3.2",
         "click-default-group>=1.2.3",
         "setuptools",
         "pip",
@@ -47,7 +49,10 @@ setup(
             "pytest-mock",
             "black>=24.2.0",
             "types-click",
-        ]
+        ],
+        "pyarrow": ["pyarrow"],
+        "polars": ["polars"],
+        "zstd": ["zstandard"],
     },
     python_requires=">=3.8",
 )
@@ -0,0 +1,36 @@
+from importlib.util import find_spec
+import inspect
+
+from click.testing import CliRunner
+import pytest
+from excsv.utils.engines import ENGINES
+
+
+@pytest.fixture(
+    autouse=True,
+    params=[
+        pytest.param(
+            engine,
+            marks=pytest.mark.skipif(
+                engine != "stdlib" and find_spec(engine) is None,
+                reason=f"{engine} isn't installed",
+            ),
+        )
+        for engine in ENGINES
+    ],
+)
+def engine(request, monkeypatch):
+    """Run every CLI test with each parser engine that's installed"""
+    monkeypatch.setenv("EXCSV_ENGINE", request.param)
+    return request.param
+
+
+@pytest.fixture
+def stderr_runner():
+    """
+    A CliRunner whose results keep stdout and stderr apart, which click 8.2+ does by
+    default, and click 8.1, e.g. on Python 3.8, only with mix_stderr=False
+    """
+    if "mix_stderr" in inspect.signature(CliRunner).parameters:
+        return CliRunner(mix_stderr=False)
+    return CliRunner()
@@ -69,18 +69,16 @@ def test_default_excsv_call_with_no_subcommand(input_file):
             ), "Verify the content matches the CSV input"
             assert sheet["B1"].value == "age"
             assert sheet["A2"].value == "Alice"
-            assert sheet["B2"].value == "42"
+            assert sheet["B2"].value == 42
             assert sheet["A3"].value == "Bob"
-            assert sheet["B3"].value == "9"
+            assert sheet["B3"].value == 9
             assert sheet["A4"].value == "Chaz"
-            assert sheet["B4"].value == "101"
+            assert sheet["B4"].value == 101
 
 
-@pytest.mark.skip("excel to stdout deprecated")
 def test_default_excsv_call_stdout_with_no_subcommand(input_file):
     """
-    As shown in README.md
-    $ excsv mydata.csv > mysheet.xlsx
+    $ excsv mydata.csv -o - > mysheet.xlsx
     """
     runner = CliRunner()
 
@@ -88,7 +86,7 @@ def test_default_excsv_call_stdout_with_no_subcommand(input_file):
         test_out_path = "mysheet.xlsx"
 
         with open(test_out_path, "wb") as output_file:
-            result = runner.invoke(cli, [str(input_file)])
+            result = runner.invoke(cli, [str(input_file), "-o", "-"])
             output_file.write(result.stdout_bytes)
 
         assert result.exit_code == 0
@@ -99,7 +97,7 @@ def test_default_excsv_call_stdout_with_no_subcommand(input_file):
         assert sheet["A1"].value == "name"
         assert sheet["B1"].value == "age"
         assert sheet["A2"].value == "Alice"
-        assert sheet["B2"].value == "42"
+        assert sheet["B2"].value == 42
 
 
 @pytest.mark.alpha
@@ -123,4 +121,10 @@ def test_default_excsv_call_stdin_stdout(input_file):
         assert sheet["A1"].value == "name"
         assert sheet["B1"].value == "age"
         assert sheet["A2"].value == "Alice"
-        assert sheet["B2"].value == "42"
+        assert sheet["B2"].value == 42
+
+
+def test_unknown_engine():
+    runner = CliRunner()
+    result = runner.invoke(cli, ["--engine", "nope", "probe", "-"], input="a,b\n1,2\n")
+    assert result.exit_code != 0
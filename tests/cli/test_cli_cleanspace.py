@@ -37,3 +37,48 @@ def test_cli_cleanspace(input_file):
     assert (
         "\nCha Cha,101" in result.output
     ), "cleanspace converts each newline into a whitespace, within field values"
+
+
+def test_cli_cleanspace_parallel_jobs(input_file):
+    runner = CliRunner()
+    serial = runner.invoke(cli, ["cleanspace", str(input_file)])
+    result = runner.invoke(cli, ["cleanspace", "--jobs", "2", str(input_file)])
+    assert result.exit_code == 0
+    assert result.output == serial.output
+
+
+def test_cli_cleanspace_parallel_jobs_crlf_and_stray_quotes(tmp_path):
+    p = tmp_path / "crlf.csv"
+    p.write_bytes(
+        b'id,size,note\r\n1,5" screen,"two\r\nlines"\r\n2,"7"" tab",x\r\n3,10" x,"a\r\nb"\r\n'
+    )
+    runner = CliRunner()
+    serial = runner.invoke(cli, ["cleanspace", str(p)])
+    result = runner.invoke(cli, ["cleanspace", "--jobs", "2", str(p)])
+    assert result.exit_code == 0
+    assert result.output == serial.output
+    assert '1,"5"" screen",two lines\n' in result.output
+
+
+def test_cli_cleanspace_headers_only(input_file):
+    runner = CliRunner()
+    result = runner.invoke(cli, ["cleanspace", "--headers-only", str(input_file)])
+    assert result.exit_code == 0
+    assert result.output.startswith("name,their age\nAlice , 42\n")
+
+
+def test_cli_cleanspace_columns(input_file):
+    runner = CliRunner()
+    result = runner.invoke(cli, ["cleanspace", "-c", "their age", str(input_file)])
+    assert result.exit_code == 0
+    assert result.output == 'name ,their age\nAlice ,42\n  Bob ,9\n"Cha\nCha",101\n'
+
+    by_number = runner.invoke(cli, ["cleanspace", "-c", "1", str(input_file)])
+    assert by_number.output == result.output
+
+
+def test_cli_cleanspace_unknown_column(input_file):
+    runner = CliRunner()
+    result = runner.invoke(cli, ["cleanspace", "-c", "nope", str(input_file)])
+    assert result.exit_code == 2
+    assert "No such column: nope" in result.output
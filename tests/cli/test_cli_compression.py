@@ -0,0 +1,82 @@
+import gzip
+import lzma
+
+import pytest
+from click.testing import CliRunner
+from excsv.cli import cli
+
+
+DATA = "name,age\nAlice,42\nBob,9\nChaz,101\n"
+
+
+@pytest.fixture
+def gz_file(tmp_path):
+    p = tmp_path / "input.csv.gz"
+    p.write_bytes(gzip.compress(DATA.encode()))
+    return p
+
+
+@pytest.mark.parametrize(
+    "args, expected",
+    [
+        (["slice", "-i", "1"], "name,age\nBob,9\n"),
+        (["--mmap", "slice", "-i", "-1"], "name,age\nChaz,101\n"),
+        (["tail", "-n", "1"], "name,age\nChaz,101\n"),
+        (["count", "--jobs", "2"], "3\n"),
+    ],
+)
+def test_compressed_input(gz_file, args, expected):
+    runner = CliRunner()
+    result = runner.invoke(cli, [*args, str(gz_file)])
+    assert result.exit_code == 0
+    assert result.output == expected
+
+
+def test_compressed_stdin():
+    runner = CliRunner()
+    result = runner.invoke(cli, ["slice", "-i", "0"], input=lzma.compress(DATA.encode()))
+    assert result.exit_code == 0
+    assert result.output == "name,age\nAlice,42\n"
+
+
+def test_plain_input_that_starts_like_bzip2(tmp_path):
+    p = tmp_path / "input.csv"
+    p.write_text("BZh,b\n1,2\n")
+    runner = CliRunner()
+    for args in (["slice", "-i", "0", str(p)], ["slice", "-i", "0"]):
+        result = runner.invoke(cli, args, input=p.read_text())
+        assert result.exit_code == 0
+        assert result.output == "BZh,b\n1,2\n"
+
+
+@pytest.mark.parametrize("args", [["count"], ["slice", "-i", "-1"], ["cleanspace"]])
+def test_truncated_compressed_input(tmp_path, monkeypatch, args):
+    # a short, relative path, so that the error box doesn't wrap it
+    monkeypatch.chdir(tmp_path)
+    p = tmp_path / "input.csv.gz"
+    p.write_bytes(gzip.compress(DATA.encode() * 1000)[:-20])
+    runner = CliRunner()
+    result = runner.invoke(cli, [*args, "input.csv.gz"])
+    assert result.exit_code == 1
+    assert "input.csv.gz is truncated or corrupt" in result.output
+    assert "Aborted" not in result.output
+
+
+def test_compressed_output(gz_file, tmp_path):
+    out = tmp_path / "out.csv.gz"
+    runner = CliRunner()
+    result = runner.invoke(cli, ["cleanspace", str(gz_file), "-o", str(out)])
+    assert result.exit_code == 0
+    assert gzip.decompress(out.read_bytes()).decode() == DATA.replace("\n", "\r\n")
+
+
+def test_zstd_input_without_zstandard(tmp_path, monkeypatch):
+    import sys
+
+    monkeypatch.setitem(sys.modules, "zstandard", None)
+    p = tmp_path / "input.csv.zst"
+    p.write_bytes(b"\x28\xb5\x2f\xfd" + b"\x00" * 10)
+    runner = CliRunner()
+    result = runner.invoke(cli, ["count", str(p)])
+    assert result.exit_code == 2
+    assert "zstd needs the zstandard package" in result.output
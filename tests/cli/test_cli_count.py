@@ -0,0 +1,49 @@
+import pytest
+from click.testing import CliRunner
+from excsv.cli import cli
+
+
+DATA = 'id,note\n1,"two\nlines"\n2,"a ""quote"""\n3,last'
+
+
+@pytest.fixture
+def input_file(tmp_path):
+    p = tmp_path / "input.csv"
+    p.write_text(DATA)
+    return p
+
+
+@pytest.mark.parametrize(
+    "args", [["count"], ["--mmap", "count"], ["count", "--jobs", "2"]]
+)
+def test_count(input_file, args):
+    runner = CliRunner()
+    result = runner.invoke(cli, [*args, str(input_file)])
+    assert result.exit_code == 0
+    assert result.output == "3\n"
+
+
+def test_count_stdin():
+    runner = CliRunner()
+    result = runner.invoke(cli, ["count"], input=DATA + "\n")
+    assert result.exit_code == 0
+    assert result.output == "3\n"
+
+
+def test_count_empty_input():
+    runner = CliRunner()
+    result = runner.invoke(cli, ["count"], input="")
+    assert result.exit_code == 0
+    assert result.output == "0\n"
+
+
+@pytest.mark.parametrize(
+    "args", [["count"], ["--mmap", "count"], ["count", "--jobs", "2"]]
+)
+def test_count_quotes_inside_unquoted_fields(tmp_path, args):
+    p = tmp_path / "screens.csv"
+    p.write_text('id;desc\n1;5" screen\n2;ok\n3;7" tab\n4;x\n')
+    runner = CliRunner()
+    result = runner.invoke(cli, [*args, "-d", ";", str(p)])
+    assert result.exit_code == 0
+    assert result.output == "4\n"
@@ -22,13 +22,14 @@ Chaz,101
     return p
 
 
-def mock_csv_to_workbook(csv_reader):
-    return BytesIO(b"Mock Excel Content")
+def mock_csv_to_workbook(csv_reader, output, **kwargs):
+    with open(output, "wb") as f:
+        f.write(b"Mock Excel Content")
 
 
 @pytest.fixture(autouse=True)
 def mock_csv_to_workbook_function(mocker):
-    mocker.patch("excsv.cli.csv_to_workbook", new=mock_csv_to_workbook)
+    mocker.patch("excsv.utils.excel.csv_to_workbook", new=mock_csv_to_workbook)
 
 
 @pytest.mark.alpha
@@ -0,0 +1,131 @@
+import pytest
+from click.testing import CliRunner
+from excsv.cli import cli
+from openpyxl import load_workbook
+
+
+@pytest.fixture
+def input_files(tmp_path):
+    alpha = tmp_path / "alpha.csv"
+    alpha.write_text("name,age\nAlice,42\n")
+    beta = tmp_path / "beta.csv"
+    beta.write_text("region\nNorth\n")
+    return [alpha, beta]
+
+
+def test_excel_multiple_inputs_default_sheet_names(input_files, tmp_path):
+    out_path = tmp_path / "out.xlsx"
+    runner = CliRunner()
+    result = runner.invoke(
+        cli, ["excel", *map(str, input_files), "-o", str(out_path), "-j", "2"]
+    )
+    assert result.exit_code == 0
+    wb = load_workbook(out_path)
+    assert wb.sheetnames == ["alpha", "beta"]
+    assert wb["beta"]["A2"].value == "North"
+
+
+def test_excel_sheet_name_option(input_files, tmp_path):
+    out_path = tmp_path / "out.xlsx"
+    runner = CliRunner()
+    result = runner.invoke(
+        cli,
+        ["excel", *map(str, input_files), "-s", "First", "-o", str(out_path)],
+    )
+    assert result.exit_code == 0
+    wb = load_workbook(out_path)
+    assert wb.sheetnames == ["First", "beta"], "unnamed inputs fall back to filename"
+
+
+def test_excel_single_input_sheet_name(input_files, tmp_path):
+    out_path = tmp_path / "out.xlsx"
+    runner = CliRunner()
+    result = runner.invoke(
+        cli, ["excel", str(input_files[0]), "-s", "People", "-o", str(out_path)]
+    )
+    assert result.exit_code == 0
+    assert load_workbook(out_path).sheetnames[0] == "People"
+
+
+def test_excel_too_many_sheet_names(input_files, tmp_path):
+    runner = CliRunner()
+    result = runner.invoke(
+        cli,
+        ["excel", str(input_files[0]), "-s", "a", "-s", "b", "-o", str(tmp_path / "x.xlsx")],
+    )
+    assert result.exit_code == 2
+    assert "--sheet-name" in result.output
+
+
+def test_excel_no_infer_types(input_files, tmp_path):
+    out_path = tmp_path / "out.xlsx"
+    runner = CliRunner()
+    result = runner.invoke(
+        cli, ["excel", str(input_files[0]), "--no-infer-types", "-o", str(out_path)]
+    )
+    assert result.exit_code == 0
+    assert load_workbook(out_path).active["B2"].value == "42"
+
+
+def test_excel_infer_types_keeps_long_ids_as_text(tmp_path):
+    p = tmp_path / "ids.csv"
+    p.write_text("id,n\n123456789012345678,1\n234567890123456789,2\n")
+    out_path = tmp_path / "out.xlsx"
+    runner = CliRunner()
+    result = runner.invoke(cli, ["excel", str(p), "-o", str(out_path)])
+    assert result.exit_code == 0
+    sheet = load_workbook(out_path).active
+    assert sheet["A2"].value == "123456789012345678"
+    assert sheet["B2"].value == 1
+
+
+@pytest.mark.parametrize(
+    "titles, message",
+    [
+        (["Q1/Q2"], "can't contain"),
+        (["x" * 32], "longer than 31 characters"),
+        ([""], "can't be blank"),
+        (["Sales", "sales"], "Duplicate sheet title: 'Sales'"),
+        (["beta"], "Duplicate sheet title: 'beta'"),
+    ],
+)
+def test_excel_invalid_sheet_names(input_files, tmp_path, titles, message):
+    out_path = tmp_path / "out.xlsx"
+    args = [arg for title in titles for arg in ("-s", title)]
+    runner = CliRunner()
+    result = runner.invoke(
+        cli, ["excel", *map(str, input_files), *args, "-o", str(out_path)]
+    )
+    assert result.exit_code == 2
+    assert "--sheet-name" in result.output
+    assert message in result.output
+    assert not out_path.exists()
+
+
+def test_excel_same_file_names_get_numbered_sheets(tmp_path):
+    paths = []
+    for sub in ("a", "b"):
+        (tmp_path / sub).mkdir()
+        paths.append(tmp_path / sub / "data.csv")
+        paths[-1].write_text("x\n1\n")
+    out_path = tmp_path / "out.xlsx"
+    runner = CliRunner()
+    result = runner.invoke(cli, ["excel", *map(str, paths), "-o", str(out_path)])
+    assert result.exit_code == 0
+    assert load_workbook(out_path).sheetnames == ["data", "data1"]
+
+
+def test_excel_sheets_read_like_a_single_input(tmp_path):
+    p = tmp_path / "notes.csv"
+    p.write_bytes('name,note\r\nZoë,"naïve\r\ncafé"\r\n'.encode("utf-8"))
+    runner = CliRunner()
+    single = tmp_path / "single.xlsx"
+    runner.invoke(cli, ["excel", str(p), "-o", str(single)])
+    several = tmp_path / "several.xlsx"
+    result = runner.invoke(cli, ["excel", str(p), str(p), "-o", str(several)])
+    assert result.exit_code == 0
+
+    expected = [[c.value for c in row] for row in load_workbook(single).active.rows]
+    assert expected[1] == ["Zoë", "naïve\ncafé"]
+    for sheet in load_workbook(several).worksheets:
+        assert [[c.value for c in row] for row in sheet.rows] == expected
@@ -0,0 +1,64 @@
+import pytest
+from click.testing import CliRunner
+from excsv.cli import cli
+
+
+@pytest.fixture
+def input_file(tmp_path):
+    d = tmp_path / "sub"
+    d.mkdir()
+    p = d / "input.csv"
+    p.write_text(
+        """
+name,note
+Alice,"two
+lines"
+Bob,9
+Chaz,101
+""".strip()
+    )
+    return p
+
+
+def test_cli_index(input_file):
+    runner = CliRunner()
+    result = runner.invoke(cli, ["index", str(input_file)])
+    assert result.exit_code == 0
+    assert (input_file.parent / "input.csv.idx").exists()
+
+    result = runner.invoke(cli, ["index", "--check", str(input_file)])
+    assert result.exit_code == 0
+
+
+def test_cli_slice_with_index(input_file):
+    runner = CliRunner()
+    runner.invoke(cli, ["index", str(input_file)])
+    result = runner.invoke(cli, ["slice", "-i", "0", "-i", "2", str(input_file)])
+    assert result.exit_code == 0
+    assert result.output == 'name,note\nAlice,"two\nlines"\nChaz,101\n'
+
+
+def test_cli_index_check_fails_when_file_changed(input_file):
+    runner = CliRunner()
+    runner.invoke(cli, ["index", str(input_file)])
+    input_file.write_text("name,note\nDan,1\n")
+
+    result = runner.invoke(cli, ["index", "--check", str(input_file)])
+    assert result.exit_code == 1
+
+    result = runner.invoke(cli, ["slice", "-i", "0", str(input_file)])
+    assert result.exit_code == 0
+    assert "Dan,1" in result.output, "stale index is ignored"
+
+
+def test_cli_slice_with_index_reads_like_without(tmp_path):
+    p = tmp_path / "screens.csv"
+    p.write_bytes(b'id;desc\r\n1;5" screen\r\n2;"a\r\nb"\r\n3;7" tab\r\n')
+    runner = CliRunner()
+    args = ["slice", "-d", ";", "-i", "1", "-i", "2", str(p)]
+    without = runner.invoke(cli, args)
+    result = runner.invoke(cli, ["index", "-d", ";", str(p)])
+    assert "Indexed 3 rows" in result.output
+    result = runner.invoke(cli, args)
+    assert result.exit_code == 0
+    assert result.output == without.output == 'id,desc\n2,"a\nb"\n3,"7"" tab"\n'
@@ -33,3 +33,77 @@ def test_cli_infer(input_file):
     assert "name,str" in result.output
     assert "age,int" in result.output
     assert "improv rate,float" in result.output
+
+
+def test_cli_infer_bool_date_and_null_columns(tmp_path):
+    p = tmp_path / "input.csv"
+    p.write_text("id,active,joined,notes\n1,true,2024-01-31,\n2,FALSE,2024-02-01,\n")
+    runner = CliRunner()
+    result = runner.invoke(cli, ["infer", str(p)])
+    assert result.exit_code == 0
+    assert "id,int" in result.output
+    assert "active,bool" in result.output
+    assert "joined,date" in result.output
+    assert "notes,null" in result.output
+
+
+def test_cli_infer_agrees_with_validate(tmp_path):
+    p = tmp_path / "input.csv"
+    p.write_text('zip,id,n\n00123,12345678901234567," 2"\n98765,1,3\n')
+    runner = CliRunner()
+    result = runner.invoke(cli, ["infer", str(p)])
+    assert result.exit_code == 0
+    assert result.output.splitlines()[1:] == ["zip,int", "id,int", "n,int"]
+    args = ["-t", "zip:int", "-t", "id:int", "-t", "n:int"]
+    result = runner.invoke(cli, ["validate", str(p), *args])
+    assert result.exit_code == 0
+
+
+@pytest.fixture
+def long_input_file(tmp_path):
+    p = tmp_path / "long.csv"
+    p.write_text(
+        "id,score\n" + "".join(f"{i},{i}.5\n" for i in range(3000)) + "x,1\n"
+    )
+    return p
+
+
+def test_cli_infer_sample_rows(long_input_file):
+    runner = CliRunner()
+    result = runner.invoke(cli, ["infer", "-n", "100", str(long_input_file)])
+    assert result.exit_code == 0
+    assert "fieldname,datatype,values_checked,confidence\n" in result.output
+    assert "id,int,100,0.6340" in result.output, "the last row isn't sampled"
+
+
+@pytest.mark.parametrize("method", ["reservoir", "blocks"])
+def test_cli_infer_sample_methods(long_input_file, method):
+    runner = CliRunner()
+    result = runner.invoke(
+        cli,
+        ["infer", str(long_input_file), "-n", "500", "--sample-method", method, "--seed", "1"],
+    )
+    assert result.exit_code == 0
+    assert "score,float,500," in result.output
+
+
+def test_cli_infer_reservoir_requires_sample_rows(long_input_file):
+    runner = CliRunner()
+    result = runner.invoke(
+        cli, ["infer", str(long_input_file), "--sample-method", "reservoir"]
+    )
+    assert result.exit_code == 2
+
+
+def test_cli_infer_stable_rows(long_input_file):
+    runner = CliRunner()
+    result = runner.invoke(cli, ["infer", str(long_input_file), "--stable-rows", "1000"])
+    assert result.exit_code == 0
+    assert "id,int,2000," in result.output
+
+
+def test_cli_infer_parallel_jobs(input_file):
+    runner = CliRunner()
+    result = runner.invoke(cli, ["infer", "--jobs", "2", str(input_file)])
+    assert result.exit_code == 0
+    assert result.output == "fieldname,datatype\nname,str\nage,int\nimprov rate,float\n"
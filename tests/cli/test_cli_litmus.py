@@ -0,0 +1,73 @@
+import pytest
+from click.testing import CliRunner
+from excsv.cli import cli
+
+
+@pytest.fixture
+def input_file(tmp_path):
+    p = tmp_path / "input.csv"
+    p.write_text("id,zip,note\n1,01234,a\nx,1234,\n3,99999,b\n")
+    return p
+
+
+def test_litmus(input_file):
+    runner = CliRunner()
+    result = runner.invoke(
+        cli, ["litmus", str(input_file), "-t", "id:int", "-m", r"zip:^\d{5}$", "-n", "note"]
+    )
+    assert result.exit_code == 1
+    assert result.stdout.splitlines() == [
+        "row,column,rule,value",
+        "3,id,int,x",
+        r"3,zip,match:^\d{5}$,1234",
+        "3,note,not_null,",
+    ]
+
+
+def test_litmus_summary(input_file):
+    runner = CliRunner()
+    result = runner.invoke(
+        cli, ["litmus", str(input_file), "-t", "0:int", "-n", "note", "--summary"]
+    )
+    assert result.exit_code == 1
+    assert result.stdout.splitlines() == [
+        "column,rule,rows,nulls,failures",
+        "id,int,3,0,1",
+        "note,not_null,3,1,1",
+    ]
+
+
+def test_litmus_passing(input_file):
+    runner = CliRunner()
+    result = runner.invoke(cli, ["litmus", str(input_file), "-m", "zip:^[0-9]"])
+    assert result.exit_code == 0
+    assert result.stdout == "row,column,rule,value\n"
+
+
+@pytest.mark.parametrize(
+    "args, message",
+    [
+        ([], "Give at least one rule"),
+        (["-m", "zip:["], "Invalid regex"),
+        (["-t", "id:number"], "Expected COLUMN:TYPE"),
+        (["-n", "nope"], "No such column: nope"),
+    ],
+)
+def test_litmus_bad_rules(input_file, args, message):
+    runner = CliRunner()
+    result = runner.invoke(cli, ["litmus", str(input_file), *args])
+    assert result.exit_code == 2
+    assert message in result.output
+
+
+def test_litmus_summary_of_the_same_rule_twice(input_file):
+    runner = CliRunner()
+    result = runner.invoke(
+        cli, ["litmus", str(input_file), "-t", "id:int", "-t", "0:int", "--summary"]
+    )
+    assert result.exit_code == 1
+    assert result.stdout.splitlines() == [
+        "column,rule,rows,nulls,failures",
+        "id,int,3,0,1",
+        "id,int,3,0,1",
+    ]
@@ -1,3 +1,4 @@
+import json
 import pytest
 from click.testing import CliRunner
 from excsv.cli import cli
@@ -33,3 +34,59 @@ def test_cli_transpose(input_file):
         "age,1,1,3" in result.output
     ), "Validate that empty column value is counted as blank and as 1 possible cardinality"
     assert "region,2,0,2" in result.output, "validate cardinality"
+
+
+def test_cli_probe_column_stats(input_file):
+    runner = CliRunner()
+    result = runner.invoke(cli, ["probe", str(input_file)])
+    assert result.exit_code == 0
+    assert (
+        "name,position,blanks,cardinality,min,max,min_length,max_length,mean_length,most_common,most_common_count,p25,p50,p75\n"
+        in result.output
+    )
+    assert "age,1,1,3,42,101,2,3,2.5,,,42,42,101" in result.output
+    assert "region,2,0,2,North,South,5,5,5.0,North,2,,," in result.output
+
+
+def test_cli_probe_parallel_jobs(input_file):
+    runner = CliRunner()
+    serial = runner.invoke(cli, ["probe", str(input_file)])
+    result = runner.invoke(cli, ["probe", "-j", "2", str(input_file)])
+    assert result.exit_code == 0
+    assert result.output == serial.output
+
+
+def test_cli_probe_parallel_jobs_crlf_and_stray_quotes(tmp_path):
+    p = tmp_path / "crlf.csv"
+    p.write_bytes(
+        b'id,size,note\r\n1,5" screen,"two\r\nlines"\r\n2,"7"" tab",x\r\n3,10" x,"a\r\nb"\r\n'
+    )
+    runner = CliRunner()
+    serial = runner.invoke(cli, ["probe", str(p)])
+    result = runner.invoke(cli, ["probe", "-j", "2", str(p)])
+    assert result.exit_code == 0
+    assert result.output == serial.output
+    assert "note,2,0,3," in result.output
+
+
+def test_probe_profile_report(tmp_path):
+    runner = CliRunner()
+    report_path = tmp_path / "profile.json"
+    result = runner.invoke(
+        cli,
+        ["--profile-output", str(report_path), "probe", "-"],
+        input="name,age\nAlice,42\nBob,9\n",
+    )
+    assert result.exit_code == 0
+    report = json.loads(report_path.read_text())
+    assert report["command"] == "probe"
+    assert report["rows"] == 3
+    assert "profile_rows" in [s["name"] for s in report["spans"]]
+
+
+def test_probe_profile_on_stderr(stderr_runner):
+    result = stderr_runner.invoke(cli, ["--profile", "probe", "-"], input="a,b\n1,2\n")
+    assert result.exit_code == 0
+    assert result.stderr.startswith("excsv probe:")
+    assert "profile_rows" in result.stderr
+    assert "profile_rows" not in result.stdout
@@ -0,0 +1,51 @@
+import pytest
+from click.testing import CliRunner
+from excsv.cli import cli
+
+
+@pytest.fixture
+def input_file(tmp_path):
+    p = tmp_path / "input.csv"
+    p.write_text("name,age,region\nAlice,42,North\nBob,,North\nChaz,101,South\n")
+    return p
+
+
+def test_cli_probe_merge_saved_states(tmp_path, input_file):
+    more = tmp_path / "more.csv"
+    more.write_text("name,age,region\nDan,42,South\n")
+    runner = CliRunner()
+    for path in (input_file, more):
+        result = runner.invoke(
+            cli, ["probe", str(path), "--save-state", f"{path}.probe", "-o", "/dev/null"]
+        )
+        assert result.exit_code == 0
+
+    result = runner.invoke(cli, ["probe-merge", f"{input_file}.probe", f"{more}.probe"])
+    assert result.exit_code == 0
+    assert "name,0,0,4,Alice,Dan" in result.output
+    assert "age,1,1,3,42,101,2,3,2.33,42,2" in result.output
+    assert "region,2,0,2,North,South,5,5,5.0" in result.output
+
+    appended = runner.invoke(
+        cli, ["probe", str(more), "--merge-state", f"{input_file}.probe"]
+    )
+    assert appended.exit_code == 0
+    assert appended.output == result.output
+
+
+def test_cli_probe_merge_corrupt_state(tmp_path, input_file):
+    state = tmp_path / "input.probe"
+    runner = CliRunner()
+    runner.invoke(
+        cli, ["probe", str(input_file), "--save-state", str(state), "-o", "/dev/null"]
+    )
+    state.write_bytes(state.read_bytes()[:-10])
+
+    result = runner.invoke(cli, ["probe-merge", str(state)])
+    assert result.exit_code == 2
+    assert "STATE_FILES" in result.output
+    assert "Corrupt or truncated" in result.output
+
+    result = runner.invoke(cli, ["probe", str(input_file), "--merge-state", str(state)])
+    assert result.exit_code == 2
+    assert "--merge-state" in result.output
@@ -138,3 +138,66 @@ def test_slice_raises_error_when_invalid_index_argument(input_file):
     result = runner.invoke(cli, ["slice", "-i", "42,233", str(input_file)])
     assert result.exit_code == 2
     assert "Invalid --index value: 42,233" in result.output
+
+
+def test_slice_with_open_and_step_ranges(input_file):
+    runner = CliRunner()
+    result = runner.invoke(cli, ["slice", "-i", "4-", "-i", "0-3:2", str(input_file)])
+    assert result.exit_code == 0
+    assert result.output == "name,age\nAlice,42\nChaz,101\nEgon,3000\nFran,5555\n"
+
+
+def test_slice_with_negative_indices(input_file):
+    runner = CliRunner()
+    result = runner.invoke(cli, ["slice", "-i", "-1", "-i", "-3", str(input_file)])
+    assert result.exit_code == 0
+    assert result.output == "name,age\nDan,2000\nFran,5555\n"
+
+
+def test_slice_with_negative_and_positive_indices_from_stdin(input_file):
+    runner = CliRunner()
+    result = runner.invoke(
+        cli, ["slice", "-i", "0", "-i", "-2-"], input=input_file.read_text()
+    )
+    assert result.exit_code == 0
+    assert result.output == "name,age\nAlice,42\nEgon,3000\nFran,5555\n"
+
+
+@pytest.mark.parametrize(
+    "indices, expected",
+    [
+        (["1", "3"], "name,age\nBob,9\nDan,2000\n"),
+        (["4-", "0-3:2"], "name,age\nAlice,42\nChaz,101\nEgon,3000\nFran,5555\n"),
+        (["0", "-2-"], "name,age\nAlice,42\nEgon,3000\nFran,5555\n"),
+        (["10"], "name,age\n"),
+    ],
+)
+def test_slice_with_mmap(input_file, indices, expected):
+    runner = CliRunner()
+    args = [arg for i in indices for arg in ("-i", i)]
+    result = runner.invoke(cli, ["--mmap", "slice", *args, str(input_file)])
+    assert result.exit_code == 0
+    assert result.output == expected
+
+
+def test_slice_with_mmap_reads_like_without(tmp_path):
+    p = tmp_path / "screens.csv"
+    p.write_bytes(b'id,desc\r\n1,5" screen\r\n2,"a\r\nb"\r\n3,7" tab\r\n')
+    runner = CliRunner()
+    args = ["slice", "-i", "1-", str(p)]
+    without = runner.invoke(cli, args)
+    result = runner.invoke(cli, ["--mmap", *args])
+    assert result.exit_code == 0
+    assert result.output == without.output == 'id,desc\n2,"a\nb"\n3,"7"" tab"\n'
+
+
+@pytest.mark.parametrize("index", ["-5-3", "-3-98", "-5--2", "-3-", "0--98", "-100-2"])
+def test_slice_from_the_end_of_a_file_reads_like_stdin(tmp_path, index):
+    p = tmp_path / "numbers.csv"
+    p.write_text("n\n" + "".join(f"{i}\n" for i in range(100)))
+    runner = CliRunner()
+    piped = runner.invoke(cli, ["slice", "-i", index], input=p.read_text())
+    for global_args in ([], ["--mmap"]):
+        result = runner.invoke(cli, [*global_args, "slice", "-i", index, str(p)])
+        assert result.exit_code == 0
+        assert result.output == piped.output
@@ -0,0 +1,67 @@
+from pathlib import Path
+import shutil
+import subprocess
+import sys
+
+import pytest
+import excsv
+
+
+# Modules that are slow to import, and only needed by some commands
+HEAVY_MODULES = ["openpyxl", "hyperloglog", "rich.console", "concurrent.futures"]
+
+CHECK_MODULES = f"""
+import sys
+from excsv.cli import cli
+try:
+    cli(sys.argv[1:])
+except SystemExit:
+    pass
+print(",".join(m for m in {HEAVY_MODULES!r} if m in sys.modules))
+"""
+
+
+def loaded_heavy_modules(*args, input=""):
+    result = subprocess.run(
+        [sys.executable, "-c", CHECK_MODULES, *args],
+        input=input,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return result.stdout.splitlines()[-1]
+
+
+@pytest.mark.parametrize(
+    "args, expected",
+    [
+        (["--help"], "rich.console"),
+        (["slice", "-i", "0"], ""),
+        (["tail"], ""),
+        (["cleanspace"], ""),
+        (["infer"], ""),
+        (["transpose"], ""),
+        (["probe"], "hyperloglog"),
+    ],
+)
+def test_commands_only_import_the_heavy_modules_they_need(args, expected):
+    assert loaded_heavy_modules(*args, input="a,b\n1,2\n") == expected
+
+
+COMPILE_SOURCES = """
+import pathlib, sys
+for path in pathlib.Path(sys.argv[1]).rglob("*.py"):
+    compile(path.read_text(encoding="utf-8"), str(path), "exec")
+"""
+
+
+def test_package_compiles_on_the_oldest_supported_python():
+    # setup.py's python_requires; e.g. decorators that subscript a dict are 3.9+
+    python = shutil.which("python3.8")
+    if not python or subprocess.run([python, "--version"], capture_output=True).returncode:
+        pytest.skip("python3.8 isn't installed")
+    package_dir = Path(excsv.__file__).parent
+    result = subprocess.run(
+        [python, "-c", COMPILE_SOURCES, str(package_dir)], capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,65 @@
+import pytest
+from click.testing import CliRunner
+from excsv.cli import cli
+
+
+@pytest.fixture
+def input_file(tmp_path):
+    d = tmp_path / "sub"
+    d.mkdir()
+    p = d / "input.csv"
+    p.write_text(
+        """
+name,age
+Alice,42
+Bob,"9
+years"
+Chaz,101
+""".strip()
+    )
+    return p
+
+
+def test_tail(input_file):
+    runner = CliRunner()
+    result = runner.invoke(cli, ["tail", "-n", "2", str(input_file)])
+    assert result.exit_code == 0
+    assert result.output == 'name,age\nBob,"9\nyears"\nChaz,101\n'
+
+
+def test_tail_from_stdin(input_file):
+    runner = CliRunner()
+    result = runner.invoke(cli, ["tail", "-n", "1"], input=input_file.read_text())
+    assert result.exit_code == 0
+    assert result.output == "name,age\nChaz,101\n"
+
+
+def test_tail_with_index(input_file):
+    runner = CliRunner()
+    runner.invoke(cli, ["index", str(input_file)])
+    result = runner.invoke(cli, ["tail", "-n", "5", str(input_file)])
+    assert result.exit_code == 0
+    assert result.output == 'name,age\nAlice,42\nBob,"9\nyears"\nChaz,101\n'
+
+
+def test_tail_reads_like_stdin(tmp_path):
+    p = tmp_path / "screens.csv"
+    p.write_bytes(b'id,desc\r\n1,"a\r\nb"\r\n2,5" screen\r\n3,7" tab\r\n')
+    runner = CliRunner()
+    piped = runner.invoke(cli, ["tail", "-n", "3"], input=p.read_bytes())
+    result = runner.invoke(cli, ["tail", "-n", "3", str(p)])
+    assert result.exit_code == 0
+    assert result.output == piped.output == 'id,desc\n1,"a\nb"\n2,"5"" screen"\n3,"7"" tab"\n'
+
+
+@pytest.mark.parametrize(
+    "args", [["tail"], ["slice", "-i", "-1"], ["cleanspace", "-j", "2"]]
+)
+def test_header_only_crlf_file_reads_like_stdin(tmp_path, args):
+    p = tmp_path / "header.csv"
+    p.write_bytes(b"a,b\r\n")
+    runner = CliRunner()
+    piped = runner.invoke(cli, args, input=p.read_bytes())
+    result = runner.invoke(cli, [*args, str(p)])
+    assert result.exit_code == 0
+    assert result.output == piped.output == "a,b\n"
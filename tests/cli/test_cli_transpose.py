@@ -27,3 +27,13 @@ def test_cli_transpose(input_file):
         "name,Alice,Bob,Chaz" in result.output
     ), "transpose result first row is the first header and its values"
     assert "age,42,9,101" in result.output
+
+
+def test_cli_transpose_with_temp_dir(input_file, tmp_path):
+    runner = CliRunner()
+    result = runner.invoke(
+        cli,
+        ["transpose", "--max-memory", "1", "--temp-dir", str(tmp_path), str(input_file)],
+    )
+    assert result.exit_code == 0
+    assert result.output == "name,Alice,Bob,Chaz\nage,42,9,101\n"
@@ -0,0 +1,46 @@
+import pytest
+from click.testing import CliRunner
+from excsv.cli import cli
+
+
+@pytest.fixture
+def input_file(tmp_path):
+    p = tmp_path / "input.csv"
+    p.write_bytes(b"id,name,id\n1,Alice,a\nx,Bob\n3,Ch\xffaz,c\n")
+    return p
+
+
+def test_validate(input_file):
+    runner = CliRunner()
+    result = runner.invoke(cli, ["validate", str(input_file), "-t", "0:int"])
+    assert result.exit_code == 1
+    assert result.stdout.splitlines() == [
+        "row,column,rule,message",
+        "1,id,header,Duplicate header: 'id'",
+        '3,,field_count,"Expected 3 values, got 2"',
+        "3,id,type,'x' is not int",
+        "4,name,encoding,Invalid bytes in 'Ch�az'",
+    ]
+
+
+def test_validate_max_errors(input_file, stderr_runner):
+    result = stderr_runner.invoke(cli, ["validate", str(input_file), "--max-errors", "2"])
+    assert result.exit_code == 1
+    assert len(result.stdout.splitlines()) == 3
+    assert "Stopped after 2 violations" in result.stderr
+
+
+def test_validate_valid_input():
+    runner = CliRunner()
+    result = runner.invoke(
+        cli, ["validate", "-t", "age:int"], input="name,age\nAlice,42\nBob,\n"
+    )
+    assert result.exit_code == 0
+    assert result.stdout == "row,column,rule,message\n"
+
+
+def test_validate_unknown_type_column():
+    runner = CliRunner()
+    result = runner.invoke(cli, ["validate", "-t", "nope:int"], input="a,b\n1,2\n")
+    assert result.exit_code == 2
+    assert "No such column: nope" in result.output
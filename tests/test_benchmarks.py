@@ -0,0 +1,29 @@
+import pytest
+from benchmarks import run
+from benchmarks.generate import SHAPES, generate_csv
+
+
+@pytest.mark.parametrize("shape", SHAPES)
+def test_generate_csv_is_seeded(tmp_path, shape):
+    a = generate_csv(tmp_path / "a.csv", shape, 50, seed=1)
+    b = generate_csv(tmp_path / "b.csv", shape, 50, seed=1)
+    c = generate_csv(tmp_path / "c.csv", shape, 50, seed=2)
+    assert a.read_bytes() == b.read_bytes() != c.read_bytes()
+
+
+def test_run_suite(tmp_path, monkeypatch):
+    monkeypatch.setitem(run.SCALES, "tiny", 20)
+    results = run.run_suite(["probe", "slice"], ["quoted"], ["tiny"], tmp_path)
+    assert set(results) == {"startup", "probe/quoted/tiny", "slice/quoted/tiny"}
+    assert all(r["seconds"] > 0 and r["peak_rss_mb"] > 0 for r in results.values())
+
+
+def test_compare():
+    baseline = {"probe/tall/10k": {"seconds": 1.0, "peak_rss_mb": 50.0}}
+    results = {
+        "probe/tall/10k": {"seconds": 1.2, "peak_rss_mb": 80.0},
+        "infer/tall/10k": {"seconds": 9.0, "peak_rss_mb": 9.0},
+    }
+    assert run.compare(results, baseline, 0.25) == [
+        "probe/tall/10k peak_rss_mb: 80.000 vs 50.000 (+60%)"
+    ]
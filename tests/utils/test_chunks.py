@@ -0,0 +1,78 @@
+import csv
+from io import StringIO
+
+import pytest
+from excsv.utils.chunks import count_chunks, map_chunks, read_chunk, record_boundaries
+
+
+ROWS = [["id", "note"]] + [
+    [str(i), 'line one\nline "two"' if i % 3 == 0 else f"note {i}"] for i in range(200)
+]
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    p = tmp_path / "notes.csv"
+    buf = StringIO(newline="")
+    csv.writer(buf).writerows(ROWS)
+    p.write_bytes(buf.getvalue().encode("utf-8"))
+    return p
+
+
+@pytest.fixture
+def stray_quotes_path(tmp_path):
+    p = tmp_path / "screens.csv"
+    p.write_bytes(
+        b"".join(
+            b'%d,5" screen,"a\r\nb ""c"""\r\n' % i if i % 2 else b'%d,"x,y",1"\r\n' % i
+            for i in range(100)
+        )
+    )
+    return p
+
+
+@pytest.mark.parametrize("chunk_size", [1, 16, 100, 100000])
+def test_record_boundaries_never_split_quoted_newlines(csv_path, chunk_size):
+    data_start = len(b"id,note\r\n")
+    boundaries = record_boundaries(csv_path.read_bytes(), data_start, chunk_size)
+
+    assert boundaries[0] == data_start
+    assert boundaries[-1] == csv_path.stat().st_size
+    rows = []
+    for lo, hi in zip(boundaries, boundaries[1:]):
+        rows.extend(read_chunk(str(csv_path), lo, hi))
+    assert rows == ROWS[1:]
+
+
+@pytest.mark.parametrize("ordered", [True, False])
+def test_map_chunks(csv_path, ordered):
+    results = list(
+        map_chunks(str(csv_path), len, max_workers=2, chunk_size=500, ordered=ordered)
+    )
+    assert len(results) > 1
+    assert sum(results) == 200
+
+
+def test_map_chunks_in_file_order(csv_path):
+    chunks = list(map_chunks(str(csv_path), list, max_workers=2, chunk_size=500))
+    assert [row for chunk in chunks for row in chunk] == ROWS[1:]
+
+
+@pytest.mark.parametrize("chunk_size", [7, 100, 100000])
+def test_count_chunks(csv_path, chunk_size):
+    assert count_chunks(str(csv_path), max_workers=2, chunk_size=chunk_size).records == len(ROWS)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 16, 100000])
+def test_chunks_with_stray_quotes_and_crlf(stray_quotes_path, chunk_size):
+    with open(stray_quotes_path, newline=None) as infile:
+        expected = list(csv.reader(infile))
+    boundaries = record_boundaries(stray_quotes_path.read_bytes(), 0, chunk_size)
+    rows = []
+    for lo, hi in zip(boundaries, boundaries[1:]):
+        rows.extend(read_chunk(str(stray_quotes_path), lo, hi))
+    assert rows == expected
+    assert ["1", '5" screen', 'a\nb "c"'] in rows
+
+    count = count_chunks(str(stray_quotes_path), max_workers=2, chunk_size=chunk_size)
+    assert count.records == len(expected) == 100
@@ -1,6 +1,6 @@
 import pytest
 import re
-from excsv.utils.text import clean_whitespace
+from excsv.utils.text import clean_rows, clean_values, clean_whitespace
 
 
 def test_clean_whitespace():
@@ -11,3 +11,27 @@ wor
 
 """
     assert clean_whitespace(val) == "hello wor  ld"
+
+
+def test_clean_whitespace_unicode_spaces():
+    assert clean_whitespace(" a b\x0bc　") == "a b c"
+
+
+def test_clean_values_matches_clean_whitespace():
+    values = ["a\tb", " c ", "d", "", "e\x00 ", "\r\nf"]
+    assert clean_values(values) == [clean_whitespace(v) for v in values]
+
+
+def test_clean_values_without_whitespace_is_unchanged():
+    values = ["a", "b", ""]
+    assert clean_values(values) is values
+
+
+def test_clean_rows():
+    rows = [[" a", "b\n"], ["c  d"], []]
+    assert clean_rows(rows) == [["a", "b"], ["c  d"], []]
+
+
+def test_clean_rows_in_columns():
+    rows = [[" a ", " b ", " c "], [" d "]]
+    assert clean_rows(rows, [0, 2]) == [["a", " b ", "c"], ["d"]]
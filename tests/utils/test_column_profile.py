@@ -0,0 +1,42 @@
+import pytest
+from excsv.utils.profile import ColumnProfile
+
+
+def test_column_profile_numeric():
+    profile = ColumnProfile("age", 1)
+    profile.update(["9", "42", "", "101"])
+    profile.update(["42", "7.5"])
+    data = profile.to_dict()
+
+    assert data["blanks"] == 1
+    assert data["cardinality"] == 5
+    assert data["min"] == "7.5", "numeric columns compare as numbers"
+    assert data["max"] == "101"
+    assert data["min_length"] == 1
+    assert data["max_length"] == 3
+    assert data["most_common"] == "42"
+    assert data["most_common_count"] == 2
+    assert data["p50"] == "42"
+
+
+def test_column_profile_text():
+    profile = ColumnProfile("name", 0)
+    profile.update(["Bob", "alice", "Chaz", "10"])
+    data = profile.to_dict()
+
+    assert data["min"] == "10", "mixed columns compare as text"
+    assert data["max"] == "alice"
+    assert data["mean_length"] == 3.5
+    assert data["most_common"] is None, "no value is known to repeat"
+    assert data["p50"] == "10", "quartiles cover the numeric values"
+
+
+def test_column_profile_all_blank():
+    profile = ColumnProfile("empty", 0)
+    profile.update(["", ""])
+    data = profile.to_dict()
+
+    assert data["blanks"] == 2
+    assert data["min"] is None
+    assert data["max_length"] is None
+    assert data["p50"] is None
@@ -0,0 +1,28 @@
+from excsv.utils.columns import ColumnBatches
+
+
+def test_column_batches():
+    rows = [["a", "1"], ["b", "2"], ["c", "3"]]
+    batches = ColumnBatches(rows, 2, batch_size=2)
+    assert list(batches) == [[("a", "b"), ("1", "2")], [("c",), ("3",)]]
+    assert batches.row_count == 3
+    assert (batches.short_rows, batches.long_rows) == (0, 0)
+
+
+def test_column_batches_pad_short_rows_and_drop_extra_values():
+    batches = ColumnBatches([["a"], ["b", "2", "x"], ["c", "3"]], 2)
+    assert list(batches) == [[("a", "b", "c"), ("", "2", "3")]]
+    assert (batches.short_rows, batches.long_rows) == (1, 1)
+
+
+def test_column_batches_with_extra_columns():
+    batches = ColumnBatches(
+        [["a", "1"], ["b", "2", "x"], ["c", "3", "y"]], 2, batch_size=1, extra_columns=True
+    )
+    assert list(batches) == [
+        [("a",), ("1",)],
+        [("b",), ("2",), ("x",)],
+        [("c",), ("3",), ("y",)],
+    ]
+    assert batches.width == 3
+    assert (batches.short_rows, batches.long_rows) == (0, 2)
@@ -0,0 +1,112 @@
+import bz2
+import gzip
+import io
+import lzma
+import struct
+import zlib
+
+import pytest
+from excsv.utils.compression import (
+    CompressionError,
+    DecompressionError,
+    ThreadedReader,
+    detect_compression,
+    open_compressed_output,
+    open_decompressed,
+)
+
+
+DATA = b"".join(b"%d,row %d\n" % (i, i) for i in range(50000))
+
+COMPRESS = {"gzip": gzip.compress, "bz2": bz2.compress, "xz": lzma.compress}
+
+
+def bgzf(data: bytes, member_size: int = 4096) -> bytes:
+    """data as BGZF: gzip members with their size in a BC extra subfield"""
+    members = []
+    for start in range(0, len(data), member_size):
+        chunk = data[start : start + member_size]
+        compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+        deflated = compressor.compress(chunk) + compressor.flush()
+        block_size = 18 + len(deflated) + 8
+        members.append(
+            struct.pack("<4BI2BH2BHH", 0x1F, 0x8B, 8, 4, 0, 0, 255, 6, 66, 67, 2, block_size - 1)
+            + deflated
+            + struct.pack("<II", zlib.crc32(chunk), len(chunk))
+        )
+    return b"".join(members)
+
+
+@pytest.mark.parametrize("compression", list(COMPRESS))
+def test_detect_and_decompress(compression):
+    compressed = COMPRESS[compression](DATA)
+    assert detect_compression(compressed) == compression
+    with open_decompressed(io.BytesIO(compressed), compression, "data") as stream:
+        assert stream.read() == DATA
+
+
+def test_detect_plain_data():
+    assert detect_compression(b"id,name\n") is None
+
+
+@pytest.mark.parametrize("head", [b"BZh,b\n1,2\n", b"\x1f\x8b,b\n"])
+def test_detect_plain_data_that_starts_like_compressed_data(head):
+    assert detect_compression(head) is None
+
+
+def test_detect_empty_compressed_data():
+    assert detect_compression(bz2.compress(b"")) == "bz2"
+
+
+def test_decompress_bgzf_in_parallel():
+    compressed = bgzf(DATA)
+    with open_decompressed(io.BytesIO(compressed), "gzip", "data") as stream:
+        assert stream.read() == DATA
+
+
+def test_decompress_multi_member_gzip():
+    compressed = gzip.compress(DATA[:1000]) + gzip.compress(DATA[1000:])
+    with open_decompressed(io.BytesIO(compressed), "gzip", "data") as stream:
+        assert stream.read() == DATA
+
+
+def test_decompression_errors_are_raised_by_reads():
+    truncated = bgzf(DATA)[:-100]
+    with open_decompressed(io.BytesIO(truncated), "gzip", "data") as stream:
+        with pytest.raises(CompressionError):
+            stream.read()
+
+
+@pytest.mark.parametrize("compression", list(COMPRESS))
+def test_truncated_data_raises_decompression_errors(compression):
+    truncated = COMPRESS[compression](DATA)[:-50]
+    with open_decompressed(io.BytesIO(truncated), compression, "data.gz") as stream:
+        with pytest.raises(DecompressionError, match="data.gz is truncated or corrupt"):
+            stream.read()
+
+
+def test_threaded_reader_can_be_closed_before_the_end():
+    reader = ThreadedReader(iter([b"x" * 10] * 1000), "data", read_ahead=2)
+    assert reader.read(5) == b"xxxxx"
+    reader.close()
+    assert reader.closed
+
+
+@pytest.mark.parametrize("suffix, decompress", [(".gz", gzip.decompress), (".xz", lzma.decompress)])
+def test_compressed_output(tmp_path, suffix, decompress):
+    path = tmp_path / f"out.csv{suffix}"
+    compression = {".gz": "gzip", ".xz": "xz"}[suffix]
+    with open_compressed_output(path, compression, "w", encoding="utf-8") as outfile:
+        outfile.write(DATA.decode())
+    assert decompress(path.read_bytes()) == DATA
+
+
+def test_zstd_round_trip(tmp_path):
+    pytest.importorskip("zstandard")
+    path = tmp_path / "out.csv.zst"
+    with open_compressed_output(path, "zstd", "wb") as outfile:
+        outfile.write(DATA)
+    compressed = path.read_bytes()
+    assert detect_compression(compressed) == "zstd"
+    with open_decompressed(io.BytesIO(compressed), "zstd", "data") as stream:
+        assert stream.read() == DATA
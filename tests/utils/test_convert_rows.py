@@ -0,0 +1,45 @@
+import pytest
+from datetime import date
+from excsv.utils.infer import NATIVE_BATCH_PATTERNS, convert_rows, values_match_type
+
+
+def test_values_match_type():
+    assert values_match_type(["1", "-42", ""], "int")
+    assert values_match_type(["1", "007", " 2 "], "int"), "as int() reads them"
+    assert not values_match_type(
+        ["1", "007"], "int", NATIVE_BATCH_PATTERNS
+    ), "leading zeros are kept as text in Excel"
+    assert values_match_type(["1.5", "2", ".5", "1e3"], "float")
+    assert not values_match_type(["1\n2"], "int"), "newlines within values don't match"
+    assert values_match_type(["TRUE", "false"], "bool")
+    assert values_match_type(["2024-01-31"], "date")
+
+
+def test_convert_rows():
+    rows = [["Alice", "42", "1.5", "true", "2024-01-31"], ["Bob", "", "2", "False", ""]]
+    types = ["str", "int", "float", "bool", "date"]
+    assert convert_rows(rows, types) == [
+        ["Alice", 42, 1.5, True, date(2024, 1, 31)],
+        ["Bob", None, 2.0, False, None],
+    ]
+
+
+def test_convert_rows_keeps_zip_codes_and_long_ids_as_text():
+    rows = [["01234", "12345678901234567"], ["98765", "42"]]
+    assert convert_rows(rows, ["int", "int"]) == [
+        ["01234", "12345678901234567"],
+        [98765, 42],
+    ]
+
+
+def test_convert_rows_keeps_mismatched_values_as_text():
+    rows = [["1", "2024-02-30"], ["n/a", "2024-02-01"]]
+    assert convert_rows(rows, ["int", "date"]) == [
+        [1, "2024-02-30"],
+        ["n/a", date(2024, 2, 1)],
+    ]
+
+
+def test_convert_rows_ragged_rows():
+    rows = [["1", "2"], ["3"], ["4", "5", "extra"]]
+    assert convert_rows(rows, ["int", "int"]) == [[1, 2], [3], [4, 5, "extra"]]
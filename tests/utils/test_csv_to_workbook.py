@@ -1,5 +1,5 @@
 import pytest
-from excsv.utils.excel import csv_to_workbook
+from excsv.utils.excel import csv_to_workbook, init_workbook, stream_data_to_workbook
 
 import csv
 from io import StringIO, BytesIO
@@ -39,11 +39,11 @@ def test_csv_to_workbook(input_csv_text):
     assert sheet["A1"].value == "name", "Verify the content matches the CSV input"
     assert sheet["B1"].value == "age"
     assert sheet["A2"].value == "Alice"
-    assert sheet["B2"].value == "42"
+    assert sheet["B2"].value == 42
     assert sheet["A3"].value == "Bob"
-    assert sheet["B3"].value == "9"
+    assert sheet["B3"].value == 9
     assert sheet["A4"].value == "Chaz"
-    assert sheet["B4"].value == "101"
+    assert sheet["B4"].value == 101
 
     assert sheet.freeze_panes == "B2", "Verify the default row/col is frozen"
 
@@ -66,14 +66,107 @@ def test_csv_to_workbook_auto_filter(input_csv_text):
     assert sheet.auto_filter.ref == sheet.dimensions, "Verify auto filter is applied"
 
 
-@pytest.mark.skip
 def test_csv_to_workbook_set_default_header_styles(input_csv_text):
-    assert 1 is 0
+    csv_reader = csv.reader(input_csv_text)
+    wb = load_workbook(csv_to_workbook(csv_reader))
+    sheet = wb.active
+
+    assert sheet["A1"].font.b is True
+    assert sheet["B1"].fill.fgColor.rgb == "00222222"
+    assert sheet["A2"].font.b is True, "first column is bold"
+    assert sheet["B2"].font.b is not True
+
+
+def test_csv_to_workbook_enforce_max_column_width():
+    csv_reader = csv.reader(StringIO(f"id,notes\n1,{'x' * 200}\n"))
+    wb = load_workbook(csv_to_workbook(csv_reader))
+    assert wb.active.column_dimensions["B"].width == 70
 
-@pytest.mark.skip
-def test_csv_to_workbook_enforce_max_column_width(input_csv_text):
-    assert 1 is 0
 
-@pytest.mark.skip
 def test_csv_to_workbook_enforce_min_column_width(input_csv_text):
-    assert 1 is 0
+    csv_reader = csv.reader(input_csv_text)
+    wb = load_workbook(csv_to_workbook(csv_reader))
+    assert wb.active.column_dimensions["B"].width == 12
+
+
+def test_csv_to_workbook_not_write_only(input_csv_text):
+    csv_reader = csv.reader(input_csv_text)
+    wb = load_workbook(csv_to_workbook(csv_reader, write_only=False))
+    sheet = wb.active
+
+    assert sheet["A4"].value == "Chaz"
+    assert sheet.freeze_panes == "B2"
+    assert sheet.column_dimensions["B"].width == 12
+
+
+def test_stream_data_to_workbook_measures_widths_from_sample():
+    data = "name,notes\n" + "".join(f"row{i},{'x' * i}\n" for i in range(30))
+    wb = init_workbook(write_only=True)
+    stream_data_to_workbook(wb, csv.reader(StringIO(data)), sample_size=20)
+    wb.save(excel_bytes := BytesIO())
+    sheet = load_workbook(excel_bytes).active
+
+    assert sheet.max_row == 31, "rows past the sample are still written"
+    assert sheet["A31"].value == "row29"
+    assert sheet.column_dimensions["B"].width == 20, "width only measures the sample"
+    assert sheet.auto_filter.ref == "A1:B31"
+
+
+@pytest.mark.parametrize("write_only", [True, False])
+def test_csv_to_workbook_applies_named_styles(input_csv_text, write_only):
+    csv_reader = csv.reader(input_csv_text)
+    wb = load_workbook(csv_to_workbook(csv_reader, write_only=write_only))
+    sheet = wb.active
+
+    assert sheet["B1"].style == "excsv header"
+    assert sheet["A3"].style == "excsv first column"
+    assert sheet["B3"].style == "excsv cell"
+    assert sheet["B3"].alignment.wrap_text is True
+
+
+def test_csv_to_workbook_writes_to_output_path(input_csv_text, tmp_path):
+    out_path = tmp_path / "out.xlsx"
+    result = csv_to_workbook(csv.reader(input_csv_text), output=out_path)
+
+    assert result is None, "nothing is buffered when an output is given"
+    assert load_workbook(out_path).active["A4"].value == "Chaz"
+
+
+def test_csv_to_workbook_writes_to_unseekable_stream(input_csv_text):
+    class Unseekable(BytesIO):
+        def seekable(self):
+            return False
+
+        def tell(self):
+            raise OSError("unseekable")
+
+        def seek(self, *args):
+            raise OSError("unseekable")
+
+    out = Unseekable()
+    csv_to_workbook(csv.reader(input_csv_text), output=out)
+
+    assert load_workbook(BytesIO(out.getvalue())).active["A4"].value == "Chaz"
+
+
+@pytest.mark.parametrize("write_only", [True, False])
+def test_csv_to_workbook_typed_values(write_only):
+    data = "name,score,joined,active\nAlice,1.5,2024-01-31,true\nBob,,2024-02-01,false\n"
+    wb = load_workbook(
+        csv_to_workbook(csv.reader(StringIO(data)), write_only=write_only)
+    )
+    sheet = wb.active
+
+    assert sheet["B2"].value == 1.5
+    assert sheet["B3"].value is None
+    assert sheet["C2"].is_date
+    assert sheet["C2"].number_format == "yyyy-mm-dd"
+    assert sheet["D3"].value is False
+    assert sheet["A1"].value == "name", "headers are never converted"
+
+
+def test_csv_to_workbook_no_infer_types(input_csv_text):
+    csv_reader = csv.reader(input_csv_text)
+    wb = load_workbook(csv_to_workbook(csv_reader, infer_types=False))
+
+    assert wb.active["B2"].value == "42"
@@ -0,0 +1,69 @@
+import pytest
+from excsv.utils.excel import csvs_to_workbook, sheet_title_from_name
+
+from io import StringIO
+from openpyxl import load_workbook
+
+
+@pytest.fixture
+def input_files(tmp_path):
+    alpha = tmp_path / "alpha.csv"
+    alpha.write_text("name,age\nAlice,42\nBob,9\n")
+    beta = tmp_path / "beta.csv"
+    beta.write_text("region,notes\nNorth,hello\nSouth,world\nWest,x\n")
+    return [alpha, beta]
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_csvs_to_workbook(input_files, tmp_path, max_workers):
+    out_path = tmp_path / "out.xlsx"
+    csvs_to_workbook(
+        input_files, ["Alpha", "Beta"], output=out_path, max_workers=max_workers
+    )
+    wb = load_workbook(out_path)
+
+    assert wb.sheetnames == ["Alpha", "Beta"]
+    assert wb["Alpha"]["A2"].value == "Alice"
+    assert wb["Beta"]["A4"].value == "West"
+    assert wb["Beta"].freeze_panes == "B2"
+    assert wb["Beta"].auto_filter.ref == "A1:B4"
+    assert wb["Beta"]["A1"].style == "excsv header", "styles survive packaging"
+    assert wb["Beta"]["B2"].style == "excsv cell"
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_csvs_to_workbook_reads_paths_with_the_given_encoding(tmp_path, max_workers):
+    latin = tmp_path / "latin.csv"
+    latin.write_bytes("name,city\nRenée,Orléans\n".encode("latin-1"))
+    out_path = tmp_path / "out.xlsx"
+    csvs_to_workbook(
+        [latin, latin],
+        ["a", "b"],
+        output=out_path,
+        max_workers=max_workers,
+        encoding="latin-1",
+    )
+    wb = load_workbook(out_path)
+    assert wb["b"]["A2"].value == "Renée"
+    assert wb["b"]["B2"].value == "Orléans"
+
+
+def test_csvs_to_workbook_reads_open_streams_in_process(input_files, tmp_path):
+    out_path = tmp_path / "out.xlsx"
+    csvs_to_workbook(
+        [input_files[0], StringIO("id\n1\n")], ["Alpha", "stdin"], output=out_path
+    )
+    wb = load_workbook(out_path)
+
+    assert wb["stdin"]["A2"].value == 1
+
+
+def test_csvs_to_workbook_requires_title_per_input(input_files, tmp_path):
+    with pytest.raises(ValueError):
+        csvs_to_workbook(input_files, ["Alpha"], output=tmp_path / "out.xlsx")
+
+
+def test_sheet_title_from_name():
+    assert sheet_title_from_name("data/2024:sales.csv") == "2024sales"
+    assert sheet_title_from_name("x" * 40 + ".csv") == "x" * 31
+    assert sheet_title_from_name("[].csv") == "Sheet"
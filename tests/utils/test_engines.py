@@ -0,0 +1,60 @@
+import csv
+
+import pytest
+from excsv.utils.engines import ENGINES, read_rows
+
+
+@pytest.fixture(params=[e for e in ENGINES if e != "stdlib"])
+def engine(request):
+    pytest.importorskip(request.param)
+    return request.param
+
+
+def assert_reads_like_csv_reader(path, engine, delimiter=","):
+    with open(path, encoding="utf-8") as infile:
+        expected = list(csv.reader(infile, delimiter=delimiter))
+    with open(path, encoding="utf-8") as infile:
+        assert list(read_rows(infile, delimiter, engine)) == expected
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        "name,note\r\nAlice,\"two\r\nlines\"\r\nBob,\r\n",
+        "﻿name,age\nAlice,42\n",
+        "name,age\nAlice,42\n\nBob,9",
+        "name,age\n,\nBob,9\n",
+        "a;b\n1;\"x;y\"\n",
+    ],
+    ids=["crlf", "bom", "blank-line", "empty-values", "semicolon"],
+)
+def test_engine_reads_like_csv_reader(tmp_path, engine, data):
+    path = tmp_path / "input.csv"
+    path.write_bytes(data.encode("utf-8"))
+    assert_reads_like_csv_reader(path, engine, ";" if data.startswith("a;") else ",")
+
+
+def test_engine_falls_back_for_ragged_rows(tmp_path, engine):
+    path = tmp_path / "input.csv"
+    rows = [["name", "age", "note"]] + [[str(i), "x", ""] for i in range(5000)]
+    rows[2500:2500] = [["short", "row"], ["a", "long", "row", "here"]]
+    with open(path, "w", newline="", encoding="utf-8") as outfile:
+        csv.writer(outfile).writerows(rows)
+    assert_reads_like_csv_reader(path, engine)
+
+
+def test_stdlib_engine_for_a_single_column(tmp_path, engine):
+    path = tmp_path / "input.csv"
+    path.write_text("name\nAlice\n\n\nBob\n", encoding="utf-8")
+    assert_reads_like_csv_reader(path, engine)
+
+
+@pytest.mark.parametrize(
+    "data",
+    ["a,b\r1,2\r3,4", "a,b\r\n1,2\r3,4\r\n", 'a,b\n1,"x\ry"\n'],
+    ids=["cr", "mixed", "quoted-cr"],
+)
+def test_engine_reads_bare_cr_like_csv_reader(tmp_path, engine, data):
+    path = tmp_path / "input.csv"
+    path.write_bytes(data.encode("utf-8"))
+    assert_reads_like_csv_reader(path, engine)
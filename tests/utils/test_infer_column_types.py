@@ -0,0 +1,91 @@
+import pytest
+from excsv.utils.infer import (
+    NATIVE_BATCH_PATTERNS,
+    ColumnTypes,
+    infer_column_types,
+    join_types,
+    scan_column_types,
+    widen_type,
+)
+
+
+def test_infer_column_types():
+    rows = [
+        ["Alice", "42", "1.5", "true", "2024-01-31", ""],
+        ["Bob", "", "2", "False", "2024-02-01", ""],
+    ]
+    assert infer_column_types(rows) == ["str", "int", "float", "bool", "date", "null"]
+
+
+def test_infer_column_types_as_int_and_float_read_them():
+    rows = [["00123", "12345678901234567", " 2", "1_000.5"], ["7", "1", "3 ", "nan"]]
+    assert infer_column_types(rows) == ["int", "int", "int", "float"]
+
+
+def test_infer_native_column_types_keeps_long_ids_as_text():
+    # too many digits for a float64 to hold exactly, so neither int nor float
+    rows = [["123456789012345678", "1234567890123456.5", "00123"], ["42", "1e300", "7"]]
+    types = infer_column_types(rows, patterns=NATIVE_BATCH_PATTERNS)
+    assert types == ["str", "float", "str"]
+    assert widen_type("int", ["123456789012345"], NATIVE_BATCH_PATTERNS) == "int"
+
+
+def test_infer_column_types_widens_across_batches():
+    rows = [["1", "1"], ["2", "x"], ["3.5", "3"]]
+    assert infer_column_types(rows, batch_size=1) == ["float", "str"]
+
+
+def test_infer_column_types_pads_to_column_count():
+    assert infer_column_types([["1"]], column_count=3) == ["int", "null", "null"]
+    assert infer_column_types([["1"], ["2", "x"]]) == ["int", "str"]
+
+
+def test_infer_column_types_stops_once_every_column_is_str():
+    def rows():
+        yield ["a", "b"]
+        raise AssertionError("read past the point where types were settled")
+
+    assert infer_column_types(rows(), batch_size=1) == ["str", "str"]
+
+
+def test_widen_type():
+    assert widen_type("null", ["", ""]) == "null"
+    assert widen_type("null", ["", "7"]) == "int"
+    assert widen_type("int", ["1", "2.5"]) == "float"
+    assert widen_type("float", ["true"]) == "str"
+    assert widen_type("bool", ["1"]) == "str", "bool and int don't mix"
+    assert widen_type("date", ["2024-01-01\n"]) == "str"
+
+
+def test_column_types_settled():
+    column_types = ColumnTypes(2)
+    assert not column_types.settled
+    column_types.update([["a", "1"]])
+    assert not column_types.settled
+    column_types.update([["b", "x"]])
+    assert column_types.settled
+
+
+@pytest.mark.parametrize(
+    "a, b, expected",
+    [
+        ("null", "int", "int"),
+        ("int", "float", "float"),
+        ("float", "int", "float"),
+        ("int", "date", "str"),
+        ("bool", "str", "str"),
+        ("date", "date", "date"),
+    ],
+)
+def test_join_types(a, b, expected):
+    assert join_types(a, b) == expected
+
+
+def test_merged_column_types_match_types_of_all_rows():
+    rows = [["1", "", "2020-01-01"], ["2", "", "x"], ["2.5", "true", ""]]
+    merged, _ = scan_column_types(rows[:1])
+    later, _ = scan_column_types(rows[1:])
+    merged.merge(later)
+    whole, _ = scan_column_types(rows)
+    assert merged.types == whole.types == ["float", "bool", "str"]
+    assert merged.value_counts == whole.value_counts
@@ -0,0 +1,67 @@
+from itertools import islice
+
+import pytest
+from excsv.utils.listing import IndexSet, slice_input, slice_input_from_end
+
+
+def test_index_set_parse():
+    indices = IndexSet.parse(["5", "0-3", "2-6", "10-20:5", "12"])
+    assert indices.ranges == [(0, 6, 1), (10, 20, 5), (12, 12, 1)]
+    assert list(indices) == [0, 1, 2, 3, 4, 5, 6, 10, 12, 15, 20]
+
+
+def test_index_set_open_range_is_not_materialized():
+    indices = IndexSet.parse(["0-1000000000", "5-:2"])
+    assert indices.ranges == [(0, 1000000000, 1), (5, None, 2)]
+    assert list(islice(indices, 3)) == [0, 1, 2]
+
+
+@pytest.mark.parametrize("value", ["42,233", "--3", "1-2-3", "0-10:0", "a"])
+def test_index_set_parse_invalid(value):
+    with pytest.raises(ValueError, match="Invalid --index value"):
+        IndexSet.parse([value])
+
+
+def test_slice_input_stops_after_last_index():
+    def rows():
+        yield from (["a"], ["b"], ["c"])
+        raise AssertionError("read past the last index")
+
+    assert list(slice_input(rows(), [0, 2])) == [(0, ["a"]), (2, ["c"])]
+
+
+def test_slice_input_open_range():
+    rows = [[str(i)] for i in range(5)]
+    assert list(slice_input(rows, IndexSet.parse(["3-"]))) == [(3, ["3"]), (4, ["4"])]
+
+
+def test_index_set_negative_indices():
+    indices = IndexSet.parse(["0", "-1", "-4--3"])
+    assert indices.tail_size == 4
+    assert list(indices.resolve(10)) == [0, 6, 7, 9]
+    with pytest.raises(ValueError):
+        list(indices)
+
+
+@pytest.mark.parametrize(
+    "values, expected",
+    [(["-1", "-4--3"], True), (["-3-"], True), (["-5-3"], False), (["0", "-1"], False)],
+)
+def test_index_set_only_from_end(values, expected):
+    assert IndexSet.parse(values).only_from_end is expected
+
+
+@pytest.mark.parametrize(
+    "values, expected",
+    [
+        (["-1"], [9]),
+        (["0", "-1"], [0, 9]),
+        (["8", "-3-"], [7, 8, 9]),
+        (["2--8"], [2]),
+        (["-20-:4"], [0, 4, 8]),
+    ],
+)
+def test_slice_input_from_end(values, expected):
+    rows = [[str(i)] for i in range(10)]
+    result = slice_input_from_end(rows, IndexSet.parse(values))
+    assert [i for i, _ in result] == expected
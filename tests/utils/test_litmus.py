@@ -0,0 +1,45 @@
+from excsv.utils.litmus import Failure, Litmus, NotNullRule, PatternRule, TypeRule
+
+
+def test_litmus_checks_all_rules_in_row_order():
+    headers = ["id", "zip", "day"]
+    rows = [
+        ["1", "01234", "2024-01-31"],
+        ["x", "1234", "2024-02-30"],
+        ["", "ab:c"],
+        ["4", "99999", ""],
+    ]
+    checker = Litmus(
+        headers,
+        [
+            (0, TypeRule("int")),
+            (1, PatternRule(r"^\d{5}$")),
+            (2, TypeRule("date")),
+            (0, NotNullRule()),
+        ],
+    )
+    assert list(checker.check(rows, batch_size=2)) == [
+        Failure(3, "id", "int", "x"),
+        Failure(3, "zip", r"match:^\d{5}$", "1234"),
+        Failure(3, "day", "date", "2024-02-30"),
+        Failure(4, "id", "not_null", ""),
+        Failure(4, "zip", r"match:^\d{5}$", "ab:c"),
+    ]
+    assert list(checker.summary()) == [
+        ("id", "int", 4, 1, 1),
+        ("id", "not_null", 4, 1, 1),
+        ("zip", r"match:^\d{5}$", 4, 0, 2),
+        ("day", "date", 4, 2, 1),
+    ]
+
+
+def test_pattern_rule_searches_unless_anchored():
+    rule = PatternRule(r"\d")
+    assert rule.failing(["a1", "b", ""], 1) == {"b"}
+
+
+def test_litmus_counts_same_named_rules_apart():
+    rows = [["007"], ["12345678901234567"], ["x"], ["y"]]
+    checker = Litmus(["id"], [(0, TypeRule("int")), (0, TypeRule("int"))])
+    checker.count(rows)
+    assert list(checker.summary()) == [("id", "int", 4, 0, 2), ("id", "int", 4, 0, 2)]
@@ -0,0 +1,73 @@
+from io import BytesIO
+
+import pytest
+from excsv.utils.profile import (
+    ColumnProfile,
+    dump_profiles,
+    load_profiles,
+    merge_profiles,
+)
+
+
+def profile_rows(header, rows):
+    profiles = [ColumnProfile(name, i) for i, name in enumerate(header)]
+    for profile, values in zip(profiles, zip(*rows)):
+        profile.update(values)
+    return profiles
+
+
+def test_dump_and_load_profiles_round_trip():
+    profiles = profile_rows(
+        ["name", "age"], [["Alice", "42"], ["Bob", ""], ["Alice", "7.5"]]
+    )
+    buf = BytesIO()
+    dump_profiles(profiles, buf)
+    buf.seek(0)
+    loaded = load_profiles(buf)
+
+    assert [p.to_dict() for p in loaded] == [p.to_dict() for p in profiles]
+
+
+def test_load_profiles_rejects_other_files():
+    with pytest.raises(ValueError, match="Not a saved probe state"):
+        load_profiles(BytesIO(b"name,age\n"))
+
+
+def test_merged_profiles_match_profile_of_all_rows():
+    rows = [[str(i % 7), f"v{i % 3}"] for i in range(100)]
+    header = ["num", "text"]
+    whole = profile_rows(header, rows)
+
+    merged = profile_rows(header, rows[:60])
+    buf = BytesIO()
+    dump_profiles(profile_rows(header, rows[60:]), buf)
+    buf.seek(0)
+    merge_profiles(merged, load_profiles(buf))
+
+    for merged_profile, whole_profile in zip(merged, whole):
+        merged_data, whole_data = merged_profile.to_dict(), whole_profile.to_dict()
+        assert merged_data == whole_data
+
+
+def test_merge_profiles_of_different_columns():
+    with pytest.raises(ValueError, match="different columns"):
+        merge_profiles(
+            profile_rows(["a", "b"], [["1", "2"]]), profile_rows(["a", "c"], [["1", "2"]])
+        )
+
+
+@pytest.mark.parametrize("size", [10, 11, 30, -1])
+def test_load_profiles_rejects_truncated_files(size):
+    buf = BytesIO()
+    dump_profiles(profile_rows(["name", "age"], [["Alice", "42"]]), buf)
+    with pytest.raises(ValueError, match="Corrupt or truncated"):
+        load_profiles(BytesIO(buf.getvalue()[:size]))
+
+
+def test_load_profiles_rejects_corrupt_files():
+    buf = BytesIO()
+    dump_profiles(profile_rows(["name", "age"], [["Alice", "42"]]), buf)
+    data = bytearray(buf.getvalue())
+    data[-20:] = bytes(20)
+    with pytest.raises(ValueError, match="Corrupt or truncated"):
+        load_profiles(BytesIO(bytes(data)))
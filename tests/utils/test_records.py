@@ -0,0 +1,68 @@
+import pytest
+from excsv.utils.records import (
+    count_block,
+    count_records,
+    find_record_start,
+    iter_record_ends,
+)
+
+
+def test_iter_record_ends():
+    buf = b'a,b\n1,"x\ny"\n2,z'
+    assert list(iter_record_ends(buf)) == [4, 12]
+
+
+def test_iter_record_ends_without_quotes():
+    assert list(iter_record_ends(b"a\nb\nc\n", start=1)) == [2, 4, 6]
+
+
+def test_iter_record_ends_in_quotes():
+    assert list(iter_record_ends(b'x\ny",1\n2,3\n', in_quotes=True)) == [7, 11]
+
+
+def test_iter_record_ends_with_quotes_inside_unquoted_fields():
+    # a quote only opens a quoted field at the start of a field, like for csv.reader
+    buf = b'id,desc\n1,5" screen\n2,"a\nb"c"\n3,x'
+    assert list(iter_record_ends(buf)) == [8, 20, 30]
+
+
+def test_iter_record_ends_crlf_and_cr():
+    assert list(iter_record_ends(b'a\r\n"b\r\nc"\rd\n')) == [3, 10, 12]
+
+
+def test_find_record_start_inside_quoted_field():
+    buf = b'id,note\n1,"one\ntwo\nthree"\n2,plain\n3,plain\n'
+    start = buf.index(b"one")
+    assert buf[find_record_start(buf, start, field_count=2) :].startswith(b"2,plain")
+
+
+def test_find_record_start_outside_quotes():
+    buf = b'id,note\n1,plain\n2,"a\nb"\n3,plain\n'
+    assert buf[find_record_start(buf, 9, field_count=2) :].startswith(b'2,"a')
+
+
+@pytest.mark.parametrize("block_size", [1, 2, 3, 5, 100])
+def test_count_records_across_blocks(block_size):
+    buf = b'a,b\n1,"x\ny"\n2,"say ""hi""\n"\n3,z'
+    blocks = [buf[i : i + block_size] for i in range(0, len(buf), block_size)]
+    assert count_records(blocks).records == 4
+
+
+def test_count_records_with_and_without_last_newline():
+    assert count_records([b"a\nb\n"]).records == 2
+    assert count_records([b"a\nb"]).records == 2
+    assert count_records([]).records == 0
+
+
+def test_count_block_both_ways():
+    # as if inside quotes, only the second newline ends a record
+    count = count_block(b'x\n"y\n"z\n')
+    assert (count.if_outside, count.if_inside) == (2, 1)
+    assert (count.quoted_if_outside, count.quoted_if_inside) == (False, True)
+
+
+@pytest.mark.parametrize("block_size", [1, 2, 3, 100])
+def test_count_records_with_quotes_inside_unquoted_fields(block_size):
+    buf = b'id,desc\n1,5" screen\n2,ok\n3,7" tab\n4,"x\r\ny"\r\n'
+    blocks = [buf[i : i + block_size] for i in range(0, len(buf), block_size)]
+    assert count_records(blocks).records == 5
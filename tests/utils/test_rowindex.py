@@ -0,0 +1,102 @@
+import os
+
+import pytest
+from excsv.utils import rowindex
+from excsv.utils.rowindex import (
+    MappedRows,
+    RowIndex,
+    build_index,
+    default_index_path,
+    load_index,
+)
+
+
+@pytest.fixture
+def input_file(tmp_path):
+    p = tmp_path / "input.csv"
+    p.write_bytes(b'name,note\nAlice,"two\nlines"\nBob,plain\nChaz,"a ""quote"""\nDan,last')
+    return p
+
+
+def test_build_index(input_file):
+    assert build_index(input_file) == 4
+    with load_index(input_file) as row_index:
+        assert row_index.row_count == 4
+        assert list(row_index.offsets) == [0, 10, 28, 38, 57, 65]
+
+
+def test_read_rows(input_file):
+    build_index(input_file)
+    with load_index(input_file) as row_index:
+        assert list(row_index.read_rows([0, 2, 3, 3, 9])) == [
+            (0, ["Alice", "two\nlines"]),
+            (2, ["Chaz", 'a "quote"']),
+            (3, ["Dan", "last"]),
+        ]
+
+
+def test_load_index_missing_or_stale(input_file):
+    assert load_index(input_file) is None
+
+    build_index(input_file)
+    stat = os.stat(input_file)
+    os.utime(input_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert load_index(input_file) is None, "index is stale once the file changes"
+
+
+def test_build_index_at_custom_path(input_file, tmp_path):
+    index_path = tmp_path / "custom.idx"
+    build_index(input_file, index_path)
+    assert not default_index_path(input_file).exists()
+    with load_index(input_file, index_path) as row_index:
+        assert row_index.row_count == 4
+
+
+STRAY_QUOTES_CRLF = b'id,desc\r\n1,5" screen\r\n2,"a\r\nb"\r\n3,7" tab\r\n'
+STRAY_QUOTES_CRLF_ROWS = [["1", '5" screen'], ["2", "a\nb"], ["3", '7" tab']]
+
+
+def test_index_quotes_inside_unquoted_fields_and_crlf(tmp_path):
+    # rows read through the index are the same as with csv.reader, newlines included
+    p = tmp_path / "screens.csv"
+    p.write_bytes(STRAY_QUOTES_CRLF)
+    assert build_index(p) == 3
+    with load_index(p) as row_index:
+        assert [row for _, row in row_index.read_rows(range(3))] == STRAY_QUOTES_CRLF_ROWS
+
+
+def test_load_index_for_another_delimiter(input_file):
+    build_index(input_file, delimiter=";")
+    assert load_index(input_file) is None
+    with load_index(input_file, delimiter=";") as row_index:
+        # the quotes follow commas, so they don't open quoted fields
+        assert row_index.row_count == 5
+
+
+def test_mapped_rows_scan_only_as_far_as_needed(input_file, monkeypatch):
+    monkeypatch.setattr(rowindex, "SCAN_ROWS", 1)
+    with MappedRows(input_file) as mapped:
+        assert list(mapped.read_rows([0])) == [(0, ["Alice", "two\nlines"])]
+        assert list(mapped.offsets) == [0, 10, 28]
+        assert list(mapped.read_rows([2, 3, 9])) == [
+            (2, ["Chaz", 'a "quote"']),
+            (3, ["Dan", "last"]),
+        ]
+        assert mapped.row_count == 4
+        assert list(mapped.offsets) == [0, 10, 28, 38, 57, 65]
+
+
+def test_mapped_rows_of_empty_file(tmp_path):
+    p = tmp_path / "empty.csv"
+    p.write_bytes(b"")
+    with MappedRows(p) as mapped:
+        assert mapped.row_count == 0
+        assert list(mapped.read_rows([0])) == []
+
+
+def test_mapped_rows_quotes_inside_unquoted_fields_and_crlf(tmp_path):
+    p = tmp_path / "screens.csv"
+    p.write_bytes(STRAY_QUOTES_CRLF)
+    with MappedRows(p) as mapped:
+        assert [row for _, row in mapped.read_rows([1, 2])] == STRAY_QUOTES_CRLF_ROWS[1:]
+        assert mapped.row_count == 3
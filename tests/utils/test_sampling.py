@@ -0,0 +1,70 @@
+import pytest
+import csv
+import random
+from io import BytesIO, StringIO
+from excsv.utils.sampling import (
+    bernoulli_sample,
+    block_sample,
+    read_header,
+    reservoir_sample,
+)
+
+
+@pytest.fixture
+def csv_bytes():
+    out = StringIO()
+    writer = csv.writer(out)
+    writer.writerow(["id", "note"])
+    for i in range(1000):
+        writer.writerow([i, "multi\nline" if i % 3 == 0 else "x"])
+    return out.getvalue().encode()
+
+
+def test_bernoulli_sample():
+    rows = [[str(i)] for i in range(10000)]
+    sample = list(bernoulli_sample(rows, 0.1, random.Random(1)))
+    assert 800 < len(sample) < 1200
+    assert sample == sorted(sample, key=lambda r: int(r[0])), "order is kept"
+
+
+def test_reservoir_sample():
+    rows = [[str(i)] for i in range(10000)]
+    sample = reservoir_sample(rows, 100, random.Random(1))
+    assert len(sample) == 100
+    assert len({r[0] for r in sample}) == 100
+    assert max(int(r[0]) for r in sample) > 5000, "sample covers the whole input"
+
+
+def test_reservoir_sample_smaller_input():
+    assert reservoir_sample([["a"], ["b"]], 5, random.Random(1)) == [["a"], ["b"]]
+
+
+def test_read_header(csv_bytes):
+    header, data_start = read_header(BytesIO(csv_bytes))
+    assert header == ["id", "note"]
+    assert csv_bytes[data_start:].startswith(b"0,")
+
+
+def test_block_sample_reads_every_row_exactly_once(csv_bytes):
+    rows = list(block_sample(BytesIO(csv_bytes), random.Random(3), block_size=100))
+    assert sorted(int(r[0]) for r in rows) == list(range(1000))
+    assert all(len(r) == 2 for r in rows), "records with quoted newlines are intact"
+
+
+def test_block_sample_max_rows_and_fraction(csv_bytes):
+    rows = list(
+        block_sample(BytesIO(csv_bytes), random.Random(3), max_rows=50, block_size=100)
+    )
+    assert len(rows) == 50
+
+    rows = list(
+        block_sample(BytesIO(csv_bytes), random.Random(3), fraction=0.1, block_size=100)
+    )
+    assert 0 < len(rows) < 200
+
+
+@pytest.mark.parametrize("data", [b"a,b\r\n", b"a,b\r", b"a,b\n", b"a,b", b'a,"b"\r\n'])
+def test_read_header_of_a_file_with_only_a_header(data):
+    header, data_start = read_header(BytesIO(data))
+    assert header[0] == "a"
+    assert data_start == len(data)
@@ -0,0 +1,53 @@
+import pytest
+import random
+from excsv.utils.sketches import KLL, SpaceSaving
+
+
+def test_space_saving_finds_heavy_hitters():
+    rng = random.Random(1)
+    values = ["common"] * 2000 + ["rare"] * 300 + [str(i) for i in range(5000)]
+    rng.shuffle(values)
+
+    summary = SpaceSaving(capacity=20)
+    for i in range(0, len(values), 500):
+        summary.update(values[i : i + 500])
+
+    (top, count, error), (second, _, _) = summary.top(2)
+    assert top == "common"
+    assert count - error <= 2000 <= count
+    assert second == "rare"
+    assert len(summary.counts) == 20
+
+
+def test_space_saving_merge():
+    a, b = SpaceSaving(capacity=5), SpaceSaving(capacity=5)
+    a.update(["x"] * 10 + ["y"] * 3)
+    b.update(["x"] * 5 + ["z"] * 7)
+    a.merge(b)
+    assert a.top(2) == [("x", 15, 0), ("z", 7, 0)]
+
+
+def test_kll_quantiles():
+    values = list(range(100000))
+    random.Random(1).shuffle(values)
+    sketch = KLL()
+    for i in range(0, len(values), 10000):
+        sketch.update(values[i : i + 10000])
+
+    assert sketch.count == 100000
+    assert sum(len(c) for c in sketch.compactors) < 1000, "memory is bounded"
+    assert abs(sketch.quantile(0.5) - 50000) < 2000
+    assert abs(sketch.quantile(0.9) - 90000) < 2000
+
+
+def test_kll_merge():
+    a, b = KLL(), KLL()
+    a.update(range(0, 50000))
+    b.update(range(50000, 100000))
+    a.merge(b)
+    assert a.count == 100000
+    assert abs(a.quantile(0.25) - 25000) < 2000
+
+
+def test_kll_empty():
+    assert KLL().quantile(0.5) is None
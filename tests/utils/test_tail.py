@@ -0,0 +1,36 @@
+from io import BytesIO
+
+import pytest
+from excsv.utils.tail import tail_records, tail_rows
+
+
+DATA = b'name,note\nAlice,"two\nlines"\nBob,plain\nChaz,"a ""quote"""\nDan,last\n'
+
+
+@pytest.mark.parametrize("block_size", [1, 4, 64 * 1024])
+def test_tail_rows_with_quoted_newlines(block_size):
+    binfile = BytesIO(DATA)
+    assert tail_records(binfile, 2, 10, block_size) == b'Chaz,"a ""quote"""\nDan,last\n'
+    assert tail_rows(binfile, 4)[0] == ["Alice", "two\nlines"]
+
+
+def test_tail_rows_more_than_there_are():
+    assert len(tail_rows(BytesIO(DATA), 100)) == 4
+    assert tail_rows(BytesIO(DATA), 0) == []
+
+
+def test_tail_rows_without_final_newline():
+    assert tail_rows(BytesIO(DATA.rstrip()), 1) == [["Dan", "last"]]
+
+
+@pytest.mark.parametrize("block_size", [1, 4, 64 * 1024])
+def test_tail_rows_quotes_inside_unquoted_fields_and_crlf(block_size):
+    data = b'id,desc\r\n1,"a\r\nb"\r\n2,5" screen\r\n3,"x,""y"""\r\n4,7" tab\r\n'
+    binfile = BytesIO(data)
+    assert tail_records(binfile, 3, 9, block_size) == data[data.index(b"2,") :]
+    assert tail_rows(binfile, 4) == [
+        ["1", "a\nb"],
+        ["2", '5" screen'],
+        ["3", 'x,"y"'],
+        ["4", '7" tab'],
+    ]
@@ -0,0 +1,35 @@
+import pytest
+from excsv.utils import timing
+
+
+@pytest.fixture
+def profiler():
+    profiler = timing.start_profiling("test")
+    yield profiler
+    timing.stop_profiling()
+
+
+def test_spans_add_up(profiler):
+    for _ in range(3):
+        with timing.span("stage", rows=10):
+            pass
+    rows = list(timing.timed_rows("read", [["a"], ["b"]]))
+    double = timing.timed("double", lambda x: 2 * x)
+    assert [double(1), double(2)] == [2, 4]
+
+    report = timing.stop_profiling()
+    spans = {s["name"]: s for s in report["spans"]}
+    assert rows == [["a"], ["b"]]
+    assert (spans["stage"]["calls"], spans["stage"]["rows"]) == (3, 30)
+    assert (spans["double"]["calls"], spans["double"]["rows"]) == (2, 2)
+    assert report["command"] == "test"
+    assert report["rows"] == spans["read"]["rows"] == 2
+    assert "excsv test" in timing.format_report(report)
+
+
+def test_nothing_is_wrapped_when_not_profiling():
+    rows = [["a"]]
+    fn = len
+    assert timing.timed_rows("read", rows) is rows
+    assert timing.timed("len", fn) is fn
+    assert timing.stop_profiling() is None
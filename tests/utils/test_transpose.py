@@ -0,0 +1,34 @@
+import csv
+from io import StringIO
+
+import pytest
+from excsv.utils.transpose import transpose_rows
+
+
+ROWS = [
+    ["name", "note", "age"],
+    ["Alice", "two\nlines", ""],
+    ["Bob", 'a "quote"', "9"],
+    ["Chaz", "", "101"],
+]
+
+
+def expected_output(rows, delimiter=","):
+    out = StringIO()
+    csv.writer(out, delimiter=delimiter).writerows(zip(*rows))
+    return out.getvalue()
+
+
+@pytest.mark.parametrize("max_memory", [1, 200, 10**9])
+def test_transpose_rows_with_spill_files(max_memory, tmp_path):
+    out = StringIO()
+    transpose_rows(ROWS, out, max_memory=max_memory, temp_dir=tmp_path)
+    assert out.getvalue() == expected_output(ROWS)
+    assert list(tmp_path.iterdir()) == [], "spill files are removed"
+
+
+def test_transpose_rows_drops_columns_past_shortest_row():
+    rows = ROWS + [["Dan"]]
+    out = StringIO()
+    transpose_rows(rows, out, delimiter=";", max_memory=1)
+    assert out.getvalue() == "name;Alice;Bob;Chaz;Dan\r\n"
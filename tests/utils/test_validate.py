@@ -0,0 +1,48 @@
+from excsv.utils.validate import Violation, validate_header, validate_rows
+
+
+def test_validate_header():
+    assert validate_header(["id", "name"]) == []
+    assert validate_header([]) == [Violation(1, "", "header", "No header row")]
+    assert [(v.column, v.message) for v in validate_header(["id", "", "id", "2024"])] == [
+        ("1", "Column 1 has no name"),
+        ("id", "Duplicate header: 'id'"),
+        ("2024", "Header '2024' looks like a value, not a name"),
+    ]
+
+
+def test_validate_rows_in_row_order():
+    headers = ["id", "name", "day"]
+    rows = [
+        ["1", "Alice", "2024-01-31"],
+        ["x", "Bob"],
+        ["3", "Ch\x00az", "2024-02-30"],
+        ["4", "Dan\udcff", ""],
+    ]
+    violations = list(
+        validate_rows(rows, headers, {0: "int", 2: "date"}, batch_size=2)
+    )
+    assert [(v.row, v.column, v.rule) for v in violations] == [
+        (3, "", "field_count"),
+        (3, "id", "type"),
+        (4, "name", "control_char"),
+        (4, "day", "type"),
+        (5, "name", "encoding"),
+    ]
+    assert violations[-1].message == "Invalid bytes in 'Dan�'"
+
+
+def test_validate_rows_allows_tabs_newlines_and_blanks():
+    rows = [["1", "two\nlines\tand tab"], ["", ""]]
+    assert list(validate_rows(rows, ["id", "note"], {0: "int"})) == []
+
+
+def test_validate_rows_types_are_what_int_and_float_read():
+    rows = [
+        ["007", "01.50"],
+        ["12345678901234567", "1e400"],
+        [" 1_000 ", "-inf"],
+        ["1.0", "1,5"],
+    ]
+    violations = list(validate_rows(rows, ["id", "amount"], {0: "int", 1: "float"}))
+    assert [(v.row, v.column) for v in violations] == [(5, "id"), (5, "amount")]